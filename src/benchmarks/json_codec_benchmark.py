@@ -0,0 +1,97 @@
+"""
+Compara el codec JSON de `utils.json_codec` con el camino actual (stdlib).
+
+Simula un listado grande de pagos de Treli y mide:
+- decodificación del cuerpo de la respuesta: `json.loads` frente a `json_codec.loads`;
+- codificación de la respuesta del API: `jsonable_encoder` + `json.dumps` (lo que hace
+  `JSONResponse`) frente a `jsonable_encoder` + `json_codec.dumps` (`FastJSONResponse`) y
+  frente a retornar `FastJSONResponse` directamente, sin `jsonable_encoder`, como hacen los
+  endpoints que reenvían listados de Treli.
+
+Uso (desde `src/`):
+
+    python -m benchmarks.json_codec_benchmark --items 5000 --repeat 20
+"""
+
+import argparse
+import json
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+
+from utils import json_codec
+
+
+def treli_payments_page(items: int) -> dict:
+    return {
+        "success": True,
+        "payments": [
+            {
+                "payment_id": 100000 + i,
+                "subscription_id": 5000 + i % 97,
+                "email": f"cliente{i}@example.com",
+                "status": "approved" if i % 5 else "failed",
+                "currency": "COP",
+                "payment_method": "card",
+                "totals": {"sub_total": 49900.0, "discounts": 0, "total": 49900.0},
+                "items": [{"name": "Hunty Pro Mensual", "quantity": 1}],
+                "billing": {
+                    "first_name": "Nombre",
+                    "last_name": "Apellido",
+                    "city": "Bogotá",
+                    "country": "CO",
+                    "phone": "3000000000",
+                },
+                "date_created": "2023-07-21T10:00:00",
+            }
+            for i in range(items)
+        ],
+        "message": "Pagos obtenidos exitosamente.",
+    }
+
+
+def stdlib_response(content) -> bytes:
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def codec_response(content) -> bytes:
+    return json_codec.FastJSONResponse(jsonable_encoder(content)).body
+
+
+def direct_response(content) -> bytes:
+    return json_codec.FastJSONResponse(content).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    page = treli_payments_page(args.items)
+    body = json.dumps(page).encode("utf-8")
+
+    cases = [
+        ("decode  stdlib json.loads", lambda: json.loads(body)),
+        (f"decode  {json_codec.BACKEND} loads", lambda: json_codec.loads(body)),
+        ("encode  JSONResponse (stdlib)", lambda: stdlib_response(page)),
+        ("encode  FastJSONResponse", lambda: codec_response(page)),
+        ("encode  FastJSONResponse direct", lambda: direct_response(page)),
+        ("encode  stdlib json.dumps only", lambda: json.dumps(page).encode()),
+        (f"encode  {json_codec.BACKEND} dumps only", lambda: json_codec.dumps(page)),
+    ]
+
+    print(f"payload: {args.items} payments, {len(body) / 1024:.0f} KiB")
+    for name, fn in cases:
+        seconds = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:<36} {seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
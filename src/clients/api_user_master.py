@@ -1,16 +1,26 @@
-import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from fastapi import HTTPException, status
 
+from clients import historic_status
+from clients.upstream import users_api_client
 from settings import Settings
+from utils.deadline import submit
+from utils.json_codec import dumps, response_json
 from utils.sa_token import generate_sa_token
 
 setting_var = Settings
 
 user_api_update = setting_var.USER_MASTER_UPDATE
 
+# Ejecuta en paralelo las llamadas de `update_user_status` cuando el API de usuarios no
+# ofrece el endpoint compuesto. Comparte el pool de conexiones de `users_api_client`.
+status_executor = ThreadPoolExecutor(
+    max_workers=setting_var.USERS_API_POOL_SIZE, thread_name_prefix="users-api-status"
+)
+
 
 def update_user_master(user_id: str = None, data: dict = None):
     """
@@ -43,14 +53,15 @@ def update_user_master(user_id: str = None, data: dict = None):
 
         url = f"{user_api_update}/{user_id}"
 
-        response = requests.put(
+        response = users_api_client.put(
             url=url,
-            data=json.dumps(data),
+            data=dumps(data),
             headers={"Authorization": f"Bearer {sa_token}"},
+            operation=method,
         )
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -92,12 +103,15 @@ def patch_real_time_db_status(
             "show_hubspot_banner": show_hubspot_banner,
             "show_banner": show_banner,
         }
-        response = requests.put(
-            request_url, params=params, headers={"Authorization": f"Bearer {sa_token}"}
+        response = users_api_client.put(
+            request_url,
+            params=params,
+            headers={"Authorization": f"Bearer {sa_token}"},
+            operation=method,
         )
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -106,3 +120,174 @@ def patch_real_time_db_status(
             status_code=status.HTTP_424_FAILED_DEPENDENCY,
             detail=f"{method} error: {error}",
         )
+
+
+def update_user_status(
+    user_id: str,
+    user_status: dict,
+    old_status: dict = None,
+    show_modal: bool = True,
+    show_hubspot_banner: bool = True,
+    show_banner: bool = True,
+):
+    """
+    Actualiza el estado de un usuario, registra el histórico y notifica la base de datos en
+    tiempo real en una sola operación.
+
+    Reemplaza la secuencia `update_user_master`, `historic_status.create_modify_data` y
+    `patch_real_time_db_status`. Si `USERS_API_COMPOSITE_STATUS_URL` está configurado, las
+    tres actualizaciones se envían en una sola solicitud al endpoint compuesto del API de
+    usuarios (ver `_update_user_status_composite`); si no está configurado o el API responde
+    que no lo ofrece, se ejecutan en paralelo sobre el pool de conexiones compartido, de modo
+    que el tiempo total es el de la llamada más lenta y no la suma de las tres.
+
+    El histórico solo se registra si el subestado cambió respecto a `old_status`.
+
+    Args:
+        user_id (str): ID del usuario.
+        user_status (dict): Nuevo estado del usuario ('status_id', 'substatus_id', 'stage_id').
+        old_status (dict, opcional): Estado previo del usuario, usado para el histórico.
+        show_modal (bool): Bandera para mostrar el modal.
+        show_hubspot_banner (bool): Bandera para mostrar el banner de HubSpot.
+        show_banner (bool): Bandera para mostrar el banner.
+
+    Returns:
+        dict: Respuestas del API con las llaves 'user_master', 'historic' (None si no se
+              registró) y 'real_time_db'.
+
+    Raises:
+        HTTPException: 424 si alguna de las actualizaciones falla.
+    """
+    historic_data = None
+    if old_status and old_status.get("substatus_id") != user_status["substatus_id"]:
+        historic_data = historic_status.build_historic_data(old_status, user_status)
+
+    real_time_db = {
+        "show_modal": show_modal,
+        "show_hubspot_banner": show_hubspot_banner,
+        "show_banner": show_banner,
+    }
+
+    if setting_var.USERS_API_COMPOSITE_STATUS_URL:
+        results = _update_user_status_composite(
+            user_id, user_status, historic_data, real_time_db
+        )
+        if results is not None:
+            return results
+
+    return _update_user_status_fan_out(
+        user_id, user_status, historic_data, real_time_db
+    )
+
+
+def _update_user_status_fan_out(
+    user_id: str, user_status: dict, historic_data: dict, real_time_db: dict
+):
+    futures = {
+        "user_master": submit(
+            status_executor, update_user_master, user_id=user_id, data=user_status
+        ),
+        "real_time_db": submit(
+            status_executor, patch_real_time_db_status, user_id=user_id, **real_time_db
+        ),
+    }
+    if historic_data:
+        futures["historic"] = submit(
+            status_executor, historic_status.create_historic, historic_data
+        )
+
+    # Se espera a todas las llamadas aunque alguna falle, para no dejar solicitudes en
+    # curso sin nadie que las espere.
+    results = {"historic": None}
+    errors = []
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as error:
+            logging.error(f"update_user_status {name} error {error}")
+            errors.append(f"{name}: {getattr(error, 'detail', error)}")
+
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail="; ".join(errors),
+        )
+
+    return results
+
+
+# Códigos con los que el API de usuarios indica que no ofrece el endpoint compuesto; en ese
+# caso no se aplicó ningún cambio y se usan las llamadas individuales.
+COMPOSITE_UNAVAILABLE_STATUS_CODES = {404, 405, 501}
+
+
+def _update_user_status_composite(
+    user_id: str, user_status: dict, historic_data: dict, real_time_db: dict
+):
+    """
+    Envía las tres actualizaciones de `update_user_status` en una sola solicitud.
+
+    Contrato del endpoint `PUT {USERS_API_COMPOSITE_STATUS_URL}/{user_id}`:
+
+    - Cuerpo: {"user_master": <user_status>, "historic": <historic_data o null>,
+      "real_time_db": {"show_modal", "show_hubspot_banner", "show_banner"}}.
+    - Respuesta: un objeto con las llaves 'user_master', 'real_time_db' y 'historic' (esta
+      última puede ser null si no se envió histórico), con la respuesta de cada endpoint
+      individual.
+
+    Returns:
+        dict or None: Respuestas del API, o None si el API respondió que no ofrece el
+                      endpoint (ver `COMPOSITE_UNAVAILABLE_STATUS_CODES`).
+
+    Raises:
+        HTTPException: 424 si la solicitud falla o la respuesta no cumple el contrato.
+    """
+    method = update_user_status.__name__
+    try:
+        sa_token = generate_sa_token(service_audience=setting_var.USERS_RAW_URL)
+
+        body = {
+            "user_master": user_status,
+            "historic": historic_data,
+            "real_time_db": real_time_db,
+        }
+        response = users_api_client.put(
+            f"{setting_var.USERS_API_COMPOSITE_STATUS_URL}/{user_id}",
+            data=dumps(body),
+            headers={"Authorization": f"Bearer {sa_token}"},
+            operation=method,
+            idempotent=historic_data is None,
+        )
+        if response.status_code in COMPOSITE_UNAVAILABLE_STATUS_CODES:
+            logging.warning(
+                f"{method} composite endpoint unavailable "
+                f"({response.status_code}), using individual calls"
+            )
+            return None
+        response.raise_for_status()
+
+        results = response_json(response)
+
+    except requests.exceptions.RequestException as error:
+        logging.error(f"{method} error {error}")
+
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail=f"{method} error: {error}",
+        )
+
+    missing = _missing_composite_keys(results, historic_data)
+    if missing:
+        logging.error(f"{method} unexpected composite response, missing {missing}")
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail=f"{method} error: composite response without {missing}",
+        )
+    return {"historic": None, **results}
+
+
+def _missing_composite_keys(results, historic_data: dict) -> list:
+    expected = ["user_master", "real_time_db"] + (["historic"] if historic_data else [])
+    if not isinstance(results, dict):
+        return expected
+    return [key for key in expected if key not in results]
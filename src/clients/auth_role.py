@@ -3,7 +3,9 @@ import logging
 import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import users_api_client
 from settings import Settings
+from utils.json_codec import response_json
 from utils.sa_token import generate_sa_token
 
 setting_var = Settings
@@ -38,9 +40,8 @@ def update_role(
 
         url = f"{auth_role}/auth/user/{user_id}/change/role/{new_role.lower()}"
 
-        response = requests.put(
-            url=url,
-            headers={"Authorization": f"Bearer {sa_token}"},
+        response = users_api_client.put(
+            url=url, headers={"Authorization": f"Bearer {sa_token}"}, operation=method
         )
         response.raise_for_status()
 
@@ -84,7 +85,7 @@ def create_user_register(data, utm: dict = None):
 
         url = f"{auth_role}/auth/registry/user/internal"
 
-        response = requests.post(
+        response = users_api_client.post(
             url=url,
             json=data,
             headers={
@@ -94,10 +95,11 @@ def create_user_register(data, utm: dict = None):
                 "utm-web-source": utm.get("utm_web_source") if utm else None,
                 "utm-content": utm.get("utm_content") if utm else None,
             },
+            operation=method,
         )
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -131,16 +133,17 @@ def change_password_crm(token):
 
         url = f"{auth_role}/auth/crm/change/password"
 
-        response = requests.post(
+        response = users_api_client.post(
             url=url,
             headers={
                 "Authorization": f"Bearer {sa_token}",
                 "x-auth-crm-token": token,
             },
+            operation=method,
         )
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -1,10 +1,11 @@
-import json
 import logging
 
 import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import users_api_client
 from settings import Settings
+from utils.json_codec import dumps, response_json
 from utils.sa_token import generate_sa_token
 
 setting_var = Settings
@@ -37,14 +38,15 @@ def create_historic(data: dict):
 
         url = f"{user_api_url}user/hunty/historic/status"
 
-        response = requests.post(
+        response = users_api_client.post(
             url=url,
-            data=json.dumps(data),
+            data=dumps(data),
             headers={"Authorization": f"Bearer {sa_token}"},
+            operation=method,
         )
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -54,9 +56,9 @@ def create_historic(data: dict):
         )
 
 
-def create_modify_data(old_status: dict, now_status: dict):
+def build_historic_data(old_status: dict, now_status: dict) -> dict:
     """
-    Crea un registro histórico a partir de los estados previo y actual de un usuario.
+    Construye el registro histórico a partir de los estados previo y actual de un usuario.
 
     Args:
         old_status (dict): Diccionario con el estado previo del usuario, que debe contener las claves 'user_id',
@@ -74,13 +76,8 @@ def create_modify_data(old_status: dict, now_status: dict):
               - 'created_by_id': ID del usuario que realizó la modificación (puede ser el mismo que 'user_id').
               - 'current_stage_id': ID de la etapa actual del usuario.
               - 'previous_stage_id': ID de la etapa previa del usuario.
-
-    Note:
-        Antes de llamar a esta función, se debe asegurar que `create_historic` ha sido implementada para
-        crear el registro histórico.
-
     """
-    data = {
+    return {
         "user_id": old_status.get("user_id"),
         "current_status_id": now_status.get("status_id"),
         "previous_status_id": old_status.get("status_id"),
@@ -90,6 +87,17 @@ def create_modify_data(old_status: dict, now_status: dict):
         "current_stage_id": now_status.get("stage_id"),
         "previous_stage_id": old_status.get("stage_id"),
     }
-    historic_data = create_historic(data)
 
-    return historic_data
+
+def create_modify_data(old_status: dict, now_status: dict):
+    """
+    Crea un registro histórico a partir de los estados previo y actual de un usuario.
+
+    Args:
+        old_status (dict): Estado previo del usuario (ver `build_historic_data`).
+        now_status (dict): Estado actual del usuario (ver `build_historic_data`).
+
+    Returns:
+        dict: Respuesta JSON de `create_historic`.
+    """
+    return create_historic(build_historic_data(old_status, now_status))
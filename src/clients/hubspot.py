@@ -1,22 +1,19 @@
-import json
 import logging
 
-import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import hubspot_client
 from settings import Settings
+from utils.json_codec import dumps, response_json
 
 setting_var = Settings
 
 hubspot_email_url = setting_var.HUBSPOT_EMAIL_URL
 hubspot_profile = setting_var.HUBSPOT_PROFILE
-hubspot_token = setting_var.HUBSPOT_ACCESS_TOKEN
 hubspot_url_v3 = setting_var.HUBSPOT_URL_V3
 
-headers = {
-    "content-type": "application/json",
-    "authorization": "Bearer %s" % hubspot_token,
-}
+# Máximo de contactos por solicitud que acepta el endpoint batch de HubSpot.
+HUBSPOT_BATCH_LIMIT = 100
 
 
 def get_single_hunty_by_email(email: str) -> object:
@@ -40,12 +37,14 @@ def get_single_hunty_by_email(email: str) -> object:
     try:
         payload = {"propertyMode": "value_only"}
         url = f"{hubspot_email_url}/{email}/{hubspot_profile}"
-        user_hubspot = requests.get(url=url, params=payload, headers=headers)
+        user_hubspot = hubspot_client.get(
+            url=url, params=payload, operation=get_single_hunty_by_email.__name__
+        )
 
         if user_hubspot.status_code != 200:
             return user_hubspot.status_code
 
-        return user_hubspot.json(), user_hubspot.status_code
+        return response_json(user_hubspot), user_hubspot.status_code
 
     except Exception as error:
         logging.error(
@@ -72,8 +71,10 @@ def create_user_hubspot(data):
 
         properties = {"properties": data}
 
-        response = requests.post(url=url, data=json.dumps(properties), headers=headers)
-        response_data = response.json()
+        response = hubspot_client.post(
+            url=url, data=dumps(properties), operation=create_user_hubspot.__name__
+        )
+        response_data = response_json(response)
 
         response.raise_for_status()
 
@@ -97,16 +98,33 @@ def update_user_hubspot(data, hubspot_id):
 
     Returns:
         dict: Un diccionario que contiene los datos de respuesta de HubSpot tras actualizar el usuario.
+
+    Raises:
+        HTTPException: 404 si el contacto no existe en HubSpot; 424 ante cualquier otro error.
     """
     try:
         url = f"{hubspot_url_v3}objects/contacts/{hubspot_id}"
         properties = {"properties": data}
-        response = requests.patch(url=url, data=json.dumps(properties), headers=headers)
-        response_data = response.json()
+        response = hubspot_client.patch(
+            url=url,
+            data=dumps(properties),
+            operation=update_user_hubspot.__name__,
+            idempotent=True,
+        )
+
+        if response.status_code == status.HTTP_404_NOT_FOUND:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"HubSpot contact {hubspot_id} not found",
+            )
+
+        response_data = response_json(response)
 
         response.raise_for_status()
 
         return response_data
+    except HTTPException:
+        raise
     except Exception as error:
         logging.info(f"Error al actualizar el usuario en HubSpot: {error}")
         raise HTTPException(
@@ -115,6 +133,59 @@ def update_user_hubspot(data, hubspot_id):
         )
 
 
+def batch_upsert_contacts(contacts: list) -> list:
+    """
+    Crea o actualiza varios contactos en HubSpot usando el correo electrónico como llave.
+
+    Usa el endpoint `objects/contacts/batch/upsert` de la API v3, por lo que no es necesario
+    buscar el contacto antes de crearlo o actualizarlo. Los contactos se envían en lotes de
+    hasta `HUBSPOT_BATCH_LIMIT` por solicitud.
+
+    Args:
+        contacts (list): Lista de diccionarios con las llaves:
+                         - 'email' (str): Correo electrónico del contacto.
+                         - 'properties' (dict): Propiedades a crear o actualizar.
+
+    Returns:
+        list: Resultados de HubSpot (uno por contacto), cada uno con su 'id' y 'properties'.
+
+    Raises:
+        HTTPException: Si ocurre un error al crear o actualizar los contactos en HubSpot. El
+                       error original (por ejemplo, el `HTTPError` de un 400) queda en
+                       `__cause__`.
+    """
+    try:
+        url = f"{hubspot_url_v3}objects/contacts/batch/upsert"
+        results = []
+
+        for start in range(0, len(contacts), HUBSPOT_BATCH_LIMIT):
+            inputs = [
+                {
+                    "idProperty": "email",
+                    "id": contact["email"],
+                    "properties": contact["properties"],
+                }
+                for contact in contacts[start : start + HUBSPOT_BATCH_LIMIT]
+            ]
+            response = hubspot_client.post(
+                url=url,
+                data=dumps({"inputs": inputs}),
+                operation=batch_upsert_contacts.__name__,
+                idempotent=True,
+            )
+            response.raise_for_status()
+            results.extend(response_json(response).get("results", []))
+
+        return results
+
+    except Exception as error:
+        logging.error(f"Error al crear o actualizar contactos en HubSpot: {error}")
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail=f"Error al crear o actualizar contactos en HubSpot: {error}",
+        ) from error
+
+
 def delete_user_hubspot(hubspot_id):
     """
     Elimina un usuario existente en HubSpot.
@@ -128,7 +199,9 @@ def delete_user_hubspot(hubspot_id):
     try:
         url = f"{hubspot_url_v3}objects/contacts/{hubspot_id}"
 
-        response = requests.delete(url=url, headers=headers)
+        response = hubspot_client.delete(
+            url=url, operation=delete_user_hubspot.__name__
+        )
 
         return f"Se eliminó el usuario en HubSpot con el ID: {hubspot_id}, estado: {response.status_code}"
 
@@ -1,23 +1,39 @@
-import threading
-from datetime import datetime
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
-import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import thinkific_client
 from settings import Settings
-
-from utils.list_courses import lista_name_courses
+from utils.cache import StaleWhileRevalidateCache
+from utils.deadline import submit
+from utils.json_codec import response_json
+from utils.list_courses import ids_name_courses
+from utils.retry import RetryPolicy
 
 create_user_url = Settings.CREATE_USER_THINKIFIC
 get_courses_url = Settings.GET_COURSES_THINKIFIC
 enrollment_url = Settings.ENROLLMENT_USER_THINKIFIC
 
-headers = {
-    "X-Auth-API-Key": Settings.API_KEY_THINKIFIC,
-    "X-Auth-Subdomain": Settings.SUBDOMAIN,
-    "Content-Type": "application/json",
-}
+courses_cache = StaleWhileRevalidateCache(
+    "thinkific_courses",
+    ttl=Settings.THINKIFIC_COURSES_CACHE_TTL,
+    max_stale=Settings.THINKIFIC_COURSES_CACHE_MAX_STALE,
+)
+
+# Pool compartido por todas las inscripciones, de modo que el número de solicitudes
+# concurrentes a Thinkific no crece con el número de pagos procesados en paralelo.
+enrollment_executor = ThreadPoolExecutor(
+    max_workers=Settings.THINKIFIC_ENROLLMENT_CONCURRENCY,
+    thread_name_prefix="thinkific-enrollment",
+)
+
+enrollment_retry_policy = RetryPolicy(
+    retries=Settings.THINKIFIC_ENROLLMENT_RETRIES,
+    base_delay=Settings.THINKIFIC_ENROLLMENT_BACKOFF,
+    max_delay=Settings.THINKIFIC_ENROLLMENT_MAX_BACKOFF,
+)
 
 
 def create_user_and_send_email(first_name, last_name, email):
@@ -51,14 +67,16 @@ def create_user_and_send_email(first_name, last_name, email):
             "provider": "SSO",
         }
 
-        response = requests.post(create_user_url, headers=headers, json=user_data)
+        response = thinkific_client.post(
+            create_user_url, json=user_data, operation=method
+        )
 
         if response.status_code == 422:
             return response.status_code
 
         response.raise_for_status()
 
-        return response.json()["id"]
+        return response_json(response)["id"]
     except Exception as error:
         logging.info(f"Error when execute method {method}, with exception: {error}")
         raise HTTPException(
@@ -67,6 +85,7 @@ def create_user_and_send_email(first_name, last_name, email):
         )
 
 
+@courses_cache.cached
 def get_courses():
     """
     Obtiene una lista de IDs de cursos según una lista de nombres de cursos.
@@ -76,6 +95,10 @@ def get_courses():
     de la URL `get_courses_url` utilizando paginación. Si ocurre algún error durante
     el proceso, se registrará en los registros y se levantará una excepción HTTP.
 
+    El resultado se guarda en `courses_cache` durante `THINKIFIC_COURSES_CACHE_TTL`
+    segundos, por lo que las inscripciones no recorren el catálogo en cada pago. Para
+    forzar una recarga se puede usar `refresh_courses`.
+
     Returns:
         list: Lista de IDs de cursos.
 
@@ -85,26 +108,27 @@ def get_courses():
     """
     method = get_courses.__name__
     try:
-        lista_courses = [item["id"] for item in lista_name_courses]
         params = {"limit": 30}
         page = 1
-        courses_ids = []
+        ids_courses = []
         while True:
             params["page"] = page
-            response = requests.get(get_courses_url, headers=headers, params=params)
+            response = thinkific_client.get(
+                get_courses_url, params=params, operation=method
+            )
             response.raise_for_status()
-            courses = response.json()["items"]
-            courses_ids.extend((course["id"], course["name"]) for course in courses)
+            body = response_json(response)
+            ids_courses.extend(
+                course["id"]
+                for course in body["items"]
+                if course["id"] in ids_name_courses
+            )
 
             # Verifica si hay más páginas
-            if not response.json()["meta"]["pagination"]["next_page"]:
+            if not body["meta"]["pagination"]["next_page"]:
                 break
             page += 1
 
-        response.raise_for_status()
-
-        ids_courses = [item[0] for item in courses_ids if item[0] in lista_courses]
-
         return ids_courses
 
     except Exception as error:
@@ -115,6 +139,17 @@ def get_courses():
         )
 
 
+def refresh_courses():
+    """
+    Descarta la lista de cursos en caché y la vuelve a obtener desde Thinkific.
+
+    Returns:
+        list: Lista actualizada de IDs de cursos.
+    """
+    courses_cache.invalidate()
+    return get_courses()
+
+
 def enroll_user(
     course_id,
     user_id,
@@ -127,6 +162,9 @@ def enroll_user(
     fecha y hora actual en formato UTC. Si ocurre algún error durante el proceso,
     se registrará en los registros y se levantará una excepción HTTP.
 
+    Cada solicitud tiene un timeout de `THINKIFIC_ENROLLMENT_TIMEOUT` segundos y se
+    reintenta con espera exponencial y jitter ante respuestas 429/5xx o errores de conexión.
+
     Args:
         course_id (str): ID del curso al que se inscribirá el usuario.
         user_id (str): ID del usuario que será inscrito en el curso.
@@ -138,7 +176,7 @@ def enroll_user(
         HTTPException: Si ocurre un error al inscribir al usuario en el curso.
 
     """
-    method = get_courses.__name__
+    method = enroll_user.__name__
     try:
         now = datetime.utcnow()
         formatted_date_time = now.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -149,7 +187,15 @@ def enroll_user(
             "activated_at": formatted_date_time,
         }
 
-        response = requests.post(enrollment_url, headers=headers, json=enrollment_data)
+        # Inscribir dos veces al mismo usuario en el mismo curso no duplica la inscripción.
+        response = thinkific_client.post(
+            enrollment_url,
+            json=enrollment_data,
+            timeout=Settings.THINKIFIC_ENROLLMENT_TIMEOUT,
+            operation=method,
+            idempotent=True,
+            retry_policy=enrollment_retry_policy,
+        )
         response.raise_for_status()
 
         return response.status_code
@@ -162,48 +208,180 @@ def enroll_user(
         )
 
 
-def create_user_with_enrollments_user(first_name, last_name, email):
+def enroll_user_courses(user_id, course_ids) -> dict:
+    """
+    Inscribe a un usuario en varios cursos de forma concurrente.
+
+    Las inscripciones se ejecutan en `enrollment_executor`, cuyo tamaño
+    (`THINKIFIC_ENROLLMENT_CONCURRENCY`) limita las solicitudes simultáneas a Thinkific.
+    Un error en un curso no detiene las demás inscripciones; se reporta en el resumen.
+
+    Args:
+        user_id (str): ID del usuario en Thinkific.
+        course_ids (list): IDs de los cursos en los que se inscribirá al usuario.
+
+    Returns:
+        dict: Resumen con las llaves:
+              - 'enrolled' (list): IDs de los cursos inscritos correctamente.
+              - 'failed' (list): Diccionarios con 'course_id' y 'error' de los cursos fallidos.
+    """
+    futures = {
+        course_id: submit(enrollment_executor, enroll_user, course_id, user_id)
+        for course_id in course_ids
+    }
+
+    summary = {"enrolled": [], "failed": []}
+    for course_id, future in futures.items():
+        try:
+            future.result()
+            summary["enrolled"].append(course_id)
+        except Exception as error:
+            summary["failed"].append(
+                {"course_id": course_id, "error": getattr(error, "detail", str(error))}
+            )
+
+    if summary["failed"]:
+        logging.error(
+            f"enroll_user_courses user {user_id}: "
+            f"{len(summary['failed'])}/{len(course_ids)} enrollments failed"
+        )
+
+    return summary
+
+
+def get_user_id_by_email(email):
+    """
+    Busca un usuario de Thinkific por su correo electrónico.
+
+    Args:
+        email (str): Dirección de correo electrónico del usuario.
+
+    Returns:
+        int: ID del usuario en Thinkific, o None si no existe.
+
+    Raises:
+        HTTPException: Si ocurre un error al consultar el usuario.
+    """
+    method = get_user_id_by_email.__name__
+    try:
+        response = thinkific_client.get(
+            create_user_url, params={"query[email]": email}, operation=method
+        )
+        response.raise_for_status()
+        items = response_json(response)["items"]
+
+        return items[0]["id"] if items else None
+
+    except Exception as error:
+        logging.info(f"Error when execute method {method}, with exception: {error}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Error when execute method {method}, with exception: {error}",
+        )
+
+
+def get_enrolled_course_ids(user_id) -> set:
+    """
+    Obtiene los IDs de los cursos en los que ya está inscrito un usuario.
+
+    Una sola consulta paginada reemplaza una solicitud de inscripción por curso cuando el
+    usuario ya tenía sus cursos (renovaciones).
+
+    Args:
+        user_id (int): ID del usuario en Thinkific.
+
+    Returns:
+        set: IDs de los cursos inscritos.
+
+    Raises:
+        HTTPException: Si ocurre un error al consultar las inscripciones.
+    """
+    method = get_enrolled_course_ids.__name__
+    try:
+        params = {"query[user_id]": user_id, "limit": 100}
+        page = 1
+        course_ids = set()
+        while True:
+            params["page"] = page
+            response = thinkific_client.get(
+                enrollment_url, params=params, operation=method
+            )
+            response.raise_for_status()
+            body = response_json(response)
+            course_ids.update(item["course_id"] for item in body["items"])
+
+            if not body["meta"]["pagination"]["next_page"]:
+                break
+            page += 1
+
+        return course_ids
+
+    except Exception as error:
+        logging.info(f"Error when execute method {method}, with exception: {error}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Error when execute method {method}, with exception: {error}",
+        )
+
+
+def _pending_courses(user_id, course_ids) -> list:
+    """
+    Cursos de `course_ids` en los que el usuario aún no está inscrito. Si la consulta falla
+    se retornan todos: inscribir de nuevo en un curso no duplica la inscripción.
+    """
+    try:
+        enrolled = get_enrolled_course_ids(user_id)
+    except HTTPException as error:
+        logging.warning(f"enrollment check for {user_id} failed: {error.detail}")
+        return list(course_ids)
+    return [course_id for course_id in course_ids if course_id not in enrolled]
+
+
+def create_user_with_enrollments_user(first_name, last_name, email, thinkific_id=None):
     """
     Crea un usuario y lo inscribe en cursos.
 
-    Esta función crea un usuario utilizando los datos proporcionados y luego lo inscribe
-    en varios cursos utilizando la función `enroll_user`. Si el usuario ya existe, devuelve
-    un detalle de "usuario existente" con un código de estado 202. Si ocurre algún error
-    durante el proceso, se registrará en los registros y se levantará una excepción HTTP.
+    Si se conoce el `thinkific_id` del usuario (guardado en `users_master`), no se intenta
+    crearlo y solo se inscribe en los cursos que le falten, de modo que una renovación cuesta
+    una consulta de inscripciones en lugar de un POST rechazado con 422. Si el usuario no
+    tiene `thinkific_id` y Thinkific responde que ya existe, su ID se busca por correo
+    electrónico y también se completan sus inscripciones.
 
     Args:
         first_name (str): Nombre del usuario.
         last_name (str): Apellido del usuario.
         email (str): Dirección de correo electrónico del usuario.
+        thinkific_id (int, opcional): ID del usuario en Thinkific guardado para el usuario.
 
     Returns:
-        HTTPException: Una excepción HTTP con el código de estado adecuado.
+        HTTPException: Una excepción HTTP con código 201 si el usuario se creó o 202 si ya
+                       existía. El detalle contiene el resumen de `enroll_user_courses` y el
+                       ID del usuario en Thinkific en la llave 'thinkific_id'.
 
     Raises:
-        HTTPException: Si ocurre un error al crear el usuario o inscribirlo en cursos.
+        HTTPException: Si ocurre un error al crear el usuario o consultar sus cursos. Si
+                       falla alguna inscripción se lanza un 424 cuyo detalle es el resumen
+                       de `enroll_user_courses`, con el ID del usuario en 'thinkific_id';
+                       al reintentar solo se inscriben los cursos que faltan.
 
     """
     method = create_user_with_enrollments_user.__name__
     try:
-        user_id = create_user_and_send_email(first_name, last_name, email)
-
-        if user_id == 422:
-            return HTTPException(
-                status_code=status.HTTP_202_ACCEPTED, detail="the user exists"
-            )
+        created = False
+        user_id = thinkific_id
+        if not user_id:
+            user_id = create_user_and_send_email(first_name, last_name, email)
+            created = user_id != status.HTTP_422_UNPROCESSABLE_ENTITY
+            if not created:
+                user_id = get_user_id_by_email(email)
+                if not user_id:
+                    raise ValueError(f"user {email} exists but was not found")
 
         found_id = get_courses()
-        threads = []
-        for course_id in found_id:
-            thread = threading.Thread(target=enroll_user, args=(course_id, user_id))
-            thread.start()
-            threads.append(thread)
-
-        # Esperar a que todos los hilos terminen
-        for thread in threads:
-            thread.join()
+        if not created:
+            found_id = _pending_courses(user_id, found_id)
 
-        return HTTPException(status_code=status.HTTP_201_CREATED)
+        summary = enroll_user_courses(user_id, found_id)
 
     except Exception as error:
         logging.info(f"Error when execute method {method}, with exception: {error}")
@@ -211,3 +389,14 @@ def create_user_with_enrollments_user(first_name, last_name, email):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Error when execute method {method}, with exception: {error}",
         )
+
+    summary["thinkific_id"] = user_id
+    if summary["failed"]:
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY, detail=summary
+        )
+
+    return HTTPException(
+        status_code=(status.HTTP_201_CREATED if created else status.HTTP_202_ACCEPTED),
+        detail=summary,
+    )
@@ -1,9 +1,13 @@
 import logging
 
+import httpx
 import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import treli_client
 from settings import Settings
+from utils.json_codec import response_json
+from utils.single_flight import coalesce
 
 
 def add_card_token(gateway: str = None, token_info: dict = None):
@@ -22,18 +26,13 @@ def add_card_token(gateway: str = None, token_info: dict = None):
 
     try:
         url = f"{Settings.TRELI_URL_BASE}cards/add-token"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         data = {"gateway": gateway, "token_info": token_info}
 
-        response = requests.post(url, headers=headers, json=data)
+        response = treli_client.post(url, json=data, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -43,6 +42,37 @@ def add_card_token(gateway: str = None, token_info: dict = None):
         )
 
 
+async def add_card_token_async(gateway: str = None, token_info: dict = None):
+    """
+    Versión asíncrona de `add_card_token` para los endpoints `async`.
+
+    :param gateway: El id de la pasarela de pago a la cual quieres agregar el token.
+    :type gateway: str
+    :param token_info: Información del token de la tarjeta de crédito.
+    :type token_info: dict
+    :return: El resultado de la respuesta en formato JSON.
+    """
+    method = add_card_token.__name__
+
+    try:
+        url = f"{Settings.TRELI_URL_BASE}cards/add-token"
+
+        data = {"gateway": gateway, "token_info": token_info}
+
+        response = await treli_client.arequest("POST", url, json=data, operation=method)
+        response.raise_for_status()
+
+        return response_json(response)
+
+    except (httpx.HTTPError, requests.exceptions.RequestException) as error:
+        logging.error(f"{method} error {error}")
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail=f"{method} error: {error}",
+        )
+
+
+@coalesce
 def get_tokens(email: str = None, gateway: str = None):
     """
     Obtiene una lista de los tokens asociados a un cliente y pasarela de pago.
@@ -57,17 +87,13 @@ def get_tokens(email: str = None, gateway: str = None):
 
     try:
         url = f"{Settings.TRELI_URL_BASE}cards/get-tokens"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         params = {"email": email, "gateway": gateway}
 
-        response = requests.get(url, headers=headers, params=params)
+        response = treli_client.get(url, params=params, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
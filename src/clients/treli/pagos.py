@@ -1,9 +1,21 @@
 import logging
 
+import httpx
 import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import treli_client
 from settings import Settings
+from utils.cache import StaleWhileRevalidateCache
+from utils.json_codec import response_json
+from utils.pagination import aiter_pages, iter_pages
+from utils.single_flight import coalesce
+
+templates_cache = StaleWhileRevalidateCache(
+    "treli_payment_templates",
+    ttl=Settings.TRELI_CATALOG_CACHE_TTL,
+    max_stale=Settings.TRELI_CATALOG_CACHE_MAX_STALE,
+)
 
 
 def create_payment(
@@ -76,11 +88,6 @@ def create_payment(
     method = create_payment.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}payments/create"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         data = {
             "email": email,
@@ -100,10 +107,10 @@ def create_payment(
             "currency": currency,
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = treli_client.post(url, json=data, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -131,10 +138,6 @@ def update_payment_status(
     method = update_payment_status.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}payments/update-status"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-        }
 
         data = {
             "payment_id": payment_id,
@@ -142,10 +145,10 @@ def update_payment_status(
             "status": status_paymet,
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = treli_client.post(url, json=data, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -155,12 +158,14 @@ def update_payment_status(
         )
 
 
+@coalesce
 def get_payments(
     email=None,
     date_created=None,
     date_range=None,
     subscription_id=None,
     payment_id=None,
+    page=None,
 ):
     """
     Obtiene una lista de pagos con posibles filtros.
@@ -175,16 +180,14 @@ def get_payments(
     :type subscription_id: int
     :param payment_id: Obtiene el detalle de un pago específico. Este filtro sobrescribe cualquier filtro enviado anteriormente. Ejemplo. 12345
     :type payment_id: str
+    :param page: Página de resultados a obtener. Para recorrer todas las páginas usa `iter_payments`.
+    :type page: int
     :return: El resultado de la respuesta en formato JSON.
     """
     method = get_payments.__name__
 
     try:
         url = f"{Settings.TRELI_URL_BASE}payments"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         params = {
             "email": email,
@@ -192,12 +195,13 @@ def get_payments(
             "date_range": date_range,
             "subscription_id": subscription_id,
             "payment_id": payment_id,
+            "page": page,
         }
 
-        response = requests.get(url, headers=headers, params=params)
+        response = treli_client.get(url, params=params, operation=method, hedge=True)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -207,6 +211,82 @@ def get_payments(
         )
 
 
+async def get_payments_async(
+    email=None,
+    date_created=None,
+    date_range=None,
+    subscription_id=None,
+    payment_id=None,
+    page=None,
+):
+    """
+    Versión asíncrona de `get_payments` para los endpoints `async`.
+
+    :return: El resultado de la respuesta en formato JSON.
+    """
+    method = get_payments.__name__
+
+    try:
+        url = f"{Settings.TRELI_URL_BASE}payments"
+
+        params = {
+            "email": email,
+            "date_created": date_created,
+            "date_range": date_range,
+            "subscription_id": subscription_id,
+            "payment_id": payment_id,
+            "page": page,
+        }
+
+        response = await treli_client.arequest(
+            "GET", url, params=params, operation=method
+        )
+        response.raise_for_status()
+
+        return response_json(response)
+
+    except (httpx.HTTPError, requests.exceptions.RequestException) as error:
+        logging.error(f"{method} error {error}")
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail=f"{method} error: {error}",
+        )
+
+
+def iter_payments(prefetch: int = None, **filters):
+    """
+    Recorre todas las páginas de `get_payments` y entrega los pagos uno a uno.
+
+    Las páginas siguientes se descargan en paralelo mientras se consumen las actuales, por lo
+    que la memoria usada no depende del número total de pagos.
+
+    :param prefetch: Páginas descargadas por adelantado (por defecto `TRELI_PAGE_PREFETCH`).
+    :type prefetch: int
+    :param filters: Filtros aceptados por `get_payments` (email, date_range...).
+    :return: Un generador de pagos.
+    """
+    return iter_pages(
+        lambda page: get_payments(page=page, **filters),
+        items_key="payments",
+        prefetch=prefetch,
+    )
+
+
+def aiter_payments(prefetch: int = None, **filters):
+    """
+    Versión asíncrona de `iter_payments`.
+
+    :return: Un iterador asíncrono de pagos.
+    """
+    return aiter_pages(
+        lambda page: get_payments_async(page=page, **filters),
+        items_key="payments",
+        prefetch=prefetch,
+    )
+
+
+@templates_cache.cached
+@coalesce
 def get_payment_templates():
     """
     Obtiene una lista de tus plantillas de pago.
@@ -216,15 +296,10 @@ def get_payment_templates():
     method = get_payment_templates.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}payments/templates"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
-
-        response = requests.get(url, headers=headers)
+        response = treli_client.get(url, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
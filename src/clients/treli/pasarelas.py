@@ -3,9 +3,21 @@ import logging
 import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import treli_client
 from settings import Settings
+from utils.cache import StaleWhileRevalidateCache
+from utils.json_codec import response_json
+from utils.single_flight import coalesce
 
+gateways_cache = StaleWhileRevalidateCache(
+    "treli_gateways",
+    ttl=Settings.TRELI_CATALOG_CACHE_TTL,
+    max_stale=Settings.TRELI_CATALOG_CACHE_MAX_STALE,
+)
 
+
+@gateways_cache.cached
+@coalesce
 def get_payment_gateways():
     """
     Obtiene una lista de las pasarelas y métodos de pago disponibles en tu cuenta de Treli.
@@ -15,15 +27,10 @@ def get_payment_gateways():
     method = get_payment_gateways.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}gateways/list"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
-
-        response = requests.get(url, headers=headers)
+        response = treli_client.get(url, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -1,11 +1,24 @@
 import logging
 
+import httpx
 import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import treli_client
 from settings import Settings
+from utils.cache import StaleWhileRevalidateCache
+from utils.json_codec import response_json
+from utils.single_flight import coalesce
 
+plans_cache = StaleWhileRevalidateCache(
+    "treli_plans",
+    ttl=Settings.TRELI_CATALOG_CACHE_TTL,
+    max_stale=Settings.TRELI_CATALOG_CACHE_MAX_STALE,
+)
 
+
+@plans_cache.cached
+@coalesce
 def get_plans(plan_id: int = None):
     """
     Obtiene una lista de todos tus planes o el detalle de uno específico.
@@ -17,17 +30,13 @@ def get_plans(plan_id: int = None):
     method = get_plans.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}api/plans"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         params = {"id": plan_id}
 
-        response = requests.get(url, headers=headers, params=params)
+        response = treli_client.get(url, params=params, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -78,11 +87,6 @@ def create_plan(
     method = create_plan.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}plans/create"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         data = {
             "name": name,
@@ -97,10 +101,11 @@ def create_plan(
             "subs_plans": subs_plans,
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = treli_client.post(url, json=data, operation=method)
         response.raise_for_status()
+        plans_cache.invalidate()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -128,11 +133,6 @@ def update_plan(
     method = update_plan.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}plans/update"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         data = {
             "id": plan_id,
@@ -140,10 +140,11 @@ def update_plan(
             "subs_plan": subs_plan,
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = treli_client.post(url, json=data, operation=method)
         response.raise_for_status()
+        plans_cache.invalidate()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -151,3 +152,41 @@ def update_plan(
             status_code=status.HTTP_424_FAILED_DEPENDENCY,
             detail=f"{method} error: {error}",
         )
+
+
+async def update_plan_async(
+    plan_id: int = None, subscription_plan_id: int = None, subs_plan: dict = None
+):
+    """
+    Versión asíncrona de `update_plan` para los endpoints `async`.
+
+    :param plan_id: Id del plan.
+    :type plan_id: int
+    :param subscription_plan_id: Id del plan de suscripción.
+    :type subscription_plan_id: int
+    :param subs_plan: Lista de planes de suscripción del plan.
+    :type subs_plan: dict
+    :return: El resultado de la respuesta en formato JSON.
+    """
+    method = update_plan.__name__
+    try:
+        url = f"{Settings.TRELI_URL_BASE}plans/update"
+
+        data = {
+            "id": plan_id,
+            "subscription_plan_id": subscription_plan_id,
+            "subs_plan": subs_plan,
+        }
+
+        response = await treli_client.arequest("POST", url, json=data, operation=method)
+        response.raise_for_status()
+        plans_cache.invalidate()
+
+        return response_json(response)
+
+    except (httpx.HTTPError, requests.exceptions.RequestException) as error:
+        logging.error(f"{method} error {error}")
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail=f"{method} error: {error}",
+        )
@@ -1,9 +1,14 @@
 import logging
 
+import httpx
 import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import treli_client
 from settings import Settings
+from utils.json_codec import response_json
+from utils.pagination import aiter_pages, iter_pages
+from utils.single_flight import coalesce
 
 
 def create_subscription(
@@ -28,11 +33,6 @@ def create_subscription(
     method = create_subscription.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}subscriptions/create"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         data = {
             "email": email,
@@ -41,10 +41,10 @@ def create_subscription(
             "payment": payment,
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = treli_client.post(url, json=data, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -79,11 +79,6 @@ def update_subscription(
     method = update_subscription.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}subscriptions/update"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         data = {
             "subscription_id": subscription_id,
@@ -93,10 +88,10 @@ def update_subscription(
             "payment": payment,
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = treli_client.post(url, json=data, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -106,12 +101,14 @@ def update_subscription(
         )
 
 
+@coalesce
 def list_subscriptions(
     email: str = None,
     date_created: str = None,
     date_range: str = None,
     status_subscription: str = None,
     subscription_id: int = None,
+    page: int = None,
 ):
     """
     Obtiene una lista de suscripciones con posibles filtros.
@@ -127,15 +124,13 @@ def list_subscriptions(
     :type status_subscription: str
     :param subscription_id: Obtén el detalle de una suscripción específica. Este filtro sobrescribe cualquier filtro enviado anteriormente.
     :type subscription_id: int
+    :param page: Página de resultados a obtener. Para recorrer todas las páginas usa `iter_subscriptions`.
+    :type page: int
     :return: El resultado de la respuesta en formato JSON.
     """
     method = list_subscriptions.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}subscriptions/list"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         params = {
             "email": email,
@@ -143,12 +138,13 @@ def list_subscriptions(
             "date_range": date_range,
             "status": status_subscription,
             "subscription_id": subscription_id,
+            "page": page,
         }
 
-        response = requests.get(url, headers=headers, params=params)
+        response = treli_client.get(url, params=params, operation=method, hedge=True)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -158,6 +154,80 @@ def list_subscriptions(
         )
 
 
+async def list_subscriptions_async(
+    email: str = None,
+    date_created: str = None,
+    date_range: str = None,
+    status_subscription: str = None,
+    subscription_id: int = None,
+    page: int = None,
+):
+    """
+    Versión asíncrona de `list_subscriptions` para los endpoints `async`.
+
+    :return: El resultado de la respuesta en formato JSON.
+    """
+    method = list_subscriptions.__name__
+    try:
+        url = f"{Settings.TRELI_URL_BASE}subscriptions/list"
+
+        params = {
+            "email": email,
+            "date_created": date_created,
+            "date_range": date_range,
+            "status": status_subscription,
+            "subscription_id": subscription_id,
+            "page": page,
+        }
+
+        response = await treli_client.arequest(
+            "GET", url, params=params, operation=method
+        )
+        response.raise_for_status()
+
+        return response_json(response)
+
+    except (httpx.HTTPError, requests.exceptions.RequestException) as error:
+        logging.error(f"{method} error {error}")
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail=f"{method} error: {error}",
+        )
+
+
+def iter_subscriptions(prefetch: int = None, **filters):
+    """
+    Recorre todas las páginas de `list_subscriptions` y entrega las suscripciones una a una.
+
+    Las páginas siguientes se descargan en paralelo mientras se consumen las actuales, por lo
+    que la memoria usada no depende del número total de suscripciones.
+
+    :param prefetch: Páginas descargadas por adelantado (por defecto `TRELI_PAGE_PREFETCH`).
+    :type prefetch: int
+    :param filters: Filtros aceptados por `list_subscriptions` (email, status_subscription...).
+    :return: Un generador de suscripciones.
+    """
+    return iter_pages(
+        lambda page: list_subscriptions(page=page, **filters),
+        items_key="subscriptions",
+        prefetch=prefetch,
+    )
+
+
+def aiter_subscriptions(prefetch: int = None, **filters):
+    """
+    Versión asíncrona de `iter_subscriptions`.
+
+    :return: Un iterador asíncrono de suscripciones.
+    """
+    return aiter_pages(
+        lambda page: list_subscriptions_async(page=page, **filters),
+        items_key="subscriptions",
+        prefetch=prefetch,
+    )
+
+
+@coalesce
 def view_subscription(subscription_id: int = None):
     """
     Ver el detalle de la suscripción de un cliente.
@@ -169,18 +239,16 @@ def view_subscription(subscription_id: int = None):
     method = view_subscription.__name__
     try:
         url = f"{Settings.TRELI_URL_BASE}subscriptions/view"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         data = {"subscription_id": subscription_id}
 
-        response = requests.post(url, headers=headers, json=data)
+        # Es una consulta aunque use POST, por lo que puede reintentarse.
+        response = treli_client.post(
+            url, json=data, operation=method, idempotent=True, hedge=True
+        )
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -206,18 +274,13 @@ def subscription_action(subscription_id: int = None, action: str = None):
 
     try:
         url = f"{Settings.TRELI_URL_BASE}subscriptions/actions"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         data = {"subscription_id": subscription_id, "action": action}
 
-        response = requests.post(url, headers=headers, json=data)
+        response = treli_client.post(url, json=data, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -249,11 +312,6 @@ def report_subscription_usage(
 
     try:
         url = f"{Settings.TRELI_URL_BASE}subscriptions/report-usage"
-        headers = {
-            "accept": Settings.APPLICATION_JSON,
-            "content-type": Settings.APPLICATION_JSON,
-            "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
-        }
 
         data = {
             "subscription_id": subscription_id,
@@ -261,10 +319,10 @@ def report_subscription_usage(
             "usage_report": usage_report,
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = treli_client.post(url, json=data, operation=method)
         response.raise_for_status()
 
-        return response.json()
+        return response_json(response)
 
     except requests.exceptions.RequestException as error:
         logging.error(f"{method} error {error}")
@@ -0,0 +1,401 @@
+import asyncio
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from settings import Settings
+from utils import bulkhead, circuit_breaker, deadline, rate_limiter
+from utils.hedging import hedger
+from utils.instrumentation import instrument, record_retry, timed_call
+from utils.retry import (
+    ASYNC_RETRY_EXCEPTIONS,
+    IDEMPOTENT_METHODS,
+    NO_RETRIES,
+    RETRY_EXCEPTIONS,
+    RetryPolicy,
+    acall_with_retries,
+    call_with_retries,
+)
+
+
+class Upstream:
+    """
+    Cliente HTTP compartido para un proveedor externo (Treli, HubSpot, Thinkific, API de usuarios).
+
+    Mantiene una única `requests.Session` por proveedor con un pool de conexiones keep-alive,
+    de forma que las llamadas sucesivas reutilizan la conexión TCP+TLS en lugar de abrir una
+    nueva en cada request. Los headers de autenticación fijos del proveedor se construyen una
+    sola vez y se envían en todas las llamadas.
+
+    Para los endpoints `async` expone además un cliente `httpx.AsyncClient` con el mismo
+    tamaño de pool y los mismos headers, de modo que las llamadas al proveedor no bloqueen
+    el event loop.
+
+    Todas las solicitudes pasan por el limitador de tasa del proveedor, que suaviza las
+    ráfagas y respeta los `Retry-After` recibidos. `operation` identifica el endpoint (el
+    nombre de la función del cliente) para aplicar sus límites propios.
+
+    Las solicitudes idempotentes (GET, PUT, DELETE, o las marcadas con `idempotent=True`) se
+    reintentan ante errores de red y respuestas transitorias con espera exponencial y jitter.
+    Un circuit breaker por proveedor rechaza las solicitudes de inmediato con
+    `CircuitOpenError` mientras el proveedor acumula fallas, en lugar de ocupar hilos
+    esperándolo.
+
+    Ninguna solicitud espera indefinidamente: se aplican los timeouts de conexión y de
+    lectura del proveedor, recortados al tiempo que queda del deadline del procesamiento
+    actual (ver `utils.deadline`).
+
+    Las llamadas síncronas ocupan un turno del compartimento (bulkhead) del proveedor durante
+    toda la llamada, incluidos reintentos y esperas: si el proveedor se vuelve lento, solo
+    `<PROVEEDOR>_BULKHEAD` hilos quedan bloqueados en él y el resto falla de inmediato con
+    `BulkheadFull`, sin agotar el pool de hilos compartido por los demás endpoints. Las
+    llamadas asíncronas no ocupan hilos y las limita el pool de conexiones de `httpx`.
+
+    Cada intento se instrumenta (ver `utils.instrumentation`): latencia, código de estado,
+    tamaño de la respuesta y reintentos quedan en `/metrics` por proveedor y operación.
+
+    Atributos:
+        name (str): Nombre del proveedor, usado en logs y métricas.
+        session (requests.Session): Sesión con el pool de conexiones del proveedor.
+        rate_limiter (RateLimiter): Limitador de tasa del proveedor.
+        retry_policy (RetryPolicy): Política de reintentos de las solicitudes idempotentes.
+        circuit_breaker (CircuitBreaker): Circuit breaker del proveedor.
+        bulkhead (Bulkhead): Compartimento que limita las llamadas síncronas simultáneas.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pool_size: int,
+        headers: dict = None,
+        rate: float = 0,
+        burst: int = 1,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        max_concurrent: int = 0,
+    ):
+        self.name = name
+        self.pool_size = pool_size
+        self.timeout = (
+            connect_timeout or Settings.HTTP_CONNECT_TIMEOUT,
+            read_timeout or Settings.HTTP_READ_TIMEOUT,
+        )
+        self.rate_limiter = rate_limiter.register(
+            rate_limiter.RateLimiter(
+                name,
+                rate=rate,
+                burst=burst,
+                endpoints=rate_limiter.endpoint_limits(
+                    Settings.RATE_LIMIT_ENDPOINTS, name
+                ),
+                max_wait=Settings.RATE_LIMIT_MAX_WAIT,
+            )
+        )
+        self.retry_policy = RetryPolicy(
+            retries=Settings.HTTP_RETRIES,
+            base_delay=Settings.HTTP_RETRY_BACKOFF,
+            max_delay=Settings.HTTP_RETRY_MAX_BACKOFF,
+        )
+        self.circuit_breaker = circuit_breaker.register(
+            circuit_breaker.CircuitBreaker(
+                name,
+                failure_threshold=Settings.CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=Settings.CIRCUIT_RECOVERY_TIMEOUT,
+            )
+        )
+        self.bulkhead = bulkhead.register(
+            bulkhead.Bulkhead(
+                name,
+                max_concurrent=max_concurrent,
+                max_wait=Settings.BULKHEAD_MAX_WAIT,
+            )
+        )
+        self.session = requests.Session()
+        # Un cliente asíncrono por event loop: un cliente `httpx` no puede usarse ni
+        # cerrarse desde un loop distinto al que abrió sus conexiones.
+        self._async_clients = {}
+        self._async_lock = threading.Lock()
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.session.headers.update(headers or {})
+        if not Settings.HTTP_KEEP_ALIVE:
+            self.session.headers["Connection"] = "close"
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        operation: str = None,
+        idempotent: bool = None,
+        retry_policy: RetryPolicy = None,
+        hedge: bool = False,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Ejecuta una solicitud HTTP sobre la sesión del proveedor.
+
+        Args:
+            method (str): Método HTTP (GET, POST, PUT, PATCH, DELETE).
+            url (str): URL completa de la solicitud.
+            operation (str, opcional): Nombre de la operación, usado para límites y métricas.
+            idempotent (bool, opcional): Si la solicitud puede reintentarse. Por defecto se
+                                         deduce del método HTTP.
+            retry_policy (RetryPolicy, opcional): Política de reintentos propia de la operación.
+            hedge (bool): Si es True y `HEDGE_REQUESTS` está activo, una solicitud lenta se
+                          duplica (ver `utils.hedging`). Solo para lecturas idempotentes.
+            **kwargs: Argumentos adicionales aceptados por `requests.Session.request`. Si no
+                      se indica `timeout`, se usa el del proveedor.
+
+        Returns:
+            requests.Response: La respuesta del proveedor.
+
+        Raises:
+            RateLimitExceeded: Si el turno del limitador tarda más de `RATE_LIMIT_MAX_WAIT`.
+            CircuitOpenError: Si el circuito del proveedor está abierto.
+            DeadlineExceeded: Si el deadline del procesamiento actual ya venció.
+            BulkheadFull: Si el compartimento del proveedor sigue lleno tras
+                          `BULKHEAD_MAX_WAIT` segundos.
+        """
+        policy = self._retry_policy(method, idempotent, retry_policy)
+
+        def send():
+            return call_with_retries(
+                lambda: self._send(method, url, operation, **kwargs),
+                policy,
+                name=f"{self.name} {operation}",
+                on_retry=lambda reason: record_retry(self.name, operation, reason),
+            )
+
+        with self.bulkhead.slot(), timed_call(self.name, operation):
+            # Solo se duplican las solicitudes idempotentes (las que tienen reintentos).
+            if hedge and policy is not NO_RETRIES:
+                return hedger.call(self.name, operation, send)
+            return send()
+
+    def _timeout(self, timeout=None) -> tuple:
+        """
+        Timeout (connect, read) de la solicitud, recortado al deadline actual.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        elif not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        return deadline.cap_timeout(timeout)
+
+    def _send(self, method: str, url: str, operation: str, **kwargs):
+        deadline.check(operation)
+        kwargs["timeout"] = self._timeout(kwargs.get("timeout"))
+        self.circuit_breaker.before_call()
+        try:
+            self.rate_limiter.acquire(operation, max_wait=deadline.remaining())
+            with instrument(self.name, operation) as call:
+                response = call.response = self.session.request(method, url, **kwargs)
+        except RETRY_EXCEPTIONS:
+            self.circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            self.circuit_breaker.release()
+            raise
+        self._record_response(operation, response)
+        return response
+
+    def _record_response(self, operation: str, response):
+        self.rate_limiter.observe(operation, response)
+        if response.status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
+    def _retry_policy(
+        self, method: str, idempotent: bool, retry_policy: RetryPolicy
+    ) -> RetryPolicy:
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        if not idempotent:
+            return NO_RETRIES
+        return retry_policy or self.retry_policy
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Cliente asíncrono del proveedor, creado la primera vez que se usa en el event loop actual.
+
+        Los clientes de otros loops que siguen abiertos se conservan hasta que ese loop llame a
+        `aclose`; los de loops ya cerrados se descartan, porque sus conexiones ya no pueden
+        cerrarse desde otro loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                for other in [
+                    other for other in self._async_clients if other.is_closed()
+                ]:
+                    del self._async_clients[other]
+                keep_alive = self.pool_size if Settings.HTTP_KEEP_ALIVE else 0
+                client = self._async_clients[loop] = httpx.AsyncClient(
+                    headers={
+                        k: v for k, v in self.session.headers.items() if v is not None
+                    },
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=keep_alive,
+                    ),
+                )
+        return client
+
+    async def arequest(
+        self,
+        method: str,
+        url: str,
+        operation: str = None,
+        idempotent: bool = None,
+        retry_policy: RetryPolicy = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Ejecuta una solicitud HTTP asíncrona sobre el cliente `httpx` del proveedor.
+
+        Los parámetros de query con valor `None` se descartan, igual que hace `requests`.
+        Aplica el mismo limitador de tasa, reintentos y circuit breaker que `request`.
+
+        Args:
+            method (str): Método HTTP (GET, POST, PUT, PATCH, DELETE).
+            url (str): URL completa de la solicitud.
+            operation (str, opcional): Nombre de la operación, usado para límites y métricas.
+            idempotent (bool, opcional): Si la solicitud puede reintentarse. Por defecto se
+                                         deduce del método HTTP.
+            retry_policy (RetryPolicy, opcional): Política de reintentos propia de la operación.
+            **kwargs: Argumentos adicionales aceptados por `httpx.AsyncClient.request`.
+
+        Returns:
+            httpx.Response: La respuesta del proveedor.
+        """
+        if kwargs.get("params"):
+            kwargs["params"] = {
+                key: value
+                for key, value in kwargs["params"].items()
+                if value is not None
+            }
+        with timed_call(self.name, operation):
+            return await acall_with_retries(
+                lambda: self._asend(method, url, operation, **kwargs),
+                self._retry_policy(method, idempotent, retry_policy),
+                name=f"{self.name} {operation}",
+                on_retry=lambda reason: record_retry(self.name, operation, reason),
+            )
+
+    async def _asend(self, method: str, url: str, operation: str, **kwargs):
+        deadline.check(operation)
+        connect, read = self._timeout(kwargs.get("timeout"))
+        kwargs["timeout"] = httpx.Timeout(read, connect=connect, pool=connect)
+        self.circuit_breaker.before_call()
+        try:
+            await self.rate_limiter.acquire_async(
+                operation, max_wait=deadline.remaining()
+            )
+            with instrument(self.name, operation) as call:
+                response = call.response = await self.async_client.request(
+                    method, url, **kwargs
+                )
+        except ASYNC_RETRY_EXCEPTIONS:
+            self.circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            self.circuit_breaker.release()
+            raise
+        self._record_response(operation, response)
+        return response
+
+    async def aclose(self):
+        """
+        Cierra el cliente asíncrono del event loop actual y libera sus conexiones.
+        """
+        with self._async_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+treli_client = Upstream(
+    "treli",
+    pool_size=Settings.TRELI_POOL_SIZE,
+    rate=Settings.TRELI_RATE_LIMIT,
+    burst=Settings.TRELI_RATE_BURST,
+    connect_timeout=Settings.TRELI_CONNECT_TIMEOUT,
+    read_timeout=Settings.TRELI_READ_TIMEOUT,
+    max_concurrent=Settings.TRELI_BULKHEAD,
+    headers={
+        "accept": Settings.APPLICATION_JSON,
+        "Authorization": f"Basic {Settings.USER_TRELI_AUTHENTICATION}",
+    },
+)
+
+hubspot_client = Upstream(
+    "hubspot",
+    pool_size=Settings.HUBSPOT_POOL_SIZE,
+    rate=Settings.HUBSPOT_RATE_LIMIT,
+    burst=Settings.HUBSPOT_RATE_BURST,
+    connect_timeout=Settings.HUBSPOT_CONNECT_TIMEOUT,
+    read_timeout=Settings.HUBSPOT_READ_TIMEOUT,
+    max_concurrent=Settings.HUBSPOT_BULKHEAD,
+    headers={
+        "content-type": Settings.APPLICATION_JSON,
+        "authorization": f"Bearer {Settings.HUBSPOT_ACCESS_TOKEN}",
+    },
+)
+
+thinkific_client = Upstream(
+    "thinkific",
+    pool_size=Settings.THINKIFIC_POOL_SIZE,
+    rate=Settings.THINKIFIC_RATE_LIMIT,
+    burst=Settings.THINKIFIC_RATE_BURST,
+    connect_timeout=Settings.THINKIFIC_CONNECT_TIMEOUT,
+    read_timeout=Settings.THINKIFIC_READ_TIMEOUT,
+    max_concurrent=Settings.THINKIFIC_BULKHEAD,
+    headers={
+        "X-Auth-API-Key": Settings.API_KEY_THINKIFIC,
+        "X-Auth-Subdomain": Settings.SUBDOMAIN,
+        "Content-Type": Settings.APPLICATION_JSON,
+    },
+)
+
+# La autenticación del API de usuarios usa un token de cuenta de servicio que se
+# genera por llamada, por lo que no se incluye en los headers de la sesión.
+users_api_client = Upstream(
+    "users_api",
+    pool_size=Settings.USERS_API_POOL_SIZE,
+    rate=Settings.USERS_API_RATE_LIMIT,
+    burst=Settings.USERS_API_RATE_BURST,
+    connect_timeout=Settings.USERS_API_CONNECT_TIMEOUT,
+    read_timeout=Settings.USERS_API_READ_TIMEOUT,
+    max_concurrent=Settings.USERS_API_BULKHEAD,
+)
+
+
+async def close_async_clients():
+    """
+    Cierra los clientes asíncronos de todos los proveedores. Se invoca al apagar la aplicación.
+    """
+    for client in (treli_client, hubspot_client, thinkific_client, users_api_client):
+        await client.aclose()
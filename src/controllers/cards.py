@@ -46,7 +46,7 @@ async def add_card_token_endpoint(gateway: str = None, token_info: dict = None):
             'message': 'Token de tarjeta agregado exitosamente.'
         }
     """
-    return cards.add_card_token(gateway, token_info)
+    return await cards.add_card_token_async(gateway, token_info)
 
 
 @router.get("/get_tokens/")
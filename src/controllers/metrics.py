@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from utils import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Expone las métricas del servicio en el formato de texto de Prometheus.
+
+    Incluye, entre otras, la utilización del limitador de tasa de cada proveedor
+    (`upstream_rate_limit_utilization`) y las respuestas que pidieron reducir la tasa
+    (`upstream_rate_limited_total`).
+
+    Returns:
+        str: Métricas en formato de exposición de Prometheus.
+    """
+    return metrics.render_prometheus()
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from clients.treli import pagos
+from utils.json_codec import FastJSONResponse
 
 router = APIRouter(tags=["Treli Pagos"])
 
@@ -221,12 +222,15 @@ def get_payments_endpoint(
             'message': 'No se encontraron pagos con los criterios de búsqueda proporcionados.'
         }
     """
-    return pagos.get_payments(
-        email=email,
-        date_created=date_created,
-        date_range=date_range,
-        subscription_id=subscription_id,
-        payment_id=payment_id,
+    # El cuerpo de Treli ya es JSON nativo: se serializa directamente sin `jsonable_encoder`.
+    return FastJSONResponse(
+        pagos.get_payments(
+            email=email,
+            date_created=date_created,
+            date_range=date_range,
+            subscription_id=subscription_id,
+            payment_id=payment_id,
+        )
     )
 
 
@@ -0,0 +1,39 @@
+from datetime import date
+
+from fastapi import APIRouter
+
+from services.daily_payment_stats import aggregate_range
+
+router = APIRouter(tags=["Payment stats"])
+
+
+@router.post("/jobs/daily_payment_stats/")
+def daily_payment_stats_job(
+    start_date: date = None, end_date: date = None, workers: int = None
+):
+    """
+    Recalcula los agregados diarios de pagos en la tabla "daily_payment_stats".
+
+    Este endpoint está pensado para ser invocado por un job programado (por ejemplo, Cloud
+    Scheduler una vez al día sin parámetros, lo que recalcula el día anterior). También
+    puede invocarse manualmente con un rango de fechas para reprocesar días anteriores;
+    la operación es idempotente, por lo que volver a ejecutar un rango no duplica datos.
+
+    Parameters:
+        start_date (date, optional): Primer día a recalcular (YYYY-MM-DD). Por defecto es el día anterior.
+        end_date (date, optional): Último día a recalcular (incluido). Por defecto es `start_date`.
+        workers (int, optional): Número de días a procesar en paralelo.
+
+    Returns:
+        list: Lista con el número de grupos escritos por cada día.
+
+    Example:
+        POST /jobs/daily_payment_stats/?start_date=2023-07-01&end_date=2023-07-31&workers=4
+
+        [
+            {"stats_date": "2023-07-01", "rows": 12},
+            {"stats_date": "2023-07-02", "rows": 9},
+            ...
+        ]
+    """
+    return aggregate_range(start_date=start_date, end_date=end_date, workers=workers)
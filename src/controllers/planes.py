@@ -207,7 +207,7 @@ async def update_plan_endpoint(
             'message': 'Plan actualizado exitosamente.'
         }
     """
-    return planes.update_plan(
+    return await planes.update_plan_async(
         plan_id=plan_id,
         subscription_plan_id=subscription_plan_id,
         subs_plan=subs_plan,
@@ -2,6 +2,7 @@ from fastapi import APIRouter, status
 
 from clients.treli import suscripción
 from services.user_subscriptions import read_user_status_subscription
+from utils.json_codec import FastJSONResponse
 
 router = APIRouter(tags=["Treli Suscripcion"])
 
@@ -227,12 +228,15 @@ def list_subscriptions_endpoint(
             'message': 'No se encontraron suscripciones con los criterios de búsqueda proporcionados.'
         }
     """
-    return suscripción.list_subscriptions(
-        email=email,
-        date_created=date_created,
-        date_range=date_range,
-        status_subscription=status_subscription,
-        subscription_id=subscription_id,
+    # El cuerpo de Treli ya es JSON nativo: se serializa directamente sin `jsonable_encoder`.
+    return FastJSONResponse(
+        suscripción.list_subscriptions(
+            email=email,
+            date_created=date_created,
+            date_range=date_range,
+            status_subscription=status_subscription,
+            subscription_id=subscription_id,
+        )
     )
 
 
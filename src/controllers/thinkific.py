@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+
+from clients import thinkific
+
+router = APIRouter(tags=["Thinkific"])
+
+
+@router.post("/thinkific/courses/refresh/")
+def refresh_courses_endpoint():
+    """
+    Recarga desde Thinkific la lista de cursos en los que se inscribe a los usuarios Hunty Pro.
+
+    La lista de cursos se guarda en caché durante `THINKIFIC_COURSES_CACHE_TTL` segundos. Este
+    endpoint permite forzar la recarga, por ejemplo después de crear o publicar un curso nuevo.
+
+    Returns:
+        dict: Un diccionario con los IDs de los cursos encontrados.
+
+    Example:
+        Si se hace una solicitud POST a '/thinkific/courses/refresh/', la respuesta podría ser:
+
+        {
+            'courses': [1877933, 2392657, 1865681]
+        }
+    """
+    return {"courses": thinkific.refresh_courses()}
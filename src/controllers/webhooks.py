@@ -1,84 +1,70 @@
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, Response, status
+from fastapi.concurrency import run_in_threadpool
 
-from services import process_payment, process_subscription
-from utils.list_product import plazos
+from services import webhook_inbox
 from utils.webhooks_example import schema_extra
 
 router = APIRouter(tags=["Treli webhooks"])
 
 
-@router.post("/treli/webhooks")
+@router.post("/treli/webhooks", status_code=status.HTTP_202_ACCEPTED)
 async def treli_webhooks(
-    background_tasks: BackgroundTasks, payment: dict = schema_extra, test: bool = None
+    response: Response, payment: dict = schema_extra, test: bool = None
 ):
     """
-    Procesa los webhooks enviados por Treli.
+    Recibe los webhooks enviados por Treli.
 
-    Esta función toma una lista de datos (webhooks) enviados por Treli y agrega una tarea a la cola de background_tasks
-    para procesar los eventos asincrónicamente.
+    El evento se guarda en el inbox de webhooks ("users_payments.webhook_inbox") y se
+    responde 202 de inmediato; los workers de `services.webhook_inbox` lo procesan después.
+    Como el evento queda guardado antes de responder, no se pierde si la instancia se
+    reinicia mientras se procesa, y el tiempo de respuesta no depende de los proveedores.
+
+    Los reenvíos de un evento ya recibido (mismo tipo, pago o suscripción y `occurred_at`)
+    se responden con 202 y `"duplicate": true` sin volver a procesarse. Los que esta
+    instancia ya conoce se descartan en memoria, sin pasar por el pool de hilos.
 
     Parameters:
-        payment (dict): datos que contiene los webhooks enviados por Treli.
-        background_tasks (BackgroundTasks): Una instancia de la clase BackgroundTasks que permite agregar tareas a la cola
-                                            de procesamiento en segundo plano.
-        test
+        payment (dict): datos que contiene el webhook enviado por Treli.
+        test (bool, optional): Si es True, el evento se procesa en la misma solicitud (sin
+                               pasar por el inbox) y se retorna el resultado con código 200.
 
     Returns:
-        str: Un mensaje de confirmación de que los webhooks han sido recibidos y se procesarán asincrónicamente.
+        dict: El ID del evento en el inbox (None si es un duplicado), o el resultado del
+              procesamiento si `test` es True.
 
     Example:
         Un ejemplo de solicitud POST a '/treli/webhooks' podría ser:
 
-        [
-            {
-                "event_type": "payment_approved",
-                "data": {
-                    "payment_id": 12345,
-                    "amount": 29.99,
-                    "status": "approved"
-                }
-            },
-            {
-                "event_type": "payment_pending",
-                "data": {
-                    "payment_id": 67890,
-                    "amount": 19.99,
-                    "status": "pending"
-                }
-            }
-        ]
-
-        Si se reciben webhooks con eventos de pago aprobados y pendientes, se agregarán las tareas a la cola de background_tasks
-        para procesarlos asincrónicamente y la respuesta será:
-
-        "Los webhooks han sido recibidos y se procesarán asincrónicamente."
+        {
+            "event_type": "payment_approved",
+            "content": {...}
+        }
+
+        Respuesta (202):
+
+        {
+            "message": "Los webhooks han sido recibidos y se procesarán asincrónicamente.",
+            "webhook_inbox_id": 12345,
+            "duplicate": false
+        }
+
+    Raises:
+        HTTPException: 424 si el evento no pudo guardarse; Treli reintentará el envío.
 
     Note:
         Esta función asume que los webhooks enviados por Treli tienen la estructura adecuada. Se recomienda verificar la
         documentación de Treli para asegurarse de que los datos recibidos sean los esperados.
     """
-    relevant_events = {"payment_approved", "payment_failed"}
-    event_type = payment.get("event_type")
-    product_name = (
-        payment.get("content", {})
-        .get("items", [{}])[0]
-        .get("name", "Nombre del producto no encontrado")
-    )
-
-    if event_type in relevant_events and product_name in plazos:
-        if test:
-            result = process_payment.process_payment(payment)
-        else:
-            background_tasks.add_task(process_payment.process_payment, payment)
-            result = "Los webhooks han sido recibidos y se procesarán asincrónicamente."
-    else:
-        if test:
-            result = process_subscription.subscription(payment)
-        else:
-            background_tasks.add_task(process_subscription.subscription(payment))
-            result = "Los webhooks han sido recibidos y se procesarán asincrónicamente."
-
-    if result is not None:
-        return result
-    else:
-        return "Los webhooks han sido recibidos pero no se encontraron eventos relevantes para procesar."
+    if test:
+        response.status_code = status.HTTP_200_OK
+        return await run_in_threadpool(webhook_inbox.dispatch_event, payment)
+
+    event_id = None
+    if not webhook_inbox.seen_recently(payment):
+        event_id = await run_in_threadpool(webhook_inbox.enqueue_event, payment)
+
+    return {
+        "message": "Los webhooks han sido recibidos y se procesarán asincrónicamente.",
+        "webhook_inbox_id": event_id,
+        "duplicate": event_id is None,
+    }
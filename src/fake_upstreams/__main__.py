@@ -0,0 +1,119 @@
+"""
+Levanta servidores falsos de Treli, HubSpot, Thinkific y el API de usuarios para pruebas
+de carga locales, sin llamar a los proveedores reales.
+
+Cada proveedor corre en su propio puerto (a partir de `--port`) con la latencia, la tasa de
+errores y el límite de tasa indicados. Los valores pueden ajustarse por proveedor con las
+variables `FAKE_<PROVEEDOR>_LATENCY`, `_JITTER`, `_ERROR_RATE`, `_RATE_LIMIT` y
+`_RATE_BURST` (por ejemplo `FAKE_HUBSPOT_RATE_LIMIT=10`). Al iniciar se imprimen las
+variables de entorno que apuntan `Settings` a los servidores falsos.
+
+Uso (desde `src/`):
+
+    python -m fake_upstreams --latency 0.08 --jitter 0.04 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+
+import uvicorn
+
+from fake_upstreams import hubspot, thinkific, treli, users_api
+from fake_upstreams.faults import FaultConfig, install_faults
+
+# (nombre, aplicación, variables de `Settings` -> ruta base)
+UPSTREAMS = [
+    ("treli", treli.app, {"TRELI_URL_BASE": "/"}),
+    (
+        "hubspot",
+        hubspot.app,
+        {"HUBSPOT_URL": "/contacts/v1/", "HUBSPOT_URL_V3": "/crm/v3/"},
+    ),
+    ("thinkific", thinkific.app, {"URL_BASE_THINKIFIC": thinkific.PREFIX}),
+    (
+        "users_api",
+        users_api.app,
+        {
+            "BASE_URL": "/",
+            "USERS_RAW_URL": "/",
+            "USERS_API_COMPOSITE_STATUS_URL": "/user/master/status",
+        },
+    ),
+]
+
+
+class _Server(uvicorn.Server):
+    # Las señales se manejan una sola vez para todos los servidores en `main`.
+    def install_signal_handlers(self):
+        pass
+
+
+def settings_env(host: str, port: int) -> dict:
+    """
+    Variables de entorno que apuntan los clientes del servicio a los servidores falsos.
+    """
+    env = {"MACHINE": "DEV"}
+    for offset, (_, _, urls) in enumerate(UPSTREAMS):
+        for name, path in urls.items():
+            env[name] = f"http://{host}:{port + offset}{path}"
+    return env
+
+
+async def serve(servers: list):
+    try:
+        await asyncio.gather(*(server.serve() for server in servers))
+    finally:
+        for server in servers:
+            server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit", type=float, default=0)
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    defaults = FaultConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+    )
+    servers = []
+    for offset, (name, app, _) in enumerate(UPSTREAMS):
+        config = FaultConfig.from_env(name, defaults)
+        install_faults(app, config)
+        servers.append(
+            _Server(
+                uvicorn.Config(
+                    app,
+                    host=args.host,
+                    port=args.port + offset,
+                    log_level=args.log_level,
+                )
+            )
+        )
+        print(
+            f"# {name}: port {args.port + offset}, latency {config.latency}s "
+            f"+/- {config.jitter}s, error rate {config.error_rate}, "
+            f"rate limit {config.rate_limit or 'none'}"
+        )
+
+    for name, value in settings_env(args.host, args.port).items():
+        print(f"export {name}={value}")
+
+    try:
+        asyncio.run(serve(servers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
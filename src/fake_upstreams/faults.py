@@ -0,0 +1,100 @@
+import asyncio
+import os
+import random
+import time
+
+from fastapi.responses import JSONResponse
+
+
+class FaultConfig:
+    """
+    Comportamiento simulado de un proveedor falso.
+
+    Atributos:
+        latency (float): Latencia media agregada a cada respuesta, en segundos.
+        jitter (float): Variación máxima (+/-) de la latencia, en segundos.
+        error_rate (float): Fracción de solicitudes (0 a 1) que responden 503.
+        rate_limit (float): Solicitudes por segundo aceptadas antes de responder 429 con
+                            `Retry-After`; 0 desactiva el límite.
+        burst (int): Solicitudes que pueden llegar juntas sin superar `rate_limit`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0,
+        jitter: float = 0,
+        error_rate: float = 0,
+        rate_limit: float = 0,
+        burst: int = 1,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = max(burst, 1)
+
+    @classmethod
+    def from_env(cls, name: str, defaults: "FaultConfig") -> "FaultConfig":
+        """
+        Crea la configuración del proveedor `name` a partir de `defaults`, aplicando las
+        variables de entorno `FAKE_<NAME>_LATENCY`, `_JITTER`, `_ERROR_RATE`, `_RATE_LIMIT`
+        y `_RATE_BURST` si existen.
+        """
+        prefix = f"FAKE_{name.upper()}_"
+        return cls(
+            latency=float(os.getenv(f"{prefix}LATENCY", defaults.latency)),
+            jitter=float(os.getenv(f"{prefix}JITTER", defaults.jitter)),
+            error_rate=float(os.getenv(f"{prefix}ERROR_RATE", defaults.error_rate)),
+            rate_limit=float(os.getenv(f"{prefix}RATE_LIMIT", defaults.rate_limit)),
+            burst=int(os.getenv(f"{prefix}RATE_BURST", defaults.burst)),
+        )
+
+    def delay(self) -> float:
+        return max(self.latency + random.uniform(-self.jitter, self.jitter), 0)
+
+
+class _Bucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Consume un turno. Retorna 0 si se concedió o los segundos hasta el siguiente turno.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+def install_faults(app, config: FaultConfig):
+    """
+    Agrega a `app` un middleware que simula la latencia, los errores y el límite de tasa
+    de un proveedor real según `config`.
+
+    El límite de tasa se evalúa antes de la latencia, como lo haría un gateway: las
+    solicitudes rechazadas responden 429 de inmediato con `Retry-After`.
+    """
+    bucket = _Bucket(config.rate_limit, config.burst) if config.rate_limit else None
+    app.state.faults = config
+
+    @app.middleware("http")
+    async def faults(request, call_next):
+        if bucket is not None:
+            retry_after = bucket.take()
+            if retry_after:
+                return JSONResponse(
+                    {"message": "Too many requests"},
+                    status_code=429,
+                    headers={"Retry-After": f"{retry_after:.3f}"},
+                )
+        await asyncio.sleep(config.delay())
+        if config.error_rate and random.random() < config.error_rate:
+            return JSONResponse({"message": "Service unavailable"}, status_code=503)
+        return await call_next(request)
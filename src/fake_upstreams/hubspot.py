@@ -0,0 +1,69 @@
+import itertools
+
+from fastapi import Body, FastAPI, Response
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake HubSpot")
+
+# email -> contacto, en memoria mientras corre el servidor.
+_contacts = {}
+_ids = itertools.count(1000)
+
+
+def _upsert(email: str, properties: dict) -> dict:
+    contact = _contacts.get(email)
+    if contact is None:
+        contact = _contacts[email] = {"id": str(next(_ids)), "properties": {}}
+    contact["properties"].update(properties, email=email)
+    return contact
+
+
+def _by_id(contact_id: str):
+    return next((c for c in _contacts.values() if c["id"] == contact_id), None)
+
+
+@app.get("/contacts/v1/contact/email/{email}/profile")
+def get_contact_by_email(email: str):
+    contact = _contacts.get(email)
+    if contact is None:
+        return JSONResponse(
+            {"status": "error", "message": "contact does not exist"}, status_code=404
+        )
+    return {
+        "vid": int(contact["id"]),
+        "properties": {
+            name: {"value": value} for name, value in contact["properties"].items()
+        },
+    }
+
+
+@app.post("/crm/v3/objects/contacts", status_code=201)
+def create_contact(data: dict = Body(...)):
+    properties = data.get("properties") or {}
+    return _upsert(properties.get("email"), properties)
+
+
+@app.patch("/crm/v3/objects/contacts/{contact_id}")
+def update_contact(contact_id: str, data: dict = Body(...)):
+    contact = _by_id(contact_id)
+    if contact is None:
+        return JSONResponse({"status": "error"}, status_code=404)
+    contact["properties"].update(data.get("properties") or {})
+    return contact
+
+
+@app.post("/crm/v3/objects/contacts/batch/upsert")
+def batch_upsert_contacts(data: dict = Body(...)):
+    results = [
+        _upsert(item["id"], item.get("properties") or {})
+        for item in data.get("inputs", [])
+    ]
+    return {"status": "COMPLETE", "results": results}
+
+
+@app.delete("/crm/v3/objects/contacts/{contact_id}", status_code=204)
+def delete_contact(contact_id: str):
+    contact = _by_id(contact_id)
+    if contact is not None:
+        del _contacts[contact["properties"]["email"]]
+    return Response(status_code=204)
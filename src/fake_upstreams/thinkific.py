@@ -0,0 +1,87 @@
+import itertools
+from datetime import datetime
+
+from fastapi import Body, FastAPI, Query
+from fastapi.responses import JSONResponse
+
+from utils.list_courses import ids_name_courses
+
+app = FastAPI(title="Fake Thinkific")
+
+PREFIX = "/api/public/v1"
+
+# Catálogo: los cursos que inscribe el servicio más otros que no usa.
+_courses = [
+    {"id": course_id, "name": f"Curso {course_id}"} for course_id in ids_name_courses
+]
+_courses += [{"id": 10 + i, "name": f"Otro curso {i}"} for i in range(40)]
+
+# email -> id del usuario en Thinkific.
+_users = {}
+# id del usuario -> ids de los cursos inscritos.
+_enrollments = {}
+_ids = itertools.count(50000)
+
+
+@app.post(f"{PREFIX}/users", status_code=201)
+def create_user(data: dict = Body(...)):
+    email = data.get("email")
+    if email in _users:
+        return JSONResponse(
+            {"errors": {"email": ["has already been taken"]}}, status_code=422
+        )
+    _users[email] = next(_ids)
+    return {"id": _users[email], **data}
+
+
+@app.get(f"{PREFIX}/users")
+def list_users(query_email: str = Query(None, alias="query[email]")):
+    if query_email in _users:
+        items = [{"id": _users[query_email], "email": query_email}]
+    else:
+        items = []
+    return {"items": items, "meta": {"pagination": {"next_page": None}}}
+
+
+@app.get(f"{PREFIX}/courses")
+def get_courses(page: int = 1, limit: int = 25):
+    start = (max(page, 1) - 1) * limit
+    next_page = page + 1 if start + limit < len(_courses) else None
+    return {
+        "items": _courses[start : start + limit],
+        "meta": {
+            "pagination": {
+                "current_page": page,
+                "next_page": next_page,
+                "total_items": len(_courses),
+            }
+        },
+    }
+
+
+@app.get(f"{PREFIX}/enrollments")
+def list_enrollments(
+    user_id: int = Query(None, alias="query[user_id]"), page: int = 1, limit: int = 25
+):
+    course_ids = sorted(_enrollments.get(user_id, ()))
+    start = (max(page, 1) - 1) * limit
+    next_page = page + 1 if start + limit < len(course_ids) else None
+    return {
+        "items": [
+            {"user_id": user_id, "course_id": course_id}
+            for course_id in course_ids[start : start + limit]
+        ],
+        "meta": {"pagination": {"current_page": page, "next_page": next_page}},
+    }
+
+
+@app.post(f"{PREFIX}/enrollments", status_code=201)
+def enroll_user(data: dict = Body(...)):
+    _enrollments.setdefault(data.get("user_id"), set()).add(data.get("course_id"))
+    return {
+        "id": next(_ids),
+        "user_id": data.get("user_id"),
+        "course_id": data.get("course_id"),
+        "activated_at": data.get("activated_at"),
+        "created_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
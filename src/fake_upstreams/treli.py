@@ -0,0 +1,151 @@
+import itertools
+import math
+import os
+
+from fastapi import Body, FastAPI
+
+# Tamaño de los listados simulados de pagos y suscripciones.
+ITEMS = int(os.getenv("FAKE_TRELI_ITEMS", 500))
+PAGE_SIZE = int(os.getenv("FAKE_TRELI_PAGE_SIZE", 50))
+
+app = FastAPI(title="Fake Treli")
+_ids = itertools.count(900000)
+
+
+def _billing(email: str) -> dict:
+    return {
+        "first_name": "Nombre",
+        "last_name": "Apellido",
+        "email": email,
+        "city": "Bogotá",
+        "country": "CO",
+        "phone": "3000000000",
+    }
+
+
+def _payment(index: int, email: str = None) -> dict:
+    email = email or f"cliente{index}@example.com"
+    return {
+        "payment_id": 100000 + index,
+        "subscription_id": 5000 + index,
+        "email": email,
+        "status": "approved" if index % 5 else "failed",
+        "currency": "COP",
+        "payment_method": "card",
+        "totals": {"sub_total": 49900.0, "discounts": 0, "total": 49900.0},
+        "items": [{"name": "Hunty Pro Mensual", "quantity": 1}],
+        "billing_address": _billing(email),
+        "date_created": "2023-07-21T10:00:00",
+    }
+
+
+def _subscription(index: int, email: str = None) -> dict:
+    email = email or f"cliente{index}@example.com"
+    return {
+        "subscription_id": 5000 + index,
+        "email": email,
+        "status": "active" if index % 7 else "cancelled",
+        "billing_period": "month",
+        "billing_interval": 1,
+        "next_payment": "2023-08-21T10:00:00",
+        "totals": {"sub_total": 49900.0, "discounts": 0, "total": 49900.0},
+        "items": [{"name": "Hunty Pro Mensual", "quantity": 1}],
+        "billing_address": _billing(email),
+        "date_created": "2023-07-21T10:00:00",
+    }
+
+
+def _page(build, key: str, page: int, item_id: int, email: str) -> dict:
+    """
+    Página `page` del listado simulado. Un id o un email filtran a un único elemento.
+    """
+    if item_id is not None:
+        items = [build(int(item_id) % 100000, email)]
+        total_pages = 1
+    elif email is not None:
+        items = [build(0, email)]
+        total_pages = 1
+    else:
+        page = max(page or 1, 1)
+        start = (page - 1) * PAGE_SIZE
+        items = [build(i) for i in range(start, min(start + PAGE_SIZE, ITEMS))]
+        total_pages = math.ceil(ITEMS / PAGE_SIZE)
+    return {"success": True, key: items, "total_pages": total_pages}
+
+
+@app.get("/payments")
+def get_payments(
+    email: str = None,
+    subscription_id: int = None,
+    payment_id: int = None,
+    page: int = None,
+):
+    return _page(_payment, "payments", page, payment_id or subscription_id, email)
+
+
+@app.post("/payments/create")
+def create_payment(data: dict = Body(...)):
+    return {"success": True, "payment_id": next(_ids), "status": "approved"}
+
+
+@app.post("/payments/update-status")
+def update_payment_status(data: dict = Body(...)):
+    return {"success": True, "payment_id": data.get("payment_id")}
+
+
+@app.get("/payments/templates")
+def get_payment_templates():
+    return {"success": True, "templates": [{"id": "tpl_1", "name": "Mensual"}]}
+
+
+@app.get("/subscriptions/list")
+def list_subscriptions(
+    email: str = None, subscription_id: int = None, page: int = None
+):
+    return _page(_subscription, "subscriptions", page, subscription_id, email)
+
+
+@app.post("/subscriptions/view")
+def view_subscription(data: dict = Body(...)):
+    subscription_id = int(data.get("subscription_id") or 5000)
+    return {"success": True, **_subscription(subscription_id % 100000)}
+
+
+@app.post("/subscriptions/create")
+@app.post("/subscriptions/update")
+@app.post("/subscriptions/actions")
+@app.post("/subscriptions/report-usage")
+def subscription_change(data: dict = Body(...)):
+    return {
+        "success": True,
+        "subscription_id": data.get("subscription_id") or next(_ids),
+    }
+
+
+@app.post("/cards/add-token")
+def add_card_token(data: dict = Body(...)):
+    return {"success": True, "token_id": next(_ids)}
+
+
+@app.get("/cards/get-tokens")
+def get_card_tokens(email: str = None):
+    return {"success": True, "tokens": [{"token_id": 1, "last_four": "4242"}]}
+
+
+@app.get("/gateways/list")
+def list_gateways():
+    return {"success": True, "gateways": [{"id": "wompi", "name": "Wompi"}]}
+
+
+@app.get("/api/plans")
+def get_plans():
+    return {
+        "success": True,
+        "plans": [{"id": 1, "name": "Hunty Pro Mensual", "price": 49900.0}],
+    }
+
+
+@app.post("/plans/create")
+@app.post("/plans/update")
+def plan_change(data: dict = Body(...)):
+    return {"success": True, "plan_id": data.get("plan_id") or next(_ids)}
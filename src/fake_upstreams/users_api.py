@@ -0,0 +1,74 @@
+import base64
+import itertools
+import time
+
+from fastapi import Body, FastAPI
+
+from utils.json_codec import dumps
+
+app = FastAPI(title="Fake users API")
+
+TOKEN_TTL = 3600
+
+_ids = itertools.count(70000)
+
+
+def _b64(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode("ascii")
+
+
+def _token(audience: str) -> str:
+    """
+    JWT sin firma válida, con `exp` para que el caché de `utils.sa_token` lo respete.
+    """
+    header = _b64(dumps({"alg": "RS256", "typ": "JWT"}))
+    payload = _b64(dumps({"aud": audience, "exp": int(time.time()) + TOKEN_TTL}))
+    return f"{header}.{payload}.{_b64(b'fake-signature')}"
+
+
+# `utils.sa_token` concatena BASE_URL (que termina en "/") con "/pilot/...", por lo que
+# la ruta real llega con doble barra. El cuerpo es un JSON serializado dentro de otro.
+@app.post("/pilot/api/any/token")
+@app.post("//pilot/api/any/token")
+def service_account_token(data: dict = Body(...)):
+    return dumps({"JWT": _token(data.get("audience"))}).decode("utf-8")
+
+
+@app.put("/user/master/update/{user_id}")
+def update_user_master(user_id: str, data: dict = Body(...)):
+    return {"user_id": user_id, **data}
+
+
+@app.put("/user/master/real-time-db-notification/{user_id}")
+def patch_real_time_db_status(user_id: str, data: dict = Body(...)):
+    return {"user_id": user_id, "notified": True}
+
+
+# Endpoint compuesto: configurar USERS_API_COMPOSITE_STATUS_URL=<BASE_URL>user/master/status
+@app.put("/user/master/status/{user_id}")
+def update_user_status(user_id: str, data: dict = Body(...)):
+    return {
+        "user_master": {"user_id": user_id},
+        "historic": {"user_id": user_id},
+        "real_time_db": {"user_id": user_id, "notified": True},
+    }
+
+
+@app.post("/user/hunty/historic/status", status_code=201)
+def create_historic(data: dict = Body(...)):
+    return {"id": next(_ids), **data}
+
+
+@app.post("/auth/auth/registry/user/internal", status_code=201)
+def create_user_register(data: dict = Body(...)):
+    return {"user_id": next(_ids), "email": data.get("email")}
+
+
+@app.put("/auth/auth/user/{user_id}/change/role/{role}")
+def change_role(user_id: str, role: str):
+    return {"user_id": user_id, "role": role}
+
+
+@app.post("/auth/auth/crm/change/password")
+def change_password_crm():
+    return {"message": "password changed"}
@@ -1,17 +1,26 @@
 import uvicorn
+from anyio.to_thread import current_default_thread_limiter
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 
+from clients.upstream import close_async_clients
 from controllers import (
     cards,
     pagos,
     suscripcion,
+    metrics,
     planes,
+    thinkific,
     pasarelas,
+    payment_stats,
     pyments,
     users_subscriptions,
     webhooks,
 )
+from services.hubspot_sync import contact_batcher
+from services.webhook_inbox import inbox_worker
 from settings import Settings
+from utils.json_codec import FastJSONResponse
 
 settings = Settings()
 
@@ -21,6 +30,7 @@ app = FastAPI(
     description="Membership API to interact with Trely",
     version="1.1.0",
     root_path=settings.ROOT_PATH,
+    default_response_class=FastJSONResponse,
 )
 
 app.include_router(webhooks.router)
@@ -32,6 +42,24 @@ app.include_router(suscripcion.router)
 app.include_router(planes.router)
 app.include_router(planes.router)
 app.include_router(pasarelas.router)
+app.include_router(payment_stats.router)
+app.include_router(thinkific.router)
+app.include_router(metrics.router)
+
+
+@app.on_event("startup")
+async def startup():
+    # Cada compartimento (`<PROVEEDOR>_BULKHEAD`, `DB_BULKHEAD`) debe ser menor que este pool
+    # para que una dependencia lenta no deje sin hilos a los demás endpoints síncronos.
+    current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    inbox_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await run_in_threadpool(inbox_worker.stop, settings.WEBHOOK_DEADLINE or None)
+    await run_in_threadpool(contact_batcher.flush)
+    await close_async_clients()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+from sqlalchemy import (
+    Column,
+    Date,
+    Integer,
+    Numeric,
+    String,
+    TIMESTAMP,
+    UniqueConstraint,
+)
+
+from repositories.database import Base
+
+
+class DailyPaymentStats(Base):
+    """
+    Modelo para la tabla "daily_payment_stats" en el esquema "users_payments".
+
+    Contiene un agregado por día de los pagos aprobados y rechazados de la tabla
+    "users_payments.payments", agrupados por plan, moneda y método de pago. Cada
+    combinación (día, plan, moneda, método, estado) es única, lo que permite recalcular
+    un día cualquiera con un upsert sin duplicar filas.
+
+    Atributos:
+        daily_payment_stats_id (int): Clave primaria autoincremental.
+        stats_date (date): Día (UTC) al que corresponde el agregado.
+        item_name (str): Nombre del plan asociado a los pagos.
+        payment_currency (str): Moneda de los pagos (USD, COP, etc.).
+        payment_method (str): Método utilizado para realizar los pagos.
+        payment_status (str): Estado de los pagos agregados (Aprobado o Rechazado).
+        payments_count (int): Número de pagos del grupo.
+        subtotal_amount (float): Suma de los montos antes de descuentos.
+        discounts_amount (float): Suma de los descuentos aplicados.
+        total_amount (float): Suma de los montos totales después de descuentos.
+        created_date (datetime): Fecha y hora de creación del registro.
+        update_date (datetime): Fecha y hora del último recálculo del registro.
+
+    Nota:
+        El upsert de `repositories.daily_payment_stats` usa la restricción
+        "daily_payment_stats_group_key", por lo que la tabla debe crearse con ella:
+
+            CREATE TABLE users_payments.daily_payment_stats (
+                daily_payment_stats_id serial PRIMARY KEY,
+                stats_date date NOT NULL,
+                item_name varchar NOT NULL,
+                payment_currency varchar NOT NULL,
+                payment_method varchar NOT NULL,
+                payment_status varchar NOT NULL,
+                payments_count integer,
+                subtotal_amount numeric,
+                discounts_amount numeric,
+                total_amount numeric,
+                created_date timestamp,
+                update_date timestamp,
+                CONSTRAINT daily_payment_stats_group_key UNIQUE (
+                    stats_date, item_name, payment_currency, payment_method, payment_status
+                )
+            );
+            CREATE INDEX ix_users_payments_daily_payment_stats_stats_date
+                ON users_payments.daily_payment_stats (stats_date);
+    """
+
+    __tablename__ = "daily_payment_stats"
+
+    __table_args__ = (
+        UniqueConstraint(
+            "stats_date",
+            "item_name",
+            "payment_currency",
+            "payment_method",
+            "payment_status",
+            name="daily_payment_stats_group_key",
+        ),
+        {"schema": "users_payments"},
+    )
+
+    daily_payment_stats_id = Column(Integer, primary_key=True, autoincrement=True)
+    stats_date = Column(Date, nullable=False, index=True)
+    item_name = Column(String, nullable=False)
+    payment_currency = Column(String, nullable=False)
+    payment_method = Column(String, nullable=False)
+    payment_status = Column(String, nullable=False)
+    payments_count = Column(Integer)
+    subtotal_amount = Column(Numeric)
+    discounts_amount = Column(Numeric)
+    total_amount = Column(Numeric)
+    created_date = Column(TIMESTAMP(timezone=False))
+    update_date = Column(TIMESTAMP(timezone=False))
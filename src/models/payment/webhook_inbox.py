@@ -0,0 +1,69 @@
+from sqlalchemy import (
+    TIMESTAMP,
+    BigInteger,
+    Column,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+from repositories.database import Base
+
+
+class WebhookInbox(Base):
+    """
+    Modelo para la tabla "webhook_inbox" en el esquema "users_payments".
+
+    Cada webhook recibido de Treli se guarda aquí antes de responder, de modo que ningún
+    evento se pierde si la instancia se reinicia o se apaga mientras lo procesa. Los workers
+    reclaman los eventos pendientes con `FOR UPDATE SKIP LOCKED` y los marcan como
+    procesados o fallidos.
+
+    Los eventos se reparten en carriles según el email del usuario. Dentro de un carril se
+    procesan de a uno en orden de `occurred_at`; los carriles se procesan en paralelo.
+
+    Atributos:
+        webhook_inbox_id (int): Clave primaria autoincremental; define el orden de llegada.
+        event_key (str): Identidad del evento de Treli (tipo, id del pago o de la suscripción y
+                         `occurred_at`). Es única: un reenvío de Treli no crea otra fila.
+        event_type (str): Tipo de evento de Treli (payment_approved, subscription_cancelled...).
+        lane (int): Carril del evento, calculado a partir del email del usuario.
+        occurred_at (datetime): Momento en que ocurrió el evento según Treli; define el
+                                orden dentro del carril.
+        payload (dict): Cuerpo del webhook tal como se recibió.
+        status (str): pending, processing, done o failed.
+        attempts (int): Número de veces que un worker reclamó el evento.
+        available_date (datetime): Momento a partir del cual el evento puede reclamarse.
+        locked_until (datetime): Vencimiento del reclamo de un worker; si el worker muere, el
+                                 evento vuelve a estar disponible después de esta fecha.
+        last_error (str): Último error del procesamiento.
+        completed_stages (list): Etapas de `process_payment` que ya terminaron sin error en
+                                 intentos anteriores; no se repiten al reintentar.
+        received_date (datetime): Fecha y hora de recepción del webhook.
+        processed_date (datetime): Fecha y hora en que terminó el procesamiento.
+    """
+
+    __tablename__ = "webhook_inbox"
+
+    __table_args__ = (
+        Index("webhook_inbox_claim_idx", "status", "available_date"),
+        Index("webhook_inbox_lane_idx", "lane", "status", "occurred_at"),
+        {"schema": "users_payments"},
+    )
+
+    webhook_inbox_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_key = Column(String, unique=True)
+    event_type = Column(String)
+    lane = Column(Integer)
+    occurred_at = Column(TIMESTAMP(timezone=False))
+    payload = Column(JSONB, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    available_date = Column(TIMESTAMP(timezone=False), nullable=False)
+    locked_until = Column(TIMESTAMP(timezone=False))
+    last_error = Column(Text)
+    completed_stages = Column(JSONB)
+    received_date = Column(TIMESTAMP(timezone=False), nullable=False)
+    processed_date = Column(TIMESTAMP(timezone=False))
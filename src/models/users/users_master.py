@@ -9,7 +9,7 @@ from sqlalchemy import (
     String,
     Text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 from repositories.database import Base
 
@@ -60,6 +60,10 @@ class UsersMaster(Base):
     zip_code = Column(String(20))
     country_id = Column(Integer)
     hubspot_id = Column(Integer)
+    # Diferida: las consultas del modelo no la seleccionan, así que siguen funcionando en
+    # bases de datos donde la columna aún no se ha creado. Se lee con
+    # `repositories.user_master.get_thinkific_id`.
+    thinkific_id = deferred(Column(Integer))
     other_identification = Column(ARRAY(JSON))
     load_date = Column(TIMESTAMP(timezone=False))
     update_date = Column(TIMESTAMP(timezone=False))
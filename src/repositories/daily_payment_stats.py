@@ -0,0 +1,123 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import text
+
+from enums.payment_status import PaymentStatus
+from repositories import database
+
+# Los montos de "payments" son texto (por ejemplo "129900.00"). Solo se suman los que son un
+# número decimal; uno vacío o con otro formato no aborta el recálculo del día, pero el pago
+# sí se cuenta en `payments_count`.
+AMOUNT_PATTERN = "^-?[0-9]+([.][0-9]+)?$"
+
+
+def _amount_sum(column: str) -> str:
+    return (
+        f"coalesce(sum(CASE WHEN btrim({column}) ~ :amount_pattern "
+        f"THEN btrim({column})::numeric END), 0)"
+    )
+
+
+def upsert_daily_payment_stats(stats_date: date) -> int:
+    """
+    Recalcula los agregados de pagos de un día y los guarda en "daily_payment_stats".
+
+    El cálculo se hace en una sola transacción y con SQL basado en conjuntos: primero se
+    eliminan los grupos del día que ya no existen en "payments" y luego se inserta el
+    resultado del GROUP BY con un upsert sobre la llave del grupo. Ejecutar la función
+    varias veces para el mismo día deja siempre el mismo resultado. Los montos que no son
+    un número decimal no se suman (ver `AMOUNT_PATTERN`).
+
+    Cada llamada abre su propia sesión, por lo que varios días pueden procesarse en
+    paralelo desde hilos distintos.
+
+    Args:
+        stats_date (date): Día (UTC) que se desea recalcular.
+
+    Returns:
+        int: Número de grupos (filas) escritos para el día.
+    """
+    day_start = datetime.combine(stats_date, time.min)
+    params = {
+        "stats_date": stats_date,
+        "day_start": day_start,
+        "day_end": day_start + timedelta(days=1),
+        "approved": PaymentStatus.aprobado.value,
+        "rejected": PaymentStatus.rechazado.value,
+        "now": datetime.utcnow(),
+        "amount_pattern": AMOUNT_PATTERN,
+    }
+
+    db = database.SessionLocal()
+    try:
+        db.execute(
+            text(
+                """
+                DELETE FROM users_payments.daily_payment_stats s
+                WHERE s.stats_date = :stats_date
+                  AND NOT EXISTS (
+                    SELECT 1
+                    FROM users_payments.payments p
+                    WHERE p.payment_date >= :day_start
+                      AND p.payment_date < :day_end
+                      AND p.payment_status = s.payment_status
+                      AND coalesce(p.item_name, '') = s.item_name
+                      AND coalesce(p.payment_currency, '') = s.payment_currency
+                      AND coalesce(p.payment_method, '') = s.payment_method
+                  )
+                """
+            ),
+            params,
+        )
+        result = db.execute(
+            text(
+                f"""
+                INSERT INTO users_payments.daily_payment_stats (
+                    stats_date,
+                    item_name,
+                    payment_currency,
+                    payment_method,
+                    payment_status,
+                    payments_count,
+                    subtotal_amount,
+                    discounts_amount,
+                    total_amount,
+                    created_date,
+                    update_date
+                )
+                SELECT
+                    :stats_date,
+                    coalesce(item_name, ''),
+                    coalesce(payment_currency, ''),
+                    coalesce(payment_method, ''),
+                    payment_status,
+                    count(*),
+                    {_amount_sum("subtotal_payment_amount")},
+                    {_amount_sum("discounts_amount")},
+                    {_amount_sum("total_payment_amount")},
+                    :now,
+                    :now
+                FROM users_payments.payments
+                WHERE payment_date >= :day_start
+                  AND payment_date < :day_end
+                  AND payment_status IN (:approved, :rejected)
+                GROUP BY 2, 3, 4, 5
+                ON CONFLICT ON CONSTRAINT daily_payment_stats_group_key DO UPDATE SET
+                    payments_count = EXCLUDED.payments_count,
+                    subtotal_amount = EXCLUDED.subtotal_amount,
+                    discounts_amount = EXCLUDED.discounts_amount,
+                    total_amount = EXCLUDED.total_amount,
+                    update_date = EXCLUDED.update_date
+                """
+            ),
+            params,
+        )
+        db.commit()
+        return result.rowcount
+
+    except Exception:
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
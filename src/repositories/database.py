@@ -7,10 +7,44 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import NullPool
 
+from settings import Settings
+from utils import bulkhead
+
 Base = declarative_base()
 
 load_dotenv()
 
+# Compartimento compartido por todas las sesiones: limita los hilos bloqueados en la base de
+# datos para que una base lenta no agote el pool de hilos de los endpoints.
+db_bulkhead = bulkhead.register(
+    bulkhead.Bulkhead(
+        "database",
+        max_concurrent=Settings.DB_BULKHEAD,
+        max_wait=Settings.BULKHEAD_MAX_WAIT,
+    )
+)
+
+
+class BulkheadSession(Session):
+    """
+    Sesión de SQLAlchemy cuyas consultas, flush y commit ocupan un turno de `db_bulkhead`.
+
+    Las consultas ORM, `query(...).update(...)` y las sentencias `text` pasan por `execute`,
+    por lo que todo acceso a la base de datos de los repositorios queda limitado.
+    """
+
+    def execute(self, *args, **kwargs):
+        with db_bulkhead.slot():
+            return super().execute(*args, **kwargs)
+
+    def flush(self, *args, **kwargs):
+        with db_bulkhead.slot():
+            return super().flush(*args, **kwargs)
+
+    def commit(self):
+        with db_bulkhead.slot():
+            return super().commit()
+
 
 def create_session(return_engine=False) -> Session:
     """
@@ -75,6 +109,14 @@ def create_session(return_engine=False) -> Session:
     if return_engine:
         return engine
     # Connect and create session
-    session_maker = sessionmaker(bind=engine)
+    session_maker = sessionmaker(bind=engine, class_=BulkheadSession)
     session = session_maker()
     return session
+
+
+# Fábrica de sesiones de los repositorios. Cada llamada a un repositorio abre y cierra su
+# propia sesión: los repositorios se usan desde varios hilos a la vez (endpoints, etapas de
+# `process_payment`, workers del inbox) y una sesión de SQLAlchemy no es segura entre hilos.
+SessionLocal = sessionmaker(
+    bind=create_session(return_engine=True), class_=BulkheadSession
+)
@@ -1,8 +1,6 @@
 from models.users.huntys_profile import UserHunties
 from repositories import database
 
-db = database.create_session()
-
 
 def get_user_profile_user_id(user_id: str = None):
     """
@@ -15,6 +13,7 @@ def get_user_profile_user_id(user_id: str = None):
         UsersMaster: El objeto UserHunties correspondiente al correo electrónico del usuario,
                      o None si no se encuentra ningún registro con el correo electrónico dado.
     """
+    db = database.SessionLocal()
     try:
         return db.query(UserHunties).filter(UserHunties.user_id == user_id).first()
 
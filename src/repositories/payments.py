@@ -5,8 +5,6 @@ from fastapi.encoders import jsonable_encoder
 from models.payment.payment import Payment
 from repositories import database
 
-db = database.create_session()
-
 
 def create_payment(payment: Payment):
     """
@@ -20,6 +18,7 @@ def create_payment(payment: Payment):
     Returns:
         Payment: El objeto Payment creado y almacenado en la base de datos.
     """
+    db = database.SessionLocal()
     try:
         payment_data: Any = jsonable_encoder(payment)
         payment = Payment(**payment_data)
@@ -44,6 +43,7 @@ def read_payment(treli_payment_id: int = None, user_id: str = None):
     Returns:
         Optional[Payment]: El objeto Payment que coincide con los criterios de búsqueda, o None si no se encuentra.
     """
+    db = database.SessionLocal()
     try:
         if user_id:
             return db.query(Payment).filter(Payment.user_id == user_id).first()
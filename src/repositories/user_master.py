@@ -1,8 +1,6 @@
 from models.users.users_master import UsersMaster
 from repositories import database
 
-db = database.create_session()
-
 
 def get_user_email_or_user_id(email: str = None, user_id: str = None):
     """
@@ -16,6 +14,7 @@ def get_user_email_or_user_id(email: str = None, user_id: str = None):
         UsersMaster: El objeto UsersMaster correspondiente al correo electrónico del usuario,
                      o None si no se encuentra ningún registro con el correo electrónico dado.
     """
+    db = database.SessionLocal()
     try:
         if email:
             return db.query(UsersMaster).filter(UsersMaster.email == email).first()
@@ -23,3 +22,72 @@ def get_user_email_or_user_id(email: str = None, user_id: str = None):
         return db.query(UsersMaster).filter(UsersMaster.user_id == user_id).first()
     finally:
         db.close()
+
+
+def update_hubspot_id(user_id: str, hubspot_id: int):
+    """
+    Guarda el ID del contacto de HubSpot en el registro del usuario.
+
+    Args:
+        user_id (str): El user_id del usuario a actualizar.
+        hubspot_id (int): El ID del contacto del usuario en HubSpot.
+
+    Returns:
+        int: Número de registros actualizados (0 si el usuario no existe).
+    """
+    db = database.SessionLocal()
+    try:
+        updated = (
+            db.query(UsersMaster)
+            .filter(UsersMaster.user_id == user_id)
+            .update({UsersMaster.hubspot_id: hubspot_id}, synchronize_session=False)
+        )
+        db.commit()
+        return updated
+    finally:
+        db.close()
+
+
+def get_thinkific_id(user_id: str):
+    """
+    Consulta el ID de Thinkific guardado para el usuario.
+
+    Args:
+        user_id (str): El user_id del usuario.
+
+    Returns:
+        int: El ID del usuario en Thinkific, o None si no se ha guardado.
+    """
+    db = database.SessionLocal()
+    try:
+        return (
+            db.query(UsersMaster.thinkific_id)
+            .filter(UsersMaster.user_id == user_id)
+            .scalar()
+        )
+    finally:
+        db.close()
+
+
+def update_thinkific_id(user_id: str, thinkific_id: int):
+    """
+    Guarda el ID del usuario de Thinkific en el registro del usuario.
+
+    Args:
+        user_id (str): El user_id del usuario a actualizar.
+        thinkific_id (int): El ID del usuario en Thinkific.
+
+    Returns:
+        int: Número de registros actualizados (0 si el usuario no existe).
+    """
+    db = database.SessionLocal()
+    try:
+        updated = (
+            db.query(UsersMaster)
+            .filter(UsersMaster.user_id == user_id)
+            .update({UsersMaster.thinkific_id: thinkific_id}, synchronize_session=False)
+        )
+        db.commit()
+        return updated
+    finally:
+        db.close()
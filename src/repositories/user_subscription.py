@@ -7,8 +7,6 @@ from enums.payment_status import PaymentStatus, PaymentType
 from models.payment.subscriptions import UsersSubscriptions
 from repositories import database
 
-db = database.create_session()
-
 
 def create_users_subscriptions(payment: UsersSubscriptions):
     """
@@ -22,6 +20,7 @@ def create_users_subscriptions(payment: UsersSubscriptions):
     Returns:
         HistoricalPayment: El objeto HistoricalPayment creado y almacenado en la base de datos.
     """
+    db = database.SessionLocal()
     try:
         payment_data: Any = jsonable_encoder(payment)
         payment = UsersSubscriptions(**payment_data)
@@ -44,6 +43,7 @@ def read_users_subscriptions(user_id: str = None):
     Returns:
         List[HistoricalPayment]: Una lista de objetos HistoricalPayment que coinciden con los criterios de búsqueda.
     """
+    db = database.SessionLocal()
     try:
         return (
             db.query(UsersSubscriptions)
@@ -63,6 +63,7 @@ def read_hunty_status_subscription(user_id: str):
     Returns:
         Dict: Data Status Subscription Hunty
     """
+    db = database.SessionLocal()
     try:
         return db.execute(
             f"""
@@ -118,6 +119,7 @@ def update_users_subscriptions(user_id: str, updated_payment: UsersSubscriptions
     Returns:
         Payment: El objeto Payment actualizado.
     """
+    db = database.SessionLocal()
     try:
         users_subscriptions = read_users_subscriptions(user_id)
         if not users_subscriptions:
@@ -0,0 +1,305 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from repositories import database
+from utils.json_codec import dumps, loads
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+
+def insert_event(
+    event_key: str,
+    event_type: str,
+    payload: dict,
+    lane: int,
+    occurred_at: datetime,
+):
+    """
+    Guarda un webhook recibido en "webhook_inbox" como pendiente, si no existe ya.
+
+    `event_key` es única en la tabla: si el evento ya fue recibido, no se crea otra fila. La
+    excepción es un evento que agotó sus intentos (fallido): el reenvío lo vuelve a dejar
+    pendiente para procesarlo de nuevo.
+
+    Args:
+        event_key (str): Identidad del evento de Treli.
+        event_type (str): Tipo de evento de Treli.
+        payload (dict): Cuerpo del webhook.
+        lane (int): Carril del evento.
+        occurred_at (datetime): Momento en que ocurrió el evento.
+
+    Returns:
+        int or None: ID del evento en el inbox, o None si es un duplicado.
+    """
+    now = datetime.utcnow()
+    db = database.SessionLocal()
+    try:
+        event_id = db.execute(
+            text(
+                """
+                INSERT INTO users_payments.webhook_inbox (
+                    event_key,
+                    event_type,
+                    lane,
+                    occurred_at,
+                    payload,
+                    status,
+                    attempts,
+                    available_date,
+                    received_date
+                )
+                VALUES (
+                    :event_key,
+                    :event_type,
+                    :lane,
+                    :occurred_at,
+                    CAST(:payload AS jsonb),
+                    :pending,
+                    0,
+                    :now,
+                    :now
+                )
+                ON CONFLICT (event_key) DO UPDATE SET
+                    status = :pending,
+                    attempts = 0,
+                    available_date = :now,
+                    last_error = NULL
+                WHERE webhook_inbox.status = :failed
+                RETURNING webhook_inbox_id
+                """
+            ),
+            {
+                "event_key": event_key,
+                "event_type": event_type,
+                "lane": lane,
+                "occurred_at": occurred_at,
+                "payload": dumps(payload).decode("utf-8"),
+                "pending": PENDING,
+                "failed": FAILED,
+                "now": now,
+            },
+        ).scalar()
+        db.commit()
+        return event_id
+
+    except Exception:
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
+
+
+def claim_events(limit: int, lease_seconds: float) -> list:
+    """
+    Reclama hasta `limit` eventos disponibles, cada uno de un carril distinto.
+
+    Un evento está disponible si está pendiente y su `available_date` ya pasó, o si está en
+    proceso pero el reclamo de su worker venció. Además debe ser el primero de su carril:
+    ningún evento anterior (por `occurred_at` y luego por ID) del mismo carril puede estar
+    pendiente o en proceso. Así los eventos de un usuario se aplican en orden aunque varios
+    workers, en una o varias instancias, procesen carriles distintos a la vez. Un evento que
+    espera un reintento detiene su carril hasta que se procese o falle definitivamente.
+
+    `FOR UPDATE SKIP LOCKED` permite que los workers reclamen a la vez sin bloquearse ni
+    reclamar el mismo evento.
+
+    Args:
+        limit (int): Número máximo de eventos a reclamar.
+        lease_seconds (float): Segundos durante los cuales el evento queda reservado.
+
+    Returns:
+        list: Diccionarios con 'webhook_inbox_id', 'event_type', 'lane', 'payload',
+              'attempts' y 'completed_stages'.
+    """
+    now = datetime.utcnow()
+    db = database.SessionLocal()
+    try:
+        rows = db.execute(
+            text(
+                """
+                UPDATE users_payments.webhook_inbox i
+                SET status = :processing,
+                    attempts = i.attempts + 1,
+                    locked_until = :locked_until
+                WHERE i.webhook_inbox_id IN (
+                    SELECT h.webhook_inbox_id
+                    FROM users_payments.webhook_inbox h
+                    WHERE (
+                        (h.status = :pending AND h.available_date <= :now)
+                        OR (h.status = :processing AND h.locked_until < :now)
+                    )
+                    AND NOT EXISTS (
+                        SELECT 1
+                        FROM users_payments.webhook_inbox p
+                        WHERE p.lane = h.lane
+                          AND p.status IN (:pending, :processing)
+                          AND (p.occurred_at, p.webhook_inbox_id)
+                              < (h.occurred_at, h.webhook_inbox_id)
+                    )
+                    ORDER BY h.occurred_at, h.webhook_inbox_id
+                    LIMIT :limit
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING i.webhook_inbox_id,
+                          i.event_type,
+                          i.lane,
+                          i.payload,
+                          i.attempts,
+                          i.completed_stages
+                """
+            ),
+            {
+                "processing": PROCESSING,
+                "pending": PENDING,
+                "now": now,
+                "locked_until": now + timedelta(seconds=lease_seconds),
+                "limit": limit,
+            },
+        ).fetchall()
+        db.commit()
+
+    except Exception:
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
+
+    events = [
+        {
+            "webhook_inbox_id": row.webhook_inbox_id,
+            "event_type": row.event_type,
+            "lane": row.lane,
+            "payload": (
+                row.payload if isinstance(row.payload, dict) else loads(row.payload)
+            ),
+            "attempts": row.attempts,
+            "completed_stages": (
+                loads(row.completed_stages)
+                if isinstance(row.completed_stages, str)
+                else row.completed_stages
+            )
+            or [],
+        }
+        for row in rows
+    ]
+    return sorted(events, key=lambda event: event["webhook_inbox_id"])
+
+
+def lane_stats() -> list:
+    """
+    Consulta la cola de cada carril con eventos pendientes o en proceso.
+
+    Returns:
+        list: Diccionarios con 'lane', 'depth' (eventos pendientes o en proceso) y
+              'oldest_received_date' (recepción del evento más antiguo del carril).
+    """
+    db = database.SessionLocal()
+    try:
+        rows = db.execute(
+            text(
+                """
+                SELECT lane,
+                       count(*) AS depth,
+                       min(received_date) AS oldest_received_date
+                FROM users_payments.webhook_inbox
+                WHERE status IN (:pending, :processing)
+                GROUP BY lane
+                """
+            ),
+            {"pending": PENDING, "processing": PROCESSING},
+        ).fetchall()
+
+    finally:
+        db.close()
+
+    return [
+        {
+            "lane": row.lane,
+            "depth": row.depth,
+            "oldest_received_date": row.oldest_received_date,
+        }
+        for row in rows
+    ]
+
+
+def mark_done(event_id: int):
+    """
+    Marca un evento como procesado.
+    """
+    _update(
+        event_id,
+        {"status": DONE, "error": None, "available": None, "completed": None},
+    )
+
+
+def mark_failed(
+    event_id: int,
+    error: str,
+    retry_at: datetime = None,
+    completed_stages: list = None,
+):
+    """
+    Registra la falla de un evento.
+
+    Args:
+        event_id (int): ID del evento en el inbox.
+        error (str): Descripción del error.
+        retry_at (datetime, opcional): Momento del siguiente intento. Si no se indica, el
+                                       evento queda como fallido y no se vuelve a reclamar.
+        completed_stages (list, opcional): Etapas ya completadas, que el siguiente intento
+                                           no repite.
+    """
+    _update(
+        event_id,
+        {
+            "status": PENDING if retry_at else FAILED,
+            "error": error,
+            "available": retry_at,
+            "completed": (
+                dumps(completed_stages).decode("utf-8")
+                if completed_stages is not None
+                else None
+            ),
+        },
+    )
+
+
+def _update(event_id: int, values: dict):
+    db = database.SessionLocal()
+    try:
+        db.execute(
+            text(
+                """
+                UPDATE users_payments.webhook_inbox
+                SET status = :status,
+                    last_error = :error,
+                    available_date = coalesce(:available, available_date),
+                    completed_stages = coalesce(
+                        CAST(:completed AS jsonb), completed_stages
+                    ),
+                    locked_until = NULL,
+                    processed_date = CASE WHEN :status = :pending THEN NULL ELSE :now END
+                WHERE webhook_inbox_id = :event_id
+                """
+            ),
+            {
+                **values,
+                "event_id": event_id,
+                "pending": PENDING,
+                "now": datetime.utcnow(),
+            },
+        )
+        db.commit()
+
+    except Exception:
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
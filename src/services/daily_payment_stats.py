@@ -0,0 +1,85 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from fastapi import HTTPException, status
+
+from repositories.daily_payment_stats import upsert_daily_payment_stats
+from settings import Settings
+
+
+def aggregate_day(stats_date: date) -> dict:
+    """
+    Recalcula los agregados de pagos aprobados y rechazados de un día.
+
+    Args:
+        stats_date (date): Día (UTC) que se desea recalcular.
+
+    Returns:
+        dict: Diccionario con el día procesado y el número de grupos escritos.
+    """
+    rows = upsert_daily_payment_stats(stats_date)
+    logging.info(f"aggregate_day {stats_date}: {rows} rows")
+
+    return {"stats_date": stats_date, "rows": rows}
+
+
+def aggregate_range(
+    start_date: date = None, end_date: date = None, workers: int = None
+) -> list:
+    """
+    Recalcula los agregados diarios de pagos para un rango de fechas.
+
+    Cada día se procesa de forma independiente, por lo que el rango puede recalcularse
+    tantas veces como sea necesario y los días se ejecutan en paralelo hasta el número
+    de `workers` indicado.
+
+    Args:
+        start_date (date, opcional): Primer día del rango. Por defecto es el día anterior (UTC).
+        end_date (date, opcional): Último día del rango (incluido). Por defecto es `start_date`.
+        workers (int, opcional): Número de días a procesar en paralelo.
+                                 Por defecto es `Settings.DAILY_STATS_WORKERS`.
+
+    Returns:
+        list: Lista con el resultado de cada día procesado.
+
+    Raises:
+        HTTPException: 400 si el rango es inválido.
+        HTTPException: 424 si alguno de los días no pudo recalcularse; el detalle incluye los días fallidos.
+    """
+    start_date = start_date or datetime.utcnow().date() - timedelta(days=1)
+    end_date = end_date or start_date
+
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must be greater than or equal to start_date",
+        )
+
+    days = [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+    ]
+    workers = max(1, min(workers or Settings.DAILY_STATS_WORKERS, len(days)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {day: executor.submit(aggregate_day, day) for day in days}
+
+    results, failed_dates = [], []
+    for day, future in futures.items():
+        try:
+            results.append(future.result())
+        except Exception as ex:
+            logging.error(f"aggregate_range error on {day}: {ex}")
+            failed_dates.append(str(day))
+
+    if failed_dates:
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail={
+                "message": "Error aggregating payments",
+                "failed_dates": failed_dates,
+            },
+        )
+
+    return results
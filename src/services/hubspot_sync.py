@@ -0,0 +1,208 @@
+import logging
+import threading
+
+import requests
+
+from clients import hubspot
+from services import user_master
+from settings import Settings
+from utils.metrics import inc_counter
+
+
+class HubspotContactBatcher:
+    """
+    Acumula actualizaciones de contactos de HubSpot y las envía en lotes.
+
+    Las propiedades se agrupan por correo electrónico (las más recientes sobrescriben a las
+    anteriores) y se envían con `hubspot.batch_upsert_contacts` cuando se acumulan
+    `batch_size` contactos o cada `flush_interval` segundos, lo que ocurra primero.
+
+    HubSpot rechaza el lote completo con un 4xx si uno de sus contactos es inválido; en ese
+    caso los contactos se envían uno por uno y se descartan solo los rechazados. Si un envío
+    falla por otro motivo, los contactos vuelven a la cola para el siguiente intento, hasta
+    `max_attempts` intentos por contacto.
+
+    Cuando se indica el usuario del contacto, el ID que HubSpot retorna para él se guarda en
+    `users_master` después del envío, igual que en el envío individual.
+
+    El envío es de mejor esfuerzo: la cola vive en memoria, por lo que los contactos
+    pendientes se pierden si la instancia se reinicia y los que agotan `max_attempts` se
+    descartan (métrica `hubspot_contacts_dropped_total`). Quien encola un contacto no se
+    entera de estas pérdidas.
+
+    Atributos:
+        batch_size (int): Número de contactos que dispara un envío inmediato.
+        flush_interval (float): Segundos máximos que un contacto espera en la cola.
+        max_attempts (int): Envíos fallidos tras los cuales un contacto se descarta.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_attempts: int):
+        self.batch_size = min(batch_size, hubspot.HUBSPOT_BATCH_LIMIT)
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._pending = {}
+        self._attempts = {}
+        self._owners = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def add(self, email: str, properties: dict, user_id=None, hubspot_id=None):
+        """
+        Agrega o actualiza las propiedades de un contacto en la cola.
+
+        Args:
+            email (str): Correo electrónico del contacto en HubSpot.
+            properties (dict): Propiedades a crear o actualizar.
+            user_id (str, opcional): ID del usuario, para guardar el ID del contacto.
+            hubspot_id (int, opcional): ID del contacto guardado para el usuario; si HubSpot
+                                        retorna el mismo no se vuelve a guardar.
+        """
+        with self._lock:
+            self._pending.setdefault(email, {}).update(properties)
+            if user_id:
+                self._owners[email] = (user_id, hubspot_id)
+            full = len(self._pending) >= self.batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if full:
+            self.flush()
+
+    def flush(self) -> list:
+        """
+        Envía a HubSpot todos los contactos pendientes.
+
+        Returns:
+            list: Resultados de HubSpot de los contactos enviados.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                pending, self._pending = self._pending, {}
+                owners = {
+                    email: self._owners.pop(email)
+                    for email in pending
+                    if email in self._owners
+                }
+
+            if not pending:
+                return []
+
+            contacts = [
+                {"email": email, "properties": properties}
+                for email, properties in pending.items()
+            ]
+            results, failed = self._send(contacts)
+            self._requeue(
+                {email: pending[email] for email in failed},
+                sent=list(pending),
+                owners=owners,
+            )
+            _save_hubspot_ids(results, owners)
+            return results
+
+    def _send(self, contacts: list):
+        """
+        Envía los contactos y retorna los resultados de HubSpot y los correos que deben
+        reintentarse.
+        """
+        try:
+            return hubspot.batch_upsert_contacts(contacts), []
+        except Exception as ex:
+            if not _is_client_error(ex):
+                logging.error(f"HubSpot batch of {len(contacts)} contacts failed: {ex}")
+                return [], [contact["email"] for contact in contacts]
+
+            if len(contacts) == 1:
+                logging.error(f"HubSpot rejected contact {contacts[0]['email']}: {ex}")
+                _count_dropped("rejected")
+                return [], []
+
+            logging.warning(
+                f"HubSpot rejected a batch of {len(contacts)} contacts, "
+                f"sending them one by one: {ex}"
+            )
+            results, failed = [], []
+            for contact in contacts:
+                contact_results, contact_failed = self._send([contact])
+                results.extend(contact_results)
+                failed.extend(contact_failed)
+            return results, failed
+
+    def _requeue(self, failed: dict, sent: list = (), owners: dict = None):
+        with self._lock:
+            for email in sent:
+                if email not in failed:
+                    self._attempts.pop(email, None)
+
+            for email, properties in failed.items():
+                attempts = self._attempts.get(email, 0) + 1
+                if attempts >= self.max_attempts:
+                    logging.error(
+                        f"Dropping HubSpot contact {email} after {attempts} attempts"
+                    )
+                    self._attempts.pop(email, None)
+                    _count_dropped("max_attempts")
+                    continue
+                self._attempts[email] = attempts
+                if owners and email in owners:
+                    self._owners.setdefault(email, owners[email])
+                # Las propiedades encoladas después del envío fallido son más recientes.
+                self._pending[email] = {**properties, **self._pending.get(email, {})}
+
+            if self._pending and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+
+def _is_client_error(error: Exception) -> bool:
+    """
+    Indica si HubSpot rechazó la solicitud con un 4xx distinto de 429 (datos inválidos).
+    """
+    cause = error.__cause__ if error.__cause__ is not None else error
+    response = getattr(cause, "response", None)
+    if not isinstance(cause, requests.exceptions.HTTPError) or response is None:
+        return False
+    return 400 <= response.status_code < 500 and response.status_code != 429
+
+
+def _save_hubspot_ids(results: list, owners: dict):
+    """
+    Guarda en `users_master` el ID que HubSpot retornó para cada contacto con usuario. Como
+    en `process_payment.save_hubspot_id`, un error al guardar solo se registra.
+    """
+    # HubSpot retorna el correo en minúsculas.
+    owners = {email.lower(): owner for email, owner in owners.items()}
+    for result in results:
+        email = (result.get("properties") or {}).get("email") or ""
+        owner = owners.get(email.lower())
+        if owner is None or not result.get("id"):
+            continue
+        user_id, hubspot_id = owner
+        if str(result["id"]) == str(hubspot_id):
+            continue
+        try:
+            user_master.update_hubspot_id_db(user_id=user_id, hubspot_id=result["id"])
+        except Exception as ex:
+            logging.error(f"Error saving hubspot_id {result['id']} for {user_id}: {ex}")
+
+
+def _count_dropped(reason: str):
+    inc_counter(
+        "hubspot_contacts_dropped_total",
+        help_text="Contactos descartados de la cola de HubSpot por motivo.",
+        reason=reason,
+    )
+
+
+contact_batcher = HubspotContactBatcher(
+    batch_size=Settings.HUBSPOT_BATCH_SIZE,
+    flush_interval=Settings.HUBSPOT_BATCH_FLUSH_INTERVAL,
+    max_attempts=Settings.HUBSPOT_BATCH_MAX_ATTEMPTS,
+)
@@ -1,23 +1,42 @@
 import base64
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from dateutil.relativedelta import relativedelta
 from fastapi import HTTPException, status
 from fastapi.encoders import jsonable_encoder
 
-from clients import api_user_master, historic_status, hubspot, thinkific
+from clients import api_user_master, hubspot, thinkific
 from enums import status_user
 from schema.pyments.payment import Payment, Subscriptions
 from services import (
     create_user,
+    hubspot_sync,
     hunty_profile,
     pyments,
     user_master,
     user_subscriptions,
 )
 from settings import Settings
+from utils.deadline import deadline
+from utils.handle_exceptions import PermanentEventError
 from utils.list_product import plazos
+from utils.pipeline import Stage, StageSkipped, run_stages
+
+# Datos de `content` que usan las etapas de `process_payment`.
+PAYMENT_EVENT_FIELDS = (
+    "payment_id",
+    "payment_type",
+    "payment_status",
+    "payment_method",
+    "currency",
+)
+
+# Pool acotado en el que se ejecutan las etapas de `process_payment`.
+pipeline_executor = ThreadPoolExecutor(
+    max_workers=Settings.PAYMENT_PIPELINE_WORKERS, thread_name_prefix="payment-pipeline"
+)
 
 
 def next_payment_date(product_name, date_latest):
@@ -48,106 +67,177 @@ def next_payment_date(product_name, date_latest):
     return date_latest
 
 
-def create_or_update_user(payment):
+def get_user_status(event_type, profile_exists):
     """
-    Crea o actualiza un usuario basado en la información del pago.
+    Calcula el nuevo estado del usuario según el evento de pago y si tiene perfil.
 
     Args:
-        payment (dict): Un diccionario que contiene la información del pago.
+        event_type (str): Tipo de evento de Treli ('payment_approved' o 'payment_failed').
+        profile_exists (bool): Si el usuario ya completó su perfil.
 
     Returns:
-        str: El ID del usuario creado o actualizado.
-
-    Raises:
-        UserNotFound: Si el usuario no se encuentra en la base de datos.
-
-    Nota:
-        Esta función asume la existencia de los siguientes módulos o funciones:
-        - `user_master`: Módulo que maneja la base de datos de usuarios.
-        - `create_user`: Función para crear un nuevo usuario en la base de datos.
-        - `api_user_master`: Módulo que maneja las actualizaciones de estado de usuarios.
-        - `status_user`: Enumeración que define los posibles estados y subestados del usuario.
+        dict: Diccionario con 'status_id', 'substatus_id' y 'stage_id'.
     """
+    if event_type == "payment_approved":
+        if profile_exists:
+            return {
+                "status_id": status_user.Status.active.value,
+                "substatus_id": status_user.SubStatus.hunty_pro.value,
+                "stage_id": status_user.StageId.active_subscription,
+            }
+        else:
+            return {
+                "status_id": status_user.Status.registered.value,
+                "substatus_id": status_user.SubStatus.application_form.value,
+                "stage_id": status_user.StageId.alternate_form_hunty_pro,
+            }
+    else:
+        if profile_exists:
+            return {
+                "status_id": status_user.Status.active.value,
+                "substatus_id": status_user.SubStatus.free.value,
+                "stage_id": status_user.StageId.failed_payment,
+            }
+        else:
+            return {
+                "status_id": status_user.Status.registered.value,
+                "substatus_id": status_user.SubStatus.application_form.value,
+                "stage_id": status_user.StageId.failed_payment,
+            }
 
-    billing = payment["content"]["billing"]
-    items = payment["content"]["items"][0]
 
-    contact_properties_payment_approved = {
-        "user_type": "hunty pro",
-        "active_huntypro": True,
-        "subscription_name": items["name"],
-        "ambiente": Settings.SCOPE,
-    }
-    contact_properties_payment_failed = {
-        "user_type": "Hunty",
-        "active_huntypro": False,
-        "subscription_name": "subscription canceled",
-        "ambiente": Settings.SCOPE,
-    }
+def resolve_user(payment):
+    """
+    Busca o crea el usuario del pago y calcula su nuevo estado.
 
-    def get_user_status(event_type, profile_exists):
-        if event_type == "payment_approved":
-            if profile_exists:
-                return {
-                    "status_id": status_user.Status.active.value,
-                    "substatus_id": status_user.SubStatus.hunty_pro.value,
-                    "stage_id": status_user.StageId.active_subscription,
-                }
-            else:
-                return {
-                    "status_id": status_user.Status.registered.value,
-                    "substatus_id": status_user.SubStatus.application_form.value,
-                    "stage_id": status_user.StageId.alternate_form_hunty_pro,
-                }
-        else:
-            if profile_exists:
-                return {
-                    "status_id": status_user.Status.active.value,
-                    "substatus_id": status_user.SubStatus.free.value,
-                    "stage_id": status_user.StageId.failed_payment,
-                }
-            else:
-                return {
-                    "status_id": status_user.Status.registered.value,
-                    "substatus_id": status_user.SubStatus.application_form.value,
-                    "stage_id": status_user.StageId.failed_payment,
-                }
+    Args:
+        payment (dict): Un diccionario que contiene la información del pago.
 
+    Returns:
+        dict: Diccionario con las llaves:
+              - 'user_id' (str): ID del usuario.
+              - 'created' (bool): Si el usuario se creó a partir de este pago.
+              - 'hubspot_id': ID del contacto de HubSpot guardado para el usuario.
+              - 'record' (UsersMaster): Registro del usuario antes de actualizar su estado.
+              - 'user_status' (dict): Nuevo estado del usuario.
+    """
+    billing = payment["content"]["billing"]
     get_user = user_master.read_user_db(email=billing["email"], query=True)
 
     if not get_user:
         create_user_db = create_user.create_user(billing)
         user_id = create_user_db["user_id"]
         user_status = get_user_status(payment["event_type"], False)
-
-        if payment["event_type"] == "payment_approved":
-            create_or_update_user_hubspot(
-                billing=billing, user_id=user_id, items=items["name"]
-            )
-
+        hubspot_id = None
     else:
         user_id = get_user.user_id
         profile = hunty_profile.read_user_profile_db(user_id=user_id, query=True)
         user_status = get_user_status(payment["event_type"], bool(profile))
+        hubspot_id = get_user.hubspot_id
+
+    return {
+        "user_id": user_id,
+        "created": not get_user,
+        "hubspot_id": hubspot_id,
+        "record": user_master.read_user_db(user_id=user_id, query=True),
+        "user_status": user_status,
+    }
 
+
+def sync_user_hubspot(payment, user):
+    """
+    Crea o actualiza el contacto de HubSpot del usuario según el evento de pago.
+
+    Args:
+        payment (dict): Un diccionario que contiene la información del pago.
+        user (dict): Usuario retornado por `resolve_user`.
+    """
+    billing = payment["content"]["billing"]
+    items = payment["content"]["items"][0]
+
+    if user["created"]:
         if payment["event_type"] == "payment_approved":
-            contact_properties = contact_properties_payment_approved
-        else:
-            contact_properties = contact_properties_payment_failed
-        create_or_update_user_hubspot(
-            billing=billing, user_id=user_id, data=contact_properties
-        )
-    old_status = user_master.read_user_db(user_id=user_id, query=True)
-
-    api_user_master.update_user_master(user_id=user_id, data=user_status)
-    old_status = jsonable_encoder(old_status)
-    if old_status["substatus_id"] != user_status["substatus_id"]:
-        historic_status.create_modify_data(old_status, now_status=user_status)
-    api_user_master.patch_real_time_db_status(
-        user_id=user_id, show_modal=True, show_hubspot_banner=True, show_banner=True
+            create_or_update_user_hubspot(
+                billing=billing, user_id=user["user_id"], items=items["name"]
+            )
+        return
+
+    if payment["event_type"] == "payment_approved":
+        contact_properties = {
+            "user_type": "hunty pro",
+            "active_huntypro": True,
+            "subscription_name": items["name"],
+            "ambiente": Settings.SCOPE,
+        }
+    else:
+        contact_properties = {
+            "user_type": "Hunty",
+            "active_huntypro": False,
+            "subscription_name": "subscription canceled",
+            "ambiente": Settings.SCOPE,
+        }
+    create_or_update_user_hubspot(
+        billing=billing,
+        user_id=user["user_id"],
+        data=contact_properties,
+        hubspot_id=user["hubspot_id"],
+    )
+
+
+def update_user_status(user):
+    """
+    Actualiza el estado del usuario, su histórico y la base de datos en tiempo real.
+
+    Args:
+        user (dict): Usuario retornado por `resolve_user`.
+
+    Returns:
+        dict: Respuestas de `api_user_master.update_user_status`.
+    """
+    return api_user_master.update_user_status(
+        user_id=user["user_id"],
+        user_status=user["user_status"],
+        old_status=jsonable_encoder(user["record"]),
+        show_modal=True,
+        show_hubspot_banner=True,
+        show_banner=True,
     )
 
-    return user_id
+
+def enroll_user_thinkific(user):
+    """
+    Crea el usuario en Thinkific y lo inscribe en los cursos de Hunty Pro.
+
+    Si el usuario ya tiene `thinkific_id` en `users_master` no se intenta crearlo de nuevo;
+    solo se completan sus inscripciones. El ID se guarda después de crear o encontrar al
+    usuario en Thinkific, también cuando falla alguna inscripción: la etapa falla con 424,
+    el evento se reintenta y el siguiente intento solo inscribe los cursos que faltan.
+
+    Args:
+        user (dict): Usuario retornado por `resolve_user`.
+    """
+    record = user["record"]
+    stored_id = user_master.read_thinkific_id_db(user_id=user["user_id"])
+    try:
+        result = thinkific.create_user_with_enrollments_user(
+            first_name=record.first_name,
+            last_name=record.last_name,
+            email=record.email,
+            thinkific_id=stored_id,
+        )
+    except HTTPException as ex:
+        # Inscripción parcial: el usuario ya existe en Thinkific aunque falten cursos.
+        if isinstance(ex.detail, dict):
+            _store_thinkific_id(user, stored_id, ex.detail["thinkific_id"])
+        raise
+
+    _store_thinkific_id(user, stored_id, result.detail["thinkific_id"])
+    return result
+
+
+def _store_thinkific_id(user, stored_id, thinkific_id):
+    if str(thinkific_id) != str(stored_id):
+        save_thinkific_id(user_id=user["user_id"], thinkific_id=thinkific_id)
 
 
 def create_or_update_payment(payment, user_id):
@@ -210,103 +300,206 @@ def create_or_update_payment(payment, user_id):
     return user_payment, user_subscription_data
 
 
-def process_payment(payment: dict):
+def validate_payment_event(payment: dict):
+    """
+    Verifica que el cuerpo de un webhook de pago tenga los datos que usan las etapas de
+    `process_payment`.
+
+    Args:
+        payment (dict): Un diccionario que contiene la información del pago.
+
+    Raises:
+        PermanentEventError: 422 si falta un dato o no tiene el tipo esperado; reintentar el
+                             evento no lo corrige.
+    """
+    try:
+        content = payment["content"]
+        missing = [key for key in PAYMENT_EVENT_FIELDS if key not in content]
+        missing += [
+            f"totals.{key}"
+            for key in ("sub_total", "discounts", "total")
+            if key not in content["totals"]
+        ]
+        if "name" not in content["items"][0]:
+            missing.append("items.name")
+        if not content["billing"].get("email"):
+            missing.append("billing.email")
+        if missing:
+            raise KeyError(", ".join(missing))
+        datetime.utcfromtimestamp(payment["occurred_at"])
+    except (KeyError, IndexError, TypeError, ValueError, OverflowError, OSError) as ex:
+        raise PermanentEventError(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid payment event: {ex!r}",
+        )
+
+
+@deadline(Settings.WEBHOOK_DEADLINE)
+def process_payment(payment: dict, completed: set = None):
     """
     Procesa un pago, creando o actualizando registros de pago y usuario en la base de datos.
 
+    El procesamiento es un grafo de etapas (ver `utils.pipeline`): primero se busca o crea el
+    usuario y luego se ejecutan en paralelo, en `pipeline_executor`, las etapas que solo
+    dependen de él: HubSpot, actualización de estado en el API de usuarios y registro del
+    pago. Para pagos aprobados, la inscripción en Thinkific se ejecuta solo después de
+    registrar el pago. El tiempo total es el de la dependencia más lenta y no la suma de
+    todas.
+
+    Cuando el evento se reintenta, `completed` indica las etapas que ya terminaron sin error
+    en intentos anteriores; esas etapas no se vuelven a ejecutar. La búsqueda del usuario se
+    ejecuta siempre porque las demás etapas usan su resultado.
+
     Args:
         payment (dict): Un diccionario que contiene la información del pago.
+        completed (set, opcional): Nombres de las etapas ya completadas. Se actualiza con las
+                                   etapas que terminan sin error en este intento, también
+                                   cuando el procesamiento falla.
 
     Returns:
-        dict: Un diccionario con la información del pago procesado.
+        tuple: La información del pago procesado y el ID del usuario.
 
     Raises:
-        UserNotFound: Si el usuario no se encuentra en la base de datos.
-        HTTPException: Si ocurre un error al crear el registro histórico de pago.
-
-    Nota:
-        Esta función asume la existencia de los siguientes módulos o funciones:
-        - `user_master`: Módulo que maneja la base de datos de usuarios.
-        - `create_user`: Función para crear un nuevo usuario en la base de datos.
-        - `api_user_master`: Módulo que maneja las actualizaciones de estado de usuarios.
-        - `pyments`: Módulo que maneja la base de datos de pagos.
-        - `Payment`: Clase que representa un registro de pago.
-        - `historical_payments`: Módulo que maneja la base de datos de registros históricos de pago.
-        - `HistoricalPayment`: Clase que representa un registro histórico de pago.
-        - `status_user`: Enumeración que define los posibles estados y subestados del usuario.
-        - `jsonable_encoder`: Una función para convertir datos a formato JSON.
+        PermanentEventError: 422 si al evento le faltan datos (ver `validate_payment_event`);
+                             no se ejecuta ninguna etapa.
+        HTTPException: Si falla alguna etapa. Si la falla no es un error de un proveedor, el
+                       estado del usuario se revierte a gratuito y se lanza un 424.
 
     Nota:
-        El diccionario 'pago' debe incluir un campo adicional 'approved' que indique si el pago fue aprobado
-        (True para pagos aprobados, False para pagos fallidos).
+        Todas las llamadas a proveedores del procesamiento comparten un deadline de
+        `WEBHOOK_DEADLINE` segundos; cada llamada usa como máximo el tiempo que queda.
     """
-    try:
-        user_id = create_or_update_user(payment)
-        user_payment = create_or_update_payment(payment, user_id)
+    validate_payment_event(payment)
+
+    stages = [
+        Stage("user", lambda results: resolve_user(payment)),
+        Stage(
+            "hubspot",
+            lambda results: sync_user_hubspot(payment, results["user"]),
+            depends_on=("user",),
+        ),
+        Stage(
+            "status",
+            lambda results: update_user_status(results["user"]),
+            depends_on=("user",),
+        ),
+        Stage(
+            "payment",
+            lambda results: create_or_update_payment(
+                payment, results["user"]["user_id"]
+            ),
+            depends_on=("user",),
+        ),
+    ]
+    if payment["event_type"] == "payment_approved" and Settings.MACHINE != "DEV":
+        stages.append(
+            Stage(
+                "thinkific",
+                lambda results: enroll_user_thinkific(results["user"]),
+                depends_on=("user", "payment"),
+            )
+        )
 
-    except HTTPException:
-        # Reraise HTTPException with more specific detail
-        raise
+    if completed is None:
+        completed = set()
+    stages = [
+        (
+            Stage(stage.name, lambda results: None)
+            if stage.name in completed and stage.name != "user"
+            else stage
+        )
+        for stage in stages
+    ]
 
-    except Exception as ex:
-        logging.error(f"Error occurred during payment creation: {ex}")
-        """
-        Si ocurre un error durante la creación del pago
-        actualiza el estado del usuario si existe.
-        """
-        billing = payment["content"]["billing"]
-        get_user = user_master.read_user_db(email=billing["email"], query=True)
-        if get_user:
-            substatus_id = get_user.status_id
-            if substatus_id == "f5eaac978aab4071819528431afa79f0":
-                user_status = {
-                    "status_id": status_user.Status.active.value,
-                    "substatus_id": status_user.SubStatus.free.value,
-                    "stage_id": status_user.StageId.failed_payment,
-                }
-                api_user_master.update_user_master(
-                    user_id=get_user.user_id, data=user_status
-                )
+    pipeline = run_stages(stages, pipeline_executor)
+    completed.update(name for name in pipeline.results if name != "user")
 
+    errors = {
+        name: error
+        for name, error in pipeline.errors.items()
+        if not isinstance(error, StageSkipped)
+    }
+    enrollment_error = errors.pop("thinkific", None)
+
+    if errors:
+        unexpected = [
+            error for error in errors.values() if not isinstance(error, HTTPException)
+        ]
+        if not unexpected:
+            # Reraise HTTPException with more specific detail
+            raise next(iter(errors.values()))
+
+        logging.error(f"Error occurred during payment creation: {unexpected[0]}")
+        reset_failed_user_status(payment)
+        # El estado se revirtió: en el siguiente intento debe aplicarse de nuevo.
+        completed.discard("status")
         raise HTTPException(
             status_code=status.HTTP_424_FAILED_DEPENDENCY,
             detail="Error occurred during payment creation.",
         )
 
-    try:
-        if payment["event_type"] == "payment_approved" and Settings.MACHINE != "DEV":
-            get_user = user_master.read_user_db(user_id=user_id, query=True)
-            thinkific.create_user_with_enrollments_user(
-                first_name=get_user.first_name,
-                last_name=get_user.last_name,
-                email=get_user.email,
-            )
+    if isinstance(enrollment_error, HTTPException):
+        raise enrollment_error
+    if enrollment_error:
+        logging.error(f"Error occurred during payment creation: {enrollment_error}")
 
-        return user_payment, user_id
+    return pipeline.results["payment"], pipeline.results["user"]["user_id"]
 
-    except HTTPException:
-        # Reraise HTTPException with more specific detail
-        raise
 
-    except Exception as ex:
-        logging.error(f"Error occurred during payment creation: {ex}")
+def reset_failed_user_status(payment: dict):
+    """
+    Si ocurre un error durante la creación del pago, actualiza el estado del usuario si existe.
 
+    Args:
+        payment (dict): Un diccionario que contiene la información del pago.
+    """
+    billing = payment["content"]["billing"]
+    get_user = user_master.read_user_db(email=billing["email"], query=True)
+    if get_user:
+        substatus_id = get_user.status_id
+        if substatus_id == "f5eaac978aab4071819528431afa79f0":
+            user_status = {
+                "status_id": status_user.Status.active.value,
+                "substatus_id": status_user.SubStatus.free.value,
+                "stage_id": status_user.StageId.failed_payment,
+            }
+            api_user_master.update_user_master(
+                user_id=get_user.user_id, data=user_status
+            )
 
-def create_or_update_user_hubspot(billing, user_id, data=None, items=None):
+
+def create_or_update_user_hubspot(
+    billing, user_id, data=None, items=None, hubspot_id=None
+):
     """
     Crea un nuevo usuario en HubSpot o actualiza un usuario existente con la información proporcionada.
 
+    Si se conoce el `hubspot_id` del usuario (guardado en `users_master`), el contacto se
+    actualiza directamente sin consultarlo por correo electrónico; la consulta solo se hace
+    si HubSpot responde 404. Cuando el contacto se crea o se encuentra por correo, su ID se
+    guarda en `users_master` para los siguientes eventos.
+
     Args:
         billing (dict): Un diccionario que contiene la información de facturación del usuario.
         user_id (str): El ID del usuario que se desea asociar en HubSpot.
         data (dict): Un diccionario que contiene la información
         items(str):  contiene la información del tipo de subscription
+        hubspot_id (int, opcional): ID del contacto en HubSpot guardado para el usuario.
 
     Raises:
         HTTPException: Si ocurre algún error durante la creación o actualización del usuario en HubSpot.
 
     Returns:
         None
+
+    Nota:
+        Si `HUBSPOT_BATCH_UPSERT` está activo, el contacto se encola en
+        `hubspot_sync.contact_batcher` y se envía a HubSpot en el siguiente lote
+        (upsert por correo electrónico), sin consultar antes el contacto; el ID retornado
+        se guarda después del envío. La función termina sin error apenas encola el
+        contacto, por lo que la etapa "hubspot" queda completada aunque el lote falle
+        después: en este modo la sincronización es de mejor esfuerzo (ver
+        `HubspotContactBatcher`).
     """
     try:
         if not data:
@@ -330,14 +523,36 @@ def create_or_update_user_hubspot(billing, user_id, data=None, items=None):
         else:
             contact_properties = data
 
+        if Settings.HUBSPOT_BATCH_UPSERT:
+            hubspot_sync.contact_batcher.add(
+                billing["email"],
+                contact_properties,
+                user_id=user_id,
+                hubspot_id=hubspot_id,
+            )
+            return
+
+        if hubspot_id:
+            try:
+                hubspot.update_user_hubspot(
+                    data=contact_properties, hubspot_id=hubspot_id
+                )
+                return
+            except HTTPException as ex:
+                if ex.status_code != status.HTTP_404_NOT_FOUND:
+                    raise
+                logging.warning(f"HubSpot contact {hubspot_id} of {user_id} not found")
+
         get_user_hubspot = hubspot.get_single_hunty_by_email(email=billing["email"])
 
         if type(get_user_hubspot) is tuple:
-            hubspot.update_user_hubspot(
-                data=contact_properties, hubspot_id=get_user_hubspot[0].get("vid")
-            )
+            contact_id = get_user_hubspot[0].get("vid")
+            hubspot.update_user_hubspot(data=contact_properties, hubspot_id=contact_id)
         else:
-            hubspot.create_user_hubspot(contact_properties)
+            contact_id = hubspot.create_user_hubspot(contact_properties).get("id")
+
+        if contact_id and str(contact_id) != str(hubspot_id):
+            save_hubspot_id(user_id=user_id, hubspot_id=contact_id)
 
     except Exception as ex:
         logging.error(
@@ -347,3 +562,37 @@ def create_or_update_user_hubspot(billing, user_id, data=None, items=None):
             status_code=status.HTTP_424_FAILED_DEPENDENCY,
             detail="Error en la creación o actualización del usuario en HubSpot.",
         )
+
+
+def save_hubspot_id(user_id, hubspot_id):
+    """
+    Guarda el ID del contacto de HubSpot del usuario en `users_master`.
+
+    Un error al guardar el ID no interrumpe el procesamiento del evento: el contacto ya fue
+    creado o actualizado en HubSpot y el ID se volverá a intentar guardar en el siguiente evento.
+
+    Args:
+        user_id (str): El ID del usuario.
+        hubspot_id (int or str): El ID del contacto en HubSpot.
+    """
+    try:
+        user_master.update_hubspot_id_db(user_id=user_id, hubspot_id=hubspot_id)
+    except Exception as ex:
+        logging.error(f"Error saving hubspot_id {hubspot_id} for {user_id}: {ex}")
+
+
+def save_thinkific_id(user_id, thinkific_id):
+    """
+    Guarda el ID del usuario de Thinkific en `users_master`.
+
+    Igual que en `save_hubspot_id`, un error al guardar el ID solo se registra: el usuario
+    ya quedó inscrito y el ID se volverá a intentar guardar en el siguiente pago aprobado.
+
+    Args:
+        user_id (str): El ID del usuario.
+        thinkific_id (int or str): El ID del usuario en Thinkific.
+    """
+    try:
+        user_master.update_thinkific_id_db(user_id=user_id, thinkific_id=thinkific_id)
+    except Exception as ex:
+        logging.error(f"Error saving thinkific_id {thinkific_id} for {user_id}: {ex}")
@@ -4,14 +4,17 @@ from datetime import datetime
 from fastapi import HTTPException, status
 from fastapi.encoders import jsonable_encoder
 
-from clients import api_user_master, historic_status
+from clients import api_user_master
 from enums import status_user
 from schema.pyments.payment import Subscriptions
 from services import user_master, user_subscriptions
 from services.process_payment import create_or_update_user_hubspot
 from settings import Settings
+from utils.deadline import deadline
+from utils.handle_exceptions import PermanentEventError
 
 
+@deadline(Settings.WEBHOOK_DEADLINE)
 def subscription(payment: dict):
     """
     Process a subscription payment and update user status accordingly.
@@ -24,16 +27,34 @@ def subscription(payment: dict):
         user master data, real-time database data, and payment details.
 
     Raises:
+        PermanentEventError: If the event is missing data or the user does not exist;
+                             retrying cannot fix either.
         HTTPException: If an error occurs during processing the subscription payment.
+
+    Note:
+        All upstream calls share a `WEBHOOK_DEADLINE` second budget; each call is capped
+        to the time that remains.
     """
 
+    billing = (payment.get("content") or {}).get("customer") or {}
+    if not billing.get("email"):
+        raise PermanentEventError(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Error: subscription event without customer email",
+        )
     try:
-        billing = payment["content"]["customer"]
+        occurred_at = datetime.utcfromtimestamp(payment["occurred_at"])
+    except (KeyError, TypeError, ValueError, OverflowError, OSError) as ex:
+        raise PermanentEventError(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Error: invalid subscription event: {ex!r}",
+        )
 
+    try:
         get_user = user_master.read_user_db(email=billing["email"], query=True)
 
         if not get_user:
-            raise HTTPException(
+            raise PermanentEventError(
                 status_code=status.HTTP_424_FAILED_DEPENDENCY,
                 detail="Error user not exist",
             )
@@ -49,22 +70,19 @@ def subscription(payment: dict):
                 "stage_id": status_user.StageId.subscription_cancelled,
             }
 
-            user_master_data = api_user_master.update_user_master(
-                user_id=user_id, data=user_status
-            )
-            if old_status["substatus_id"] != user_status["substatus_id"]:
-                historic_status.create_modify_data(old_status, now_status=user_status)
-
-            api_user_master.patch_real_time_db_status(
+            status_update = api_user_master.update_user_status(
                 user_id=user_id,
+                user_status=user_status,
+                old_status=old_status,
                 show_modal=True,
                 show_hubspot_banner=True,
                 show_banner=True,
             )
+            user_master_data = status_update["user_master"]
 
             user_subscription_data = {
                 "users_subscription_status": "subscription canceled",
-                "update_date": datetime.utcfromtimestamp(payment["occurred_at"]),
+                "update_date": occurred_at,
             }
 
             update_data = user_subscriptions.update_users_subscriptions(
@@ -80,11 +98,17 @@ def subscription(payment: dict):
             }
 
             create_or_update_user_hubspot(
-                billing=billing, user_id=user_id, data=contact_properties
+                billing=billing,
+                user_id=user_id,
+                data=contact_properties,
+                hubspot_id=get_user.hubspot_id,
             )
 
             return user_master_data, update_data
 
+    except PermanentEventError:
+        raise
+
     except Exception as ex:
         logging.error(f"Error: Failed to process subscription {ex}")
         raise HTTPException(
@@ -2,7 +2,12 @@ import logging
 
 from fastapi import HTTPException, status
 
-from repositories.user_master import get_user_email_or_user_id
+from repositories.user_master import (
+    get_thinkific_id,
+    get_user_email_or_user_id,
+    update_hubspot_id,
+    update_thinkific_id,
+)
 
 
 def read_user_db(user_id: str = None, email: str = None, query: bool = None):
@@ -46,3 +51,75 @@ def read_user_db(user_id: str = None, email: str = None, query: bool = None):
             status_code=status.HTTP_424_FAILED_DEPENDENCY,
             detail="Error accessing database",
         )
+
+
+def update_hubspot_id_db(user_id: str, hubspot_id):
+    """
+    Guarda el ID del contacto de HubSpot del usuario en la base de datos.
+
+    Args:
+        user_id (str): ID del usuario.
+        hubspot_id (int or str): ID del contacto del usuario en HubSpot.
+
+    Returns:
+        int: Número de registros actualizados.
+
+    Raises:
+        HTTPException: Excepción personalizada en caso de error al acceder a la base de datos.
+    """
+    try:
+        return update_hubspot_id(user_id=user_id, hubspot_id=int(hubspot_id))
+
+    except Exception as ex:
+        logging.error(f"Error accessing database: {ex}")
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail="Error accessing database",
+        )
+
+
+def read_thinkific_id_db(user_id: str):
+    """
+    Lee el ID de Thinkific guardado para el usuario.
+
+    Un error de la consulta (por ejemplo, si la columna `thinkific_id` aún no existe en la
+    base de datos) solo se registra y se retorna None: sin el ID, la inscripción busca al
+    usuario en Thinkific por correo electrónico.
+
+    Args:
+        user_id (str): ID del usuario.
+
+    Returns:
+        int: ID del usuario en Thinkific, o None si no se conoce.
+    """
+    try:
+        return get_thinkific_id(user_id=user_id)
+
+    except Exception as ex:
+        logging.warning(f"Error reading thinkific_id for {user_id}: {ex}")
+        return None
+
+
+def update_thinkific_id_db(user_id: str, thinkific_id):
+    """
+    Guarda el ID del usuario de Thinkific en la base de datos.
+
+    Args:
+        user_id (str): ID del usuario.
+        thinkific_id (int or str): ID del usuario en Thinkific.
+
+    Returns:
+        int: Número de registros actualizados.
+
+    Raises:
+        HTTPException: Excepción personalizada en caso de error al acceder a la base de datos.
+    """
+    try:
+        return update_thinkific_id(user_id=user_id, thinkific_id=int(thinkific_id))
+
+    except Exception as ex:
+        logging.error(f"Error accessing database: {ex}")
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail="Error accessing database",
+        )
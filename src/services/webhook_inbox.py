@@ -0,0 +1,403 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+
+from repositories import webhook_inbox
+from services import process_payment, process_subscription
+from settings import Settings
+from utils.dedupe import RecentKeys
+from utils.handle_exceptions import is_permanent_error
+from utils.list_product import plazos
+from utils.metrics import inc_counter, register_gauge_callback
+from utils.retry import backoff_delay
+
+RELEVANT_PAYMENT_EVENTS = {"payment_approved", "payment_failed"}
+SUBSCRIPTION_CANCEL_EVENTS = {"subscription_canceled", "subscription_cancelled"}
+
+# Segundos durante los cuales se reutiliza la consulta de `lane_stats` al exportar métricas.
+LANE_STATS_MAX_AGE = 5
+
+# Primera capa de deduplicación: llaves de los eventos ya guardados por esta instancia.
+recent_events = RecentKeys(Settings.WEBHOOK_DEDUPE_CACHE_SIZE)
+
+
+def event_key(payment: dict) -> str:
+    """
+    Construye la identidad de un webhook de Treli.
+
+    Un reenvío de Treli repite el tipo de evento, el pago (o la suscripción, en las
+    cancelaciones) y `occurred_at`, por lo que la combinación identifica el evento.
+
+    Args:
+        payment (dict): Cuerpo del webhook.
+
+    Returns:
+        str: Llave con el formato "event_type:payment_id|subscription_id:occurred_at".
+    """
+    content = payment.get("content") or {}
+    resource_id = content.get("payment_id") or content.get("subscription_id")
+    return f"{payment.get('event_type')}:{resource_id}:{payment.get('occurred_at')}"
+
+
+def event_lane(payment: dict) -> int:
+    """
+    Calcula el carril de un webhook a partir del email del usuario.
+
+    Los pagos traen el email en `content.billing` y las cancelaciones en
+    `content.customer`. Si no hay email se usa la suscripción o el pago. El hash es estable
+    entre instancias, de modo que todas asignan el mismo carril a un usuario.
+
+    Args:
+        payment (dict): Cuerpo del webhook.
+
+    Returns:
+        int: Carril entre 0 y `WEBHOOK_LANES` - 1.
+    """
+    content = payment.get("content") or {}
+    email = (content.get("billing") or {}).get("email") or (
+        content.get("customer") or {}
+    ).get("email")
+    identity = (
+        email.strip().lower()
+        if email
+        else str(content.get("subscription_id") or content.get("payment_id"))
+    )
+    digest = hashlib.sha1(identity.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % max(Settings.WEBHOOK_LANES, 1)
+
+
+def event_occurred_at(payment: dict) -> datetime:
+    """
+    Retorna el momento en que ocurrió el evento según Treli (`occurred_at`, en segundos
+    desde epoch), o la hora actual si el webhook no lo trae.
+    """
+    try:
+        return datetime.utcfromtimestamp(float(payment["occurred_at"]))
+    except (KeyError, TypeError, ValueError, OverflowError, OSError):
+        return datetime.utcnow()
+
+
+def event_handler(payment: dict):
+    """
+    Retorna el servicio que procesa un webhook, o None si el evento no se procesa.
+
+    Los pagos aprobados o fallidos de los planes de `plazos` se procesan con
+    `process_payment` y las cancelaciones de suscripción con `process_subscription`. Los
+    demás eventos (otros tipos de Treli o pagos de productos sin plazo) se ignoran.
+
+    Args:
+        payment (dict): Cuerpo del webhook.
+
+    Returns:
+        callable or None: Función que recibe el cuerpo del webhook y las etapas completadas.
+    """
+    event_type = payment.get("event_type")
+    content = payment.get("content") or {}
+    product_name = (content.get("items") or [{}])[0].get(
+        "name", "Nombre del producto no encontrado"
+    )
+
+    if event_type in RELEVANT_PAYMENT_EVENTS and product_name in plazos:
+        return process_payment.process_payment
+    if event_type in SUBSCRIPTION_CANCEL_EVENTS:
+        return lambda payment, completed: process_subscription.subscription(payment)
+    return None
+
+
+def dispatch_event(payment: dict, completed: set = None):
+    """
+    Procesa un webhook de Treli con el servicio que le corresponde (ver `event_handler`).
+
+    Args:
+        payment (dict): Cuerpo del webhook.
+        completed (set, opcional): Etapas de `process_payment` ya completadas en intentos
+                                   anteriores (ver `process_payment.process_payment`).
+
+    Returns:
+        El resultado del servicio que procesó el evento, o None si el evento se ignora.
+    """
+    handler = event_handler(payment)
+    if handler is None:
+        logging.info(f"Ignoring webhook event {payment.get('event_type')}")
+        return None
+    return handler(payment, completed)
+
+
+def enqueue_event(payment: dict):
+    """
+    Guarda un webhook en el inbox para que lo procese un worker, descartando duplicados.
+
+    Los reenvíos de Treli se detectan antes de cualquier efecto: primero en memoria con
+    `recent_events` (sin consultar la base de datos) y luego con la llave única del inbox,
+    que cubre los duplicados recibidos por otra instancia o antes de un reinicio.
+
+    Args:
+        payment (dict): Cuerpo del webhook.
+
+    Returns:
+        int or None: ID del evento en el inbox, o None si el evento es un duplicado.
+
+    Raises:
+        HTTPException: 424 si el evento no pudo guardarse; Treli reintentará el envío.
+    """
+    if seen_recently(payment):
+        return None
+
+    key = event_key(payment)
+    try:
+        event_id = webhook_inbox.insert_event(
+            key,
+            payment.get("event_type"),
+            payment,
+            event_lane(payment),
+            event_occurred_at(payment),
+        )
+    except Exception as ex:
+        logging.error(f"Error saving webhook in inbox: {ex}")
+        raise HTTPException(
+            status_code=status.HTTP_424_FAILED_DEPENDENCY,
+            detail="Error saving webhook",
+        )
+
+    recent_events.add(key)
+    if event_id is None:
+        _count_duplicate("database")
+        return None
+
+    inc_counter(
+        "webhook_events_total",
+        help_text="Webhooks recibidos y procesados por resultado.",
+        result="received",
+    )
+    inbox_worker.wake()
+    return event_id
+
+
+def seen_recently(payment: dict) -> bool:
+    """
+    Indica si esta instancia ya guardó el evento, sin consultar la base de datos.
+
+    Args:
+        payment (dict): Cuerpo del webhook.
+
+    Returns:
+        bool: True si el evento es un duplicado conocido.
+    """
+    if event_key(payment) not in recent_events:
+        return False
+    _count_duplicate("memory")
+    return True
+
+
+def _count_duplicate(layer: str):
+    inc_counter(
+        "webhook_duplicates_total",
+        help_text="Reenvíos de webhooks descartados por capa de deduplicación.",
+        layer=layer,
+    )
+
+
+def process_claimed_event(event: dict):
+    """
+    Procesa un evento reclamado del inbox y registra el resultado.
+
+    Los eventos que no se procesan (ver `event_handler`) se marcan como procesados sin
+    llamar a ningún servicio.
+
+    Si el procesamiento falla, el evento se reintenta con espera exponencial hasta
+    `WEBHOOK_MAX_ATTEMPTS` intentos; después queda como fallido para revisión manual, y un
+    nuevo reenvío de Treli lo vuelve a dejar pendiente. Los errores permanentes (ver
+    `utils.handle_exceptions.is_permanent_error`: usuario inexistente, cuerpo inválido) lo
+    dejan como fallido de inmediato, sin detener su carril durante los reintentos.
+    Las etapas de `process_payment` que terminaron sin error se guardan con el evento y no
+    se repiten en los reintentos.
+
+    Args:
+        event (dict): Evento retornado por `webhook_inbox.claim_events`.
+    """
+    event_id = event["webhook_inbox_id"]
+    completed = set(event.get("completed_stages") or [])
+    if event_handler(event["payload"]) is None:
+        webhook_inbox.mark_done(event_id)
+        inc_counter(
+            "webhook_events_total",
+            help_text="Webhooks recibidos y procesados por resultado.",
+            result="ignored",
+        )
+        return
+
+    try:
+        dispatch_event(event["payload"], completed)
+    except Exception as ex:
+        error = str(getattr(ex, "detail", ex))
+        retry_at = None
+        if (
+            not is_permanent_error(ex)
+            and event["attempts"] < Settings.WEBHOOK_MAX_ATTEMPTS
+        ):
+            delay = backoff_delay(
+                event["attempts"] - 1,
+                Settings.WEBHOOK_RETRY_BACKOFF,
+                Settings.WEBHOOK_RETRY_MAX_BACKOFF,
+            )
+            retry_at = datetime.utcnow() + timedelta(seconds=delay)
+        logging.error(
+            f"webhook {event_id} attempt {event['attempts']} failed: {error}"
+            + (f", retry at {retry_at}" if retry_at else ", giving up")
+        )
+        webhook_inbox.mark_failed(event_id, error, retry_at, sorted(completed))
+        if not retry_at:
+            recent_events.discard(event_key(event["payload"]))
+        result = "retried" if retry_at else "failed"
+    else:
+        webhook_inbox.mark_done(event_id)
+        result = "processed"
+
+    inc_counter(
+        "webhook_events_total",
+        help_text="Webhooks recibidos y procesados por resultado.",
+        result=result,
+    )
+
+
+class InboxWorker:
+    """
+    Pool de hilos que procesa los eventos del inbox de webhooks.
+
+    Los eventos se reparten en `WEBHOOK_LANES` carriles según el email del usuario
+    (`event_lane`). Cada hilo reclama con `webhook_inbox.claim_events` hasta `claim_batch`
+    eventos, cada uno el primero pendiente de su carril, y los procesa en orden. Mientras un
+    evento está en proceso su carril queda detenido, así los eventos de un usuario se
+    aplican en orden de `occurred_at` y los de usuarios de carriles distintos en paralelo.
+
+    Cuando no hay eventos espera `poll_interval` segundos, o menos si `wake` indica que
+    llegó un evento nuevo a esta instancia. Varias instancias pueden correr sus workers a la
+    vez: `FOR UPDATE SKIP LOCKED` reparte los eventos entre ellas.
+
+    Atributos:
+        workers (int): Número de hilos.
+        poll_interval (float): Segundos de espera cuando no hay eventos pendientes.
+        claim_batch (int): Eventos reclamados por consulta.
+        lease_seconds (float): Segundos que un evento queda reservado para su worker.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        poll_interval: float,
+        claim_batch: int,
+        lease_seconds: float,
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.claim_batch = claim_batch
+        self.lease_seconds = lease_seconds
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self):
+        """
+        Inicia los hilos del pool. No hace nada si ya están corriendo o si `workers` es 0.
+        """
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"webhook-inbox-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = None):
+        """
+        Detiene los hilos después de que terminen el evento en curso.
+
+        Los eventos reclamados y no procesados vuelven a estar disponibles cuando vence su
+        reclamo.
+        """
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """
+        Avisa a los hilos que hay eventos nuevos.
+        """
+        self._wake.set()
+
+    def run_once(self) -> int:
+        """
+        Reclama y procesa un lote de eventos.
+
+        Returns:
+            int: Número de eventos procesados.
+        """
+        events = webhook_inbox.claim_events(self.claim_batch, self.lease_seconds)
+        for event in events:
+            process_claimed_event(event)
+        return len(events)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as ex:
+                logging.error(f"webhook inbox worker error: {ex}")
+                processed = 0
+            if not processed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+
+_lane_stats = {"checked": None, "rows": []}
+_lane_stats_lock = threading.Lock()
+
+
+def lane_stats() -> list:
+    """
+    Retorna la cola de cada carril, consultándola como máximo cada `LANE_STATS_MAX_AGE`
+    segundos. Si la consulta falla se retorna el último resultado.
+    """
+    with _lane_stats_lock:
+        checked = _lane_stats["checked"]
+        if checked is None or time.monotonic() - checked >= LANE_STATS_MAX_AGE:
+            _lane_stats["checked"] = time.monotonic()
+            try:
+                _lane_stats["rows"] = webhook_inbox.lane_stats()
+            except Exception as ex:
+                logging.error(f"Error reading webhook lane stats: {ex}")
+        return _lane_stats["rows"]
+
+
+def _lane_lag(row: dict) -> float:
+    oldest = row["oldest_received_date"]
+    if oldest is None:
+        return 0.0
+    return max((datetime.utcnow() - oldest).total_seconds(), 0.0)
+
+
+register_gauge_callback(
+    "webhook_lane_depth",
+    lambda: [({"lane": row["lane"]}, row["depth"]) for row in lane_stats()],
+    help_text="Webhooks pendientes o en proceso por carril.",
+)
+register_gauge_callback(
+    "webhook_lane_lag_seconds",
+    lambda: [({"lane": row["lane"]}, _lane_lag(row)) for row in lane_stats()],
+    help_text="Segundos desde la recepción del webhook más antiguo sin procesar del carril.",
+)
+
+inbox_worker = InboxWorker(
+    workers=Settings.WEBHOOK_WORKERS,
+    poll_interval=Settings.WEBHOOK_POLL_INTERVAL,
+    claim_batch=Settings.WEBHOOK_CLAIM_BATCH,
+    lease_seconds=Settings.WEBHOOK_LEASE_SECONDS,
+)
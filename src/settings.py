@@ -27,15 +27,32 @@ class Settings:
     SCOPE = os.getenv("SCOPE")
     USER_TRELI = f"{USERNAME}:{TRELI_API_KEY}".encode("ascii")
     USER_TRELI_AUTHENTICATION = base64.b64encode(USER_TRELI).decode("ascii")
+    # páginas de listados descargadas por adelantado
+    TRELI_PAGE_PREFETCH = int(os.getenv("TRELI_PAGE_PREFETCH", 3))
+    TRELI_MAX_PAGES = int(os.getenv("TRELI_MAX_PAGES", 1000))
+    PAGINATION_WORKERS = int(os.getenv("PAGINATION_WORKERS", 8))
+    # caché de planes, pasarelas y plantillas (segundos)
+    TRELI_CATALOG_CACHE_TTL = int(os.getenv("TRELI_CATALOG_CACHE_TTL", 600))
+    TRELI_CATALOG_CACHE_MAX_STALE = int(
+        os.getenv("TRELI_CATALOG_CACHE_MAX_STALE", 86400)
+    )
 
     BASE_URL = os.getenv("BASE_URL")
     USER_MASTER = f"{BASE_URL}user/master"
     USERS_RAW_URL = os.getenv("USERS_RAW_URL")
     USER_MASTER_UPDATE = f"{USER_MASTER}/update"
+    # endpoint que actualiza estado, histórico y base en tiempo real en una sola solicitud;
+    # vacío si el API de usuarios no lo ofrece. Contrato en
+    # clients.api_user_master._update_user_status_composite
+    USERS_API_COMPOSITE_STATUS_URL = os.getenv("USERS_API_COMPOSITE_STATUS_URL", "")
     # auth api
     AUTH_ROLE = f"{BASE_URL}auth"
     PASSWORD = os.getenv("PASSWORD")
     ALGORITHM = os.getenv("ALGORITHM")
+    # service account tokens (segundos)
+    SA_TOKEN_REFRESH_MARGIN = int(os.getenv("SA_TOKEN_REFRESH_MARGIN", 300))
+    SA_TOKEN_EXPIRY_MARGIN = int(os.getenv("SA_TOKEN_EXPIRY_MARGIN", 30))
+    SA_TOKEN_DEFAULT_TTL = int(os.getenv("SA_TOKEN_DEFAULT_TTL", 3600))
 
     # THINKIFIC
     API_KEY_THINKIFIC = os.getenv("API_KEY_THINKIFIC")
@@ -44,6 +61,19 @@ class Settings:
     GET_COURSES_THINKIFIC = f"{URL_BASE_THINKIFIC}/courses"
     ENROLLMENT_USER_THINKIFIC = f"{URL_BASE_THINKIFIC}/enrollments"
     SUBDOMAIN = "huntyacademy"
+    THINKIFIC_ENROLLMENT_CONCURRENCY = int(
+        os.getenv("THINKIFIC_ENROLLMENT_CONCURRENCY", 8)
+    )
+    THINKIFIC_ENROLLMENT_TIMEOUT = float(os.getenv("THINKIFIC_ENROLLMENT_TIMEOUT", 10))
+    THINKIFIC_ENROLLMENT_RETRIES = int(os.getenv("THINKIFIC_ENROLLMENT_RETRIES", 3))
+    THINKIFIC_ENROLLMENT_BACKOFF = float(os.getenv("THINKIFIC_ENROLLMENT_BACKOFF", 0.5))
+    THINKIFIC_ENROLLMENT_MAX_BACKOFF = float(
+        os.getenv("THINKIFIC_ENROLLMENT_MAX_BACKOFF", 8)
+    )
+    THINKIFIC_COURSES_CACHE_TTL = int(os.getenv("THINKIFIC_COURSES_CACHE_TTL", 3600))
+    THINKIFIC_COURSES_CACHE_MAX_STALE = int(
+        os.getenv("THINKIFIC_COURSES_CACHE_MAX_STALE", 86400)
+    )
 
     # HUBSPOT
     HUBSPOT_URL = os.getenv("HUBSPOT_URL")
@@ -52,3 +82,112 @@ class Settings:
     HUBSPOT_EMAIL_URL = f"{HUBSPOT_CONTACT_URL}/email"
     HUBSPOT_PROFILE = "profile?"
     HUBSPOT_ACCESS_TOKEN = os.getenv("HUBSPOT_ACCESS_TOKEN")
+    # mejor esfuerzo: los contactos se encolan en memoria y el evento se da por procesado
+    # antes del envío; un reinicio o HUBSPOT_BATCH_MAX_ATTEMPTS fallos pueden perderlos
+    HUBSPOT_BATCH_UPSERT = os.getenv("HUBSPOT_BATCH_UPSERT", "false").lower() == "true"
+    HUBSPOT_BATCH_SIZE = int(os.getenv("HUBSPOT_BATCH_SIZE", 100))
+    HUBSPOT_BATCH_FLUSH_INTERVAL = float(os.getenv("HUBSPOT_BATCH_FLUSH_INTERVAL", 5))
+    HUBSPOT_BATCH_MAX_ATTEMPTS = int(os.getenv("HUBSPOT_BATCH_MAX_ATTEMPTS", 5))
+
+    # JOBS
+    PAYMENT_PIPELINE_WORKERS = int(os.getenv("PAYMENT_PIPELINE_WORKERS", 16))
+    DAILY_STATS_WORKERS = int(os.getenv("DAILY_STATS_WORKERS", 4))
+
+    # HTTP CLIENTS
+    HTTP_KEEP_ALIVE = os.getenv("HTTP_KEEP_ALIVE", "true").lower() == "true"
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 10))
+    TRELI_POOL_SIZE = int(os.getenv("TRELI_POOL_SIZE", HTTP_POOL_SIZE))
+    HUBSPOT_POOL_SIZE = int(os.getenv("HUBSPOT_POOL_SIZE", HTTP_POOL_SIZE))
+    THINKIFIC_POOL_SIZE = int(os.getenv("THINKIFIC_POOL_SIZE", HTTP_POOL_SIZE))
+    USERS_API_POOL_SIZE = int(os.getenv("USERS_API_POOL_SIZE", HTTP_POOL_SIZE))
+
+    # BULKHEADS (llamadas simultáneas por dependencia; 0 = sin límite)
+    TRELI_BULKHEAD = int(os.getenv("TRELI_BULKHEAD", TRELI_POOL_SIZE))
+    HUBSPOT_BULKHEAD = int(os.getenv("HUBSPOT_BULKHEAD", HUBSPOT_POOL_SIZE))
+    THINKIFIC_BULKHEAD = int(os.getenv("THINKIFIC_BULKHEAD", THINKIFIC_POOL_SIZE))
+    USERS_API_BULKHEAD = int(os.getenv("USERS_API_BULKHEAD", USERS_API_POOL_SIZE))
+    DB_BULKHEAD = int(os.getenv("DB_BULKHEAD", 10))
+    # espera máxima por un turno antes de fallar (segundos)
+    BULKHEAD_MAX_WAIT = float(os.getenv("BULKHEAD_MAX_WAIT", 1))
+    # hilos del pool de FastAPI para endpoints síncronos
+    THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", 40))
+
+    # RATE LIMITS (solicitudes por segundo por proveedor; 0 = sin límite)
+    TRELI_RATE_LIMIT = float(os.getenv("TRELI_RATE_LIMIT", 0))
+    TRELI_RATE_BURST = int(os.getenv("TRELI_RATE_BURST", 10))
+    HUBSPOT_RATE_LIMIT = float(os.getenv("HUBSPOT_RATE_LIMIT", 10))
+    HUBSPOT_RATE_BURST = int(os.getenv("HUBSPOT_RATE_BURST", 10))
+    THINKIFIC_RATE_LIMIT = float(os.getenv("THINKIFIC_RATE_LIMIT", 0))
+    THINKIFIC_RATE_BURST = int(os.getenv("THINKIFIC_RATE_BURST", 10))
+    USERS_API_RATE_LIMIT = float(os.getenv("USERS_API_RATE_LIMIT", 0))
+    USERS_API_RATE_BURST = int(os.getenv("USERS_API_RATE_BURST", 10))
+    # límites por endpoint: {"<proveedor>.<operación>": {"rate": 2, "burst": 5}}
+    RATE_LIMIT_ENDPOINTS = os.getenv("RATE_LIMIT_ENDPOINTS", "{}")
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", 30))
+
+    # RESILIENCE
+    # reintentos de solicitudes idempotentes (espera exponencial con jitter, segundos)
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+    HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", 0.2))
+    HTTP_RETRY_MAX_BACKOFF = float(os.getenv("HTTP_RETRY_MAX_BACKOFF", 5))
+    # circuit breaker por proveedor (0 = desactivado)
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+    CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", 30))
+
+    # TIMEOUTS (segundos)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 15))
+    TRELI_CONNECT_TIMEOUT = float(
+        os.getenv("TRELI_CONNECT_TIMEOUT", HTTP_CONNECT_TIMEOUT)
+    )
+    TRELI_READ_TIMEOUT = float(os.getenv("TRELI_READ_TIMEOUT", HTTP_READ_TIMEOUT))
+    HUBSPOT_CONNECT_TIMEOUT = float(
+        os.getenv("HUBSPOT_CONNECT_TIMEOUT", HTTP_CONNECT_TIMEOUT)
+    )
+    HUBSPOT_READ_TIMEOUT = float(os.getenv("HUBSPOT_READ_TIMEOUT", HTTP_READ_TIMEOUT))
+    THINKIFIC_CONNECT_TIMEOUT = float(
+        os.getenv("THINKIFIC_CONNECT_TIMEOUT", HTTP_CONNECT_TIMEOUT)
+    )
+    THINKIFIC_READ_TIMEOUT = float(
+        os.getenv("THINKIFIC_READ_TIMEOUT", HTTP_READ_TIMEOUT)
+    )
+    USERS_API_CONNECT_TIMEOUT = float(
+        os.getenv("USERS_API_CONNECT_TIMEOUT", HTTP_CONNECT_TIMEOUT)
+    )
+    USERS_API_READ_TIMEOUT = float(
+        os.getenv("USERS_API_READ_TIMEOUT", HTTP_READ_TIMEOUT)
+    )
+    # tiempo total para procesar un webhook (pago o suscripción); 0 = sin límite
+    WEBHOOK_DEADLINE = float(os.getenv("WEBHOOK_DEADLINE", 120))
+
+    # WEBHOOK INBOX (eventos guardados en users_payments.webhook_inbox)
+    WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 4))
+    WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", 1))
+    WEBHOOK_CLAIM_BATCH = int(os.getenv("WEBHOOK_CLAIM_BATCH", 1))
+    # el reclamo debe cubrir el procesamiento de todo el lote
+    WEBHOOK_LEASE_SECONDS = float(
+        os.getenv(
+            "WEBHOOK_LEASE_SECONDS",
+            (WEBHOOK_DEADLINE or 300) * WEBHOOK_CLAIM_BATCH + 60,
+        )
+    )
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 5))
+    WEBHOOK_RETRY_BACKOFF = float(os.getenv("WEBHOOK_RETRY_BACKOFF", 30))
+    WEBHOOK_RETRY_MAX_BACKOFF = float(os.getenv("WEBHOOK_RETRY_MAX_BACKOFF", 3600))
+    # Llaves de eventos recientes guardadas en memoria para descartar reenvíos de Treli
+    WEBHOOK_DEDUPE_CACHE_SIZE = int(os.getenv("WEBHOOK_DEDUPE_CACHE_SIZE", 10000))
+    # Carriles de procesamiento: los eventos de un usuario se aplican en orden dentro de su
+    # carril y los carriles se procesan en paralelo. Cambiarlo con eventos pendientes puede
+    # mover a un usuario de carril.
+    WEBHOOK_LANES = int(os.getenv("WEBHOOK_LANES", 16))
+
+    # HEDGED REQUESTS (lecturas idempotentes de Treli)
+    HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 95))
+    HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", 0.05))
+    # fracción máxima de solicitudes que pueden duplicarse
+    HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", 0.1))
+    HEDGE_BUDGET_MAX = float(os.getenv("HEDGE_BUDGET_MAX", 10))
+    HEDGE_LATENCY_WINDOW = int(os.getenv("HEDGE_LATENCY_WINDOW", 200))
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20))
+    HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", 32))
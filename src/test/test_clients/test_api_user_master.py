@@ -0,0 +1,134 @@
+import threading
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from clients import api_user_master
+from fake_upstreams import users_api
+from utils.json_codec import dumps, loads
+
+user_status = {"status_id": "active", "substatus_id": "pro", "stage_id": "paid"}
+old_status = {"user_id": "u1", "status_id": "active", "substatus_id": "free"}
+
+
+@pytest.fixture
+def composite_url(request):
+    with mock.patch.object(
+        api_user_master.setting_var, "USERS_API_COMPOSITE_STATUS_URL", request.param
+    ), mock.patch.object(api_user_master, "generate_sa_token", return_value="token"):
+        yield request.param
+
+
+def response(status_code: int, body) -> mock.Mock:
+    return mock.Mock(status_code=status_code, content=dumps(body))
+
+
+@pytest.mark.parametrize("composite_url", [""], indirect=True)
+def test_fan_out_runs_the_three_updates(composite_url):
+    with mock.patch.object(
+        api_user_master, "update_user_master", return_value={"user_id": "u1"}
+    ), mock.patch.object(
+        api_user_master, "patch_real_time_db_status", return_value={"notified": True}
+    ), mock.patch.object(
+        api_user_master.historic_status, "create_historic", return_value={"id": 1}
+    ) as create_historic:
+        results = api_user_master.update_user_status("u1", user_status, old_status)
+
+    assert results == {
+        "user_master": {"user_id": "u1"},
+        "real_time_db": {"notified": True},
+        "historic": {"id": 1},
+    }
+    assert create_historic.call_args[0][0]["current_sub_status_id"] == "pro"
+
+
+@pytest.mark.parametrize("composite_url", [""], indirect=True)
+def test_fan_out_waits_for_every_call_when_one_fails_unexpectedly(composite_url):
+    real_time_db_done = threading.Event()
+
+    def slow_patch(**kwargs):
+        real_time_db_done.wait(0.05)
+        real_time_db_done.set()
+        return {"notified": True}
+
+    with mock.patch.object(
+        api_user_master, "update_user_master", side_effect=RuntimeError("boom")
+    ), mock.patch.object(
+        api_user_master, "patch_real_time_db_status", side_effect=slow_patch
+    ):
+        with pytest.raises(HTTPException) as error:
+            api_user_master.update_user_status("u1", user_status)
+
+    assert error.value.status_code == 424
+    assert "user_master: boom" in error.value.detail
+    assert real_time_db_done.is_set()
+
+
+@pytest.mark.parametrize(
+    "composite_url", ["http://users/user/master/status"], indirect=True
+)
+def test_composite_sends_one_request_with_the_documented_body(composite_url):
+    body = {"user_master": {"user_id": "u1"}, "real_time_db": {"notified": True}}
+    with mock.patch.object(
+        api_user_master.users_api_client, "put", return_value=response(200, body)
+    ) as put:
+        results = api_user_master.update_user_status(
+            "u1", user_status, show_banner=False
+        )
+
+    assert results == {"historic": None, **body}
+    assert put.call_args.args == ("http://users/user/master/status/u1",)
+    assert put.call_args.kwargs["idempotent"] is True
+    sent = loads(put.call_args.kwargs["data"])
+    assert sent == {
+        "user_master": user_status,
+        "historic": None,
+        "real_time_db": {
+            "show_modal": True,
+            "show_hubspot_banner": True,
+            "show_banner": False,
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    "composite_url", ["http://users/user/master/status"], indirect=True
+)
+def test_composite_response_without_expected_keys_fails(composite_url):
+    with mock.patch.object(
+        api_user_master.users_api_client,
+        "put",
+        return_value=response(200, {"ok": True}),
+    ):
+        with pytest.raises(HTTPException) as error:
+            api_user_master.update_user_status("u1", user_status, old_status)
+
+    assert error.value.status_code == 424
+    assert "historic" in error.value.detail
+
+
+@pytest.mark.parametrize(
+    "composite_url", ["http://users/user/master/status"], indirect=True
+)
+def test_composite_falls_back_to_fan_out_when_endpoint_is_missing(composite_url):
+    with mock.patch.object(
+        api_user_master.users_api_client,
+        "put",
+        return_value=response(404, {"detail": "Not Found"}),
+    ), mock.patch.object(
+        api_user_master, "_update_user_status_fan_out", return_value={"fan": "out"}
+    ) as fan_out:
+        assert api_user_master.update_user_status("u1", user_status) == {"fan": "out"}
+
+    fan_out.assert_called_once()
+
+
+def test_fake_users_api_composite_endpoint_follows_the_contract():
+    historic = {"user_id": "u1", "current_sub_status_id": "pro"}
+    body = {"user_master": user_status, "historic": historic, "real_time_db": {}}
+
+    results = TestClient(users_api.app).put("/user/master/status/u1", json=body).json()
+
+    assert api_user_master._missing_composite_keys(results, historic) == []
@@ -0,0 +1,99 @@
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException, status
+
+from clients import thinkific
+
+
+@pytest.fixture
+def upstream():
+    with mock.patch.multiple(
+        thinkific,
+        create_user_and_send_email=mock.DEFAULT,
+        get_user_id_by_email=mock.DEFAULT,
+        get_courses=mock.DEFAULT,
+        get_enrolled_course_ids=mock.DEFAULT,
+        enroll_user_courses=mock.DEFAULT,
+    ) as mocks:
+        mocks["get_courses"].return_value = [1, 2, 3]
+        mocks["enroll_user_courses"].side_effect = lambda user_id, course_ids: {
+            "enrolled": list(course_ids),
+            "failed": [],
+        }
+        yield mocks
+
+
+def enroll(thinkific_id=None):
+    return thinkific.create_user_with_enrollments_user(
+        "Ana", "Gómez", "ana@example.com", thinkific_id=thinkific_id
+    )
+
+
+def test_new_user_is_created_and_enrolled_in_all_courses(upstream):
+    upstream["create_user_and_send_email"].return_value = 55
+
+    result = enroll()
+
+    assert result.status_code == status.HTTP_201_CREATED
+    assert result.detail == {"enrolled": [1, 2, 3], "failed": [], "thinkific_id": 55}
+    upstream["get_enrolled_course_ids"].assert_not_called()
+
+
+def test_stored_id_skips_creation_and_enrolls_only_missing_courses(upstream):
+    upstream["get_enrolled_course_ids"].return_value = {1, 3}
+
+    result = enroll(thinkific_id=77)
+
+    assert result.status_code == status.HTTP_202_ACCEPTED
+    assert result.detail["enrolled"] == [2]
+    assert result.detail["thinkific_id"] == 77
+    upstream["create_user_and_send_email"].assert_not_called()
+    upstream["get_enrolled_course_ids"].assert_called_once_with(77)
+
+
+def test_existing_user_is_found_by_email_after_422(upstream):
+    upstream["create_user_and_send_email"].return_value = (
+        status.HTTP_422_UNPROCESSABLE_ENTITY
+    )
+    upstream["get_user_id_by_email"].return_value = 88
+    upstream["get_enrolled_course_ids"].return_value = {1, 2, 3}
+
+    result = enroll()
+
+    assert result.status_code == status.HTTP_202_ACCEPTED
+    assert result.detail == {"enrolled": [], "failed": [], "thinkific_id": 88}
+    upstream["get_user_id_by_email"].assert_called_once_with("ana@example.com")
+
+
+def test_existing_user_missing_from_lookup_fails(upstream):
+    upstream["create_user_and_send_email"].return_value = (
+        status.HTTP_422_UNPROCESSABLE_ENTITY
+    )
+    upstream["get_user_id_by_email"].return_value = None
+
+    with pytest.raises(HTTPException):
+        enroll()
+    upstream["enroll_user_courses"].assert_not_called()
+
+
+def test_pending_courses_falls_back_to_all_courses_when_lookup_fails(upstream):
+    upstream["get_enrolled_course_ids"].side_effect = HTTPException(404, "down")
+
+    assert thinkific._pending_courses(77, [1, 2]) == [1, 2]
+
+
+def test_partial_enrollment_failure_raises_424_with_summary(upstream):
+    upstream["get_enrolled_course_ids"].return_value = set()
+    upstream["enroll_user_courses"].side_effect = None
+    upstream["enroll_user_courses"].return_value = {
+        "enrolled": [1, 3],
+        "failed": [{"course_id": 2, "error": "timeout"}],
+    }
+
+    with pytest.raises(HTTPException) as error:
+        enroll(thinkific_id=77)
+
+    assert error.value.status_code == status.HTTP_424_FAILED_DEPENDENCY
+    assert error.value.detail["failed"] == [{"course_id": 2, "error": "timeout"}]
+    assert error.value.detail["thinkific_id"] == 77
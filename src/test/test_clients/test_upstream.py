@@ -0,0 +1,46 @@
+import asyncio
+
+from clients.upstream import Upstream
+
+
+async def current_client(upstream):
+    return upstream.async_client
+
+
+def test_async_client_is_per_event_loop_and_closed_with_its_loop():
+    upstream = Upstream("test-async", pool_size=2)
+
+    async def open_and_close():
+        client = upstream.async_client
+        await upstream.aclose()
+        return client
+
+    first = asyncio.run(current_client(upstream))
+    second = asyncio.run(open_and_close())
+
+    assert second is not first
+    assert second.is_closed
+    # El cliente del primer loop (ya cerrado) se descartó al crear el segundo.
+    assert upstream._async_clients == {}
+
+
+def test_async_client_of_a_running_loop_is_not_replaced():
+    upstream = Upstream("test-async-shared", pool_size=2)
+    other_loop = asyncio.new_event_loop()
+    try:
+        other = other_loop.run_until_complete(current_client(upstream))
+        assert other_loop.run_until_complete(current_client(upstream)) is other
+
+        async def use_and_close():
+            client = upstream.async_client
+            await upstream.aclose()
+            return client
+
+        # Mientras `other_loop` está abierto su cliente sigue vigente.
+        assert asyncio.run(use_and_close()) is not other
+        assert not other.is_closed
+        assert upstream._async_clients == {other_loop: other}
+    finally:
+        other_loop.run_until_complete(upstream.aclose())
+        other_loop.close()
+    assert other.is_closed
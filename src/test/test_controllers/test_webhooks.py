@@ -0,0 +1,61 @@
+from unittest import mock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services import webhook_inbox
+from utils.dedupe import RecentKeys
+
+client = TestClient(app)
+ruta = "/treli/webhooks"
+
+payment = {
+    "event_type": "payment_approved",
+    "occurred_at": 1690898390,
+    "content": {"payment_id": 7, "billing": {"email": "ana@example.com"}},
+}
+
+
+@pytest.fixture(autouse=True)
+def recent_events():
+    with mock.patch.object(webhook_inbox, "recent_events", RecentKeys(100)):
+        with mock.patch.object(webhook_inbox.inbox_worker, "wake") as wake:
+            yield wake
+
+
+def test_webhook_is_saved_in_inbox_and_accepted(recent_events):
+    with mock.patch.object(
+        webhook_inbox.webhook_inbox, "insert_event", return_value=5
+    ) as insert_event:
+        response = client.post(ruta, json=payment)
+
+    assert response.status_code == 202
+    assert response.json()["webhook_inbox_id"] == 5
+    assert response.json()["duplicate"] is False
+    assert insert_event.call_args[0][0] == "payment_approved:7:1690898390"
+    recent_events.assert_called_once()
+
+
+def test_redelivered_webhook_is_accepted_as_duplicate():
+    with mock.patch.object(
+        webhook_inbox.webhook_inbox, "insert_event", return_value=None
+    ) as insert_event:
+        first = client.post(ruta, json=payment)
+        second = client.post(ruta, json=payment)
+
+    assert first.status_code == second.status_code == 202
+    assert first.json()["duplicate"] is True
+    assert second.json()["duplicate"] is True
+    # El segundo reenvío se descarta en memoria, sin consultar la base de datos.
+    assert insert_event.call_count == 1
+
+
+def test_webhook_returns_424_when_inbox_is_unavailable():
+    with mock.patch.object(
+        webhook_inbox.webhook_inbox, "insert_event", side_effect=Exception("db down")
+    ):
+        response = client.post(ruta, json=payment)
+
+    assert response.status_code == 424
+    assert response.json() == {"detail": "Error saving webhook"}
@@ -0,0 +1,112 @@
+import re
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException, status
+
+from repositories import daily_payment_stats as repository
+from services import daily_payment_stats
+
+
+@pytest.fixture
+def upsert():
+    with mock.patch.object(
+        daily_payment_stats, "upsert_daily_payment_stats", return_value=3
+    ) as upsert:
+        yield upsert
+
+
+def test_aggregate_range_defaults_to_yesterday(upsert):
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+
+    results = daily_payment_stats.aggregate_range()
+
+    assert results == [{"stats_date": yesterday, "rows": 3}]
+    upsert.assert_called_once_with(yesterday)
+
+
+def test_aggregate_range_processes_every_day_of_the_range(upsert):
+    results = daily_payment_stats.aggregate_range(
+        start_date=date(2023, 7, 1), end_date=date(2023, 7, 3), workers=2
+    )
+
+    assert [result["stats_date"] for result in results] == [
+        date(2023, 7, 1),
+        date(2023, 7, 2),
+        date(2023, 7, 3),
+    ]
+    assert upsert.call_count == 3
+
+
+def test_aggregate_range_rejects_end_before_start(upsert):
+    with pytest.raises(HTTPException) as error:
+        daily_payment_stats.aggregate_range(
+            start_date=date(2023, 7, 2), end_date=date(2023, 7, 1)
+        )
+
+    assert error.value.status_code == status.HTTP_400_BAD_REQUEST
+    upsert.assert_not_called()
+
+
+def test_aggregate_range_reports_every_failed_day(upsert):
+    failing = {date(2023, 7, 1), date(2023, 7, 3)}
+
+    def recalculate(day):
+        if day in failing:
+            raise RuntimeError("database down")
+        return 3
+
+    upsert.side_effect = recalculate
+
+    with pytest.raises(HTTPException) as error:
+        daily_payment_stats.aggregate_range(
+            start_date=date(2023, 7, 1), end_date=date(2023, 7, 3)
+        )
+
+    assert error.value.status_code == status.HTTP_424_FAILED_DEPENDENCY
+    assert error.value.detail["failed_dates"] == ["2023-07-01", "2023-07-03"]
+    assert upsert.call_count == 3
+
+
+def test_upsert_commits_one_transaction_per_day():
+    with mock.patch.object(repository.database, "SessionLocal") as session:
+        db = session.return_value
+        db.execute.return_value.rowcount = 4
+
+        assert repository.upsert_daily_payment_stats(date(2023, 7, 1)) == 4
+
+    assert db.execute.call_count == 2
+    params = db.execute.call_args.args[1]
+    assert params["day_start"] == datetime(2023, 7, 1)
+    assert params["day_end"] == datetime(2023, 7, 2)
+    assert params["amount_pattern"] == repository.AMOUNT_PATTERN
+    db.commit.assert_called_once_with()
+    db.close.assert_called_once_with()
+
+
+def test_upsert_rolls_back_on_error():
+    with mock.patch.object(repository.database, "SessionLocal") as session:
+        db = session.return_value
+        db.execute.side_effect = RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            repository.upsert_daily_payment_stats(date(2023, 7, 1))
+
+    db.rollback.assert_called_once_with()
+    db.commit.assert_not_called()
+    db.close.assert_called_once_with()
+
+
+@pytest.mark.parametrize(
+    "amount, summed",
+    [
+        ("129900", True),
+        ("129900.50", True),
+        ("-10.5", True),
+        ("", False),
+        ("N/A", False),
+    ],
+)
+def test_amount_pattern_only_accepts_decimal_numbers(amount, summed):
+    assert bool(re.match(repository.AMOUNT_PATTERN, amount.strip())) is summed
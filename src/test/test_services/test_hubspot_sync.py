@@ -0,0 +1,119 @@
+from unittest import mock
+
+import pytest
+import requests
+from fastapi import HTTPException
+
+from services import hubspot_sync
+from services.hubspot_sync import HubspotContactBatcher
+
+
+def hubspot_error(status_code: int) -> HTTPException:
+    # Como `hubspot.batch_upsert_contacts`: un 424 con el error HTTP en `__cause__`.
+    response = requests.Response()
+    response.status_code = status_code
+    error = HTTPException(status_code=424, detail=f"{status_code} error")
+    error.__cause__ = requests.exceptions.HTTPError(response=response)
+    return error
+
+
+@pytest.fixture
+def batch_upsert():
+    with mock.patch.object(hubspot_sync.hubspot, "batch_upsert_contacts") as upsert:
+        yield upsert
+
+
+def batcher(max_attempts: int = 3) -> HubspotContactBatcher:
+    # Intervalo largo: los envíos se disparan con `flush` en las pruebas.
+    return HubspotContactBatcher(
+        batch_size=10, flush_interval=3600, max_attempts=max_attempts
+    )
+
+
+def test_contacts_are_merged_by_email_and_sent_in_one_batch(batch_upsert):
+    contacts = batcher()
+    contacts.add("ana@example.com", {"user_type": "Hunty"})
+    contacts.add("ana@example.com", {"active_huntypro": True})
+    contacts.add("luis@example.com", {"user_type": "hunty pro"})
+    batch_upsert.return_value = [{"id": "1"}, {"id": "2"}]
+
+    assert contacts.flush() == [{"id": "1"}, {"id": "2"}]
+    batch_upsert.assert_called_once_with(
+        [
+            {
+                "email": "ana@example.com",
+                "properties": {"user_type": "Hunty", "active_huntypro": True},
+            },
+            {"email": "luis@example.com", "properties": {"user_type": "hunty pro"}},
+        ]
+    )
+    assert contacts.flush() == []
+
+
+def test_failed_batch_is_requeued_and_dropped_after_max_attempts(batch_upsert):
+    contacts = batcher(max_attempts=2)
+    contacts.add("ana@example.com", {"user_type": "Hunty"})
+    batch_upsert.side_effect = hubspot_error(503)
+
+    contacts.flush()
+    assert list(contacts._pending) == ["ana@example.com"]
+
+    contacts.flush()
+    assert contacts._pending == {}
+    assert contacts._attempts == {}
+    assert batch_upsert.call_count == 2
+
+
+def test_rejected_batch_is_split_and_only_invalid_contact_is_dropped(batch_upsert):
+    def upsert(batch):
+        if any(contact["email"] == "invalid" for contact in batch):
+            raise hubspot_error(400)
+        return [{"id": contact["email"]} for contact in batch]
+
+    contacts = batcher()
+    contacts.add("ana@example.com", {"user_type": "Hunty"})
+    contacts.add("invalid", {"user_type": "Hunty"})
+    contacts.add("luis@example.com", {"user_type": "Hunty"})
+    batch_upsert.side_effect = upsert
+
+    results = contacts.flush()
+
+    assert results == [{"id": "ana@example.com"}, {"id": "luis@example.com"}]
+    assert contacts._pending == {}
+    # El lote completo y luego un envío por contacto.
+    assert batch_upsert.call_count == 4
+
+
+def test_returned_ids_are_saved_for_contacts_with_a_user(batch_upsert):
+    contacts = batcher()
+    contacts.add("Ana@example.com", {"user_type": "Hunty"}, user_id="u1")
+    contacts.add("luis@example.com", {"user_type": "Hunty"}, user_id="u2", hubspot_id=7)
+    contacts.add("eva@example.com", {"user_type": "Hunty"})
+    batch_upsert.return_value = [
+        {"id": "5", "properties": {"email": "ana@example.com"}},
+        {"id": "7", "properties": {"email": "luis@example.com"}},
+        {"id": "9", "properties": {"email": "eva@example.com"}},
+    ]
+
+    with mock.patch.object(hubspot_sync.user_master, "update_hubspot_id_db") as save:
+        contacts.flush()
+
+    # Luis ya tenía guardado el mismo ID y Eva no tiene usuario.
+    save.assert_called_once_with(user_id="u1", hubspot_id="5")
+    assert contacts._owners == {}
+
+
+def test_owner_is_kept_while_the_contact_is_retried(batch_upsert):
+    contacts = batcher()
+    contacts.add("ana@example.com", {"user_type": "Hunty"}, user_id="u1")
+    batch_upsert.side_effect = hubspot_error(503)
+    contacts.flush()
+
+    batch_upsert.side_effect = None
+    batch_upsert.return_value = [
+        {"id": "5", "properties": {"email": "ana@example.com"}}
+    ]
+    with mock.patch.object(hubspot_sync.user_master, "update_hubspot_id_db") as save:
+        contacts.flush()
+
+    save.assert_called_once_with(user_id="u1", hubspot_id="5")
@@ -0,0 +1,145 @@
+import copy
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException, status
+
+from services import process_payment
+from utils.handle_exceptions import PermanentEventError
+
+approved = {
+    "event_type": "payment_approved",
+    "occurred_at": 1690898390,
+    "content": {
+        "payment_id": 10,
+        "payment_type": "subscription",
+        "payment_status": "Aprobado",
+        "payment_method": "card",
+        "currency": "COP",
+        "totals": {"sub_total": "100", "discounts": "0", "total": "100"},
+        "items": [{"name": "Hunty Pro mensual"}],
+        "billing": {"email": "ana@example.com", "first_name": "Ana"},
+    },
+}
+
+
+@pytest.fixture
+def stages():
+    with mock.patch.object(
+        process_payment.Settings, "MACHINE", "PROD"
+    ), mock.patch.multiple(
+        process_payment,
+        resolve_user=mock.DEFAULT,
+        sync_user_hubspot=mock.DEFAULT,
+        update_user_status=mock.DEFAULT,
+        create_or_update_payment=mock.DEFAULT,
+        enroll_user_thinkific=mock.DEFAULT,
+        reset_failed_user_status=mock.DEFAULT,
+    ) as mocks:
+        mocks["resolve_user"].return_value = {"user_id": "u1"}
+        mocks["create_or_update_payment"].return_value = ({"payment": 1}, {})
+        yield mocks
+
+
+def without(path):
+    payment = copy.deepcopy(approved)
+    *parents, key = path
+    target = payment
+    for parent in parents:
+        target = target[parent]
+    del target[key]
+    return payment
+
+
+def test_valid_payment_event_passes_validation():
+    process_payment.validate_payment_event(approved)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        ("content",),
+        ("occurred_at",),
+        ("content", "payment_status"),
+        ("content", "totals", "total"),
+        ("content", "items", 0),
+        ("content", "billing", "email"),
+    ],
+)
+def test_incomplete_payment_event_is_a_permanent_error(path):
+    with pytest.raises(PermanentEventError) as error:
+        process_payment.process_payment(without(path))
+
+    assert error.value.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_approved_payment_runs_every_stage(stages):
+    completed = set()
+
+    result = process_payment.process_payment(approved, completed)
+
+    assert result == (({"payment": 1}, {}), "u1")
+    assert completed == {"hubspot", "status", "payment", "thinkific"}
+    stages["enroll_user_thinkific"].assert_called_once_with({"user_id": "u1"})
+
+
+def test_failed_payment_write_skips_thinkific(stages):
+    stages["create_or_update_payment"].side_effect = HTTPException(424, "db down")
+    completed = set()
+
+    with pytest.raises(HTTPException) as error:
+        process_payment.process_payment(approved, completed)
+
+    assert error.value.detail == "db down"
+    stages["enroll_user_thinkific"].assert_not_called()
+    # Las etapas que sí terminaron no se repiten en el siguiente intento.
+    assert completed == {"hubspot", "status"}
+
+
+def test_completed_stages_are_not_run_again(stages):
+    completed = {"hubspot", "status", "payment"}
+
+    process_payment.process_payment(approved, completed)
+
+    stages["resolve_user"].assert_called_once()
+    stages["sync_user_hubspot"].assert_not_called()
+    stages["update_user_status"].assert_not_called()
+    stages["create_or_update_payment"].assert_not_called()
+    stages["enroll_user_thinkific"].assert_called_once()
+    assert "thinkific" in completed
+
+
+def test_failed_enrollment_fails_the_event(stages):
+    stages["enroll_user_thinkific"].side_effect = HTTPException(424, {"failed": [1]})
+    completed = set()
+
+    with pytest.raises(HTTPException) as error:
+        process_payment.process_payment(approved, completed)
+
+    assert error.value.status_code == status.HTTP_424_FAILED_DEPENDENCY
+    assert "thinkific" not in completed
+    stages["reset_failed_user_status"].assert_not_called()
+
+
+def test_unexpected_error_resets_user_status_and_is_retried(stages):
+    stages["sync_user_hubspot"].side_effect = KeyError("vid")
+    completed = set()
+
+    with pytest.raises(HTTPException) as error:
+        process_payment.process_payment(approved, completed)
+
+    assert not isinstance(error.value, PermanentEventError)
+    assert error.value.status_code == status.HTTP_424_FAILED_DEPENDENCY
+    stages["reset_failed_user_status"].assert_called_once_with(approved)
+    # El estado se revirtió, así que debe aplicarse de nuevo al reintentar.
+    assert "status" not in completed
+    assert "payment" in completed
+
+
+def test_invalid_event_is_rejected_before_any_stage(stages):
+    with pytest.raises(PermanentEventError) as error:
+        process_payment.process_payment(without(("content", "totals")))
+
+    assert error.value.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    stages["resolve_user"].assert_not_called()
+    stages["reset_failed_user_status"].assert_not_called()
@@ -0,0 +1,156 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from services import webhook_inbox
+from settings import Settings
+from utils.handle_exceptions import PermanentEventError
+
+cancellation = {
+    "event_type": "subscription_canceled",
+    "occurred_at": 1690898390,
+    "content": {"subscription_id": 3, "customer": {"email": "ana@example.com"}},
+}
+
+
+def claimed(attempts=1, payload=cancellation, completed_stages=()):
+    return {
+        "webhook_inbox_id": 9,
+        "event_type": payload["event_type"],
+        "lane": 0,
+        "payload": payload,
+        "attempts": attempts,
+        "completed_stages": list(completed_stages),
+    }
+
+
+@pytest.fixture
+def repository():
+    with mock.patch.object(webhook_inbox, "webhook_inbox") as repository:
+        yield repository
+
+
+def test_processed_event_is_marked_done(repository):
+    with mock.patch.object(webhook_inbox, "dispatch_event") as dispatch_event:
+        webhook_inbox.process_claimed_event(claimed())
+
+    dispatch_event.assert_called_once_with(cancellation, set())
+    repository.mark_done.assert_called_once_with(9)
+    repository.mark_failed.assert_not_called()
+
+
+def test_failed_event_is_retried_with_backoff_and_keeps_completed_stages(repository):
+    def fail(payment, completed):
+        completed.add("hubspot")
+        raise HTTPException(status_code=424, detail="Error HubSpot")
+
+    with mock.patch.object(webhook_inbox, "dispatch_event", side_effect=fail):
+        before = datetime.utcnow()
+        webhook_inbox.process_claimed_event(
+            claimed(attempts=2, completed_stages=["status"])
+        )
+        after = datetime.utcnow()
+
+    event_id, error, retry_at, completed = repository.mark_failed.call_args[0]
+    assert (event_id, error, completed) == (9, "Error HubSpot", ["hubspot", "status"])
+    # Segundo intento: el doble de la espera base.
+    delay = timedelta(seconds=Settings.WEBHOOK_RETRY_BACKOFF * 2)
+    assert before + delay <= retry_at <= after + delay
+
+
+def test_event_is_given_up_after_max_attempts(repository):
+    with mock.patch.object(
+        webhook_inbox, "dispatch_event", side_effect=HTTPException(424, "down")
+    ):
+        webhook_inbox.process_claimed_event(
+            claimed(attempts=Settings.WEBHOOK_MAX_ATTEMPTS)
+        )
+
+    assert repository.mark_failed.call_args[0][2] is None
+
+
+def test_permanent_error_fails_event_without_retry(repository):
+    error = PermanentEventError(424, "Error user not exist")
+    with mock.patch.object(webhook_inbox, "dispatch_event", side_effect=error):
+        webhook_inbox.process_claimed_event(claimed(attempts=1))
+
+    assert repository.mark_failed.call_args[0][2] is None
+
+
+@pytest.mark.parametrize(
+    "error",
+    [KeyError("items"), orjson.JSONDecodeError("truncated", "{", 1), TypeError("x")],
+)
+def test_other_errors_are_retried(repository, error):
+    # Una respuesta parcial o truncada de un proveedor no es un error del evento.
+    with mock.patch.object(webhook_inbox, "dispatch_event", side_effect=error):
+        webhook_inbox.process_claimed_event(claimed(attempts=1))
+
+    assert repository.mark_failed.call_args[0][2] is not None
+
+
+def test_unhandled_event_is_marked_done_without_processing(repository):
+    payload = {"event_type": "payment_pending", "content": {}}
+    with mock.patch.object(webhook_inbox, "dispatch_event") as dispatch_event:
+        webhook_inbox.process_claimed_event(claimed(payload=payload))
+
+    dispatch_event.assert_not_called()
+    repository.mark_done.assert_called_once_with(9)
+
+
+def test_worker_processes_claimed_events_until_stopped(repository):
+    repository.claim_events.side_effect = [[claimed()], []] + [[]] * 1000
+    worker = webhook_inbox.InboxWorker(
+        workers=1, poll_interval=0.01, claim_batch=1, lease_seconds=60
+    )
+
+    with mock.patch.object(webhook_inbox, "dispatch_event"):
+        worker.start()
+        for _ in range(500):
+            if repository.mark_done.called:
+                break
+            time.sleep(0.01)
+        worker.stop(timeout=5)
+
+    repository.claim_events.assert_called_with(1, 60)
+    repository.mark_done.assert_called_once_with(9)
+    assert worker._threads == []
+
+
+def test_event_key_identifies_payments_and_subscription_events():
+    payment = {
+        "event_type": "payment_approved",
+        "occurred_at": 1690898390,
+        "content": {"payment_id": 7, "subscription_id": 3},
+    }
+
+    assert webhook_inbox.event_key(payment) == "payment_approved:7:1690898390"
+    assert webhook_inbox.event_key(cancellation) == "subscription_canceled:3:1690898390"
+
+
+def test_event_lane_is_stable_and_normalizes_email():
+    payment = {"content": {"billing": {"email": " Ana@Example.com "}}}
+    lane = webhook_inbox.event_lane(cancellation)
+
+    # Pago y cancelación del mismo usuario caen en el mismo carril.
+    assert webhook_inbox.event_lane(payment) == lane
+    # SHA-1 y no `hash()`: el carril no depende de PYTHONHASHSEED ni de la instancia.
+    digest = hashlib.sha1(b"ana@example.com").digest()
+    assert lane == int.from_bytes(digest[:8], "big") % Settings.WEBHOOK_LANES
+
+
+def test_event_lane_falls_back_to_subscription_or_payment_id():
+    by_subscription = {"content": {"subscription_id": 3}}
+    by_payment = {"content": {"payment_id": 3}}
+
+    assert webhook_inbox.event_lane(by_subscription) == webhook_inbox.event_lane(
+        by_payment
+    )
+    assert webhook_inbox.event_lane({}) == webhook_inbox.event_lane(
+        {"content": {"subscription_id": None}}
+    )
@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+from utils import metrics
+from utils.bulkhead import Bulkhead, BulkheadFull
+
+
+def test_full_bulkhead_rejects_after_max_wait_and_slots_are_reentrant():
+    bulkhead = Bulkhead("fake_db", max_concurrent=1, max_wait=0.01)
+    inside = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with bulkhead.slot():
+            inside.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    inside.wait()
+
+    assert bulkhead.utilization() == 1
+    with pytest.raises(BulkheadFull):
+        with bulkhead.slot():
+            pass
+
+    release.set()
+    holder.join()
+
+    with bulkhead.slot():
+        with bulkhead.slot():
+            assert bulkhead.active == 1
+    assert bulkhead.active == 0
+    assert (
+        'bulkhead_rejected_total{dependency="fake_db"} 1' in metrics.render_prometheus()
+    )
@@ -0,0 +1,78 @@
+import time
+from unittest import mock
+
+import pytest
+
+from utils.cache import StaleWhileRevalidateCache
+
+
+def wait_for(condition):
+    for _ in range(100):
+        if condition():
+            return
+        time.sleep(0.01)
+
+
+def test_cached_returns_fresh_value_without_reloading():
+    cache = StaleWhileRevalidateCache("test", ttl=60)
+    loader = mock.Mock(return_value={"plans": []})
+
+    assert cache.get("plans", loader) == {"plans": []}
+    assert cache.get("plans", loader) == {"plans": []}
+    assert loader.call_count == 1
+
+
+def test_stale_value_is_served_while_revalidating():
+    cache = StaleWhileRevalidateCache("test", ttl=60, max_stale=600)
+    cache.get("plans", lambda: "old")
+    cache._entries["plans"] = ("old", time.monotonic() - 120)
+
+    assert cache.get("plans", lambda: "new") == "old"
+    wait_for(lambda: cache._entries["plans"][0] == "new")
+    assert cache.get("plans", lambda: "newer") == "new"
+
+
+def test_stale_value_is_served_when_loader_fails():
+    cache = StaleWhileRevalidateCache("test", ttl=60, max_stale=0)
+    cache.get("plans", lambda: "old")
+    cache._entries["plans"] = ("old", time.monotonic() - 120)
+
+    def failing_loader():
+        raise RuntimeError("treli down")
+
+    assert cache.get("plans", failing_loader) == "old"
+
+    cache.invalidate()
+    with pytest.raises(RuntimeError):
+        cache.get("plans", failing_loader)
+
+
+def test_cache_is_bounded_and_drops_expired_entries():
+    cache = StaleWhileRevalidateCache("test", ttl=60, max_stale=0, max_entries=2)
+    cache.get(1, lambda: "one")
+    cache.get(2, lambda: "two")
+    cache.get(1, lambda: "reloaded")
+    cache.get(3, lambda: "three")
+
+    assert list(cache._entries) == [1, 3]
+
+    cache._entries[1] = ("one", time.monotonic() - 120)
+    cache.get(4, lambda: "four")
+
+    assert list(cache._entries) == [3, 4]
+
+
+def test_cached_normalizes_positional_and_keyword_arguments():
+    cache = StaleWhileRevalidateCache("test", ttl=60)
+    loader = mock.Mock(return_value="plans")
+
+    @cache.cached
+    def get_plans(plan_id: int = None):
+        return loader(plan_id)
+
+    get_plans(5)
+    get_plans(plan_id=5)
+    get_plans()
+    get_plans(None)
+
+    assert loader.call_args_list == [mock.call(5), mock.call(None)]
@@ -0,0 +1,31 @@
+from unittest import mock
+
+import pytest
+
+from utils.circuit_breaker import CLOSED, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_trial_closes_the_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=10)
+    with mock.patch("utils.circuit_breaker.time.monotonic", return_value=100):
+        breaker.record_failure()
+
+    with mock.patch("utils.circuit_breaker.time.monotonic", return_value=111):
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+
+    assert breaker.state == CLOSED
@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from utils import deadline
+
+
+def test_timeouts_are_capped_by_the_remaining_budget():
+    with mock.patch("utils.deadline.time.monotonic", return_value=100):
+        with deadline.deadline(5):
+            assert deadline.cap_timeout((3, 30)) == (3, 5)
+            with deadline.deadline(60):
+                assert deadline.remaining() == 5
+
+        assert deadline.cap_timeout((3, 30)) == (3, 30)
+
+
+def test_expired_deadline_fails_before_sending_and_propagates_to_executors():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with deadline.deadline(0.001):
+            future = deadline.submit(executor, lambda: deadline.remaining())
+            with mock.patch("utils.deadline.time.monotonic", return_value=1e12):
+                with pytest.raises(deadline.DeadlineExceeded):
+                    deadline.check("get_plans")
+
+        assert future.result() is not None
@@ -0,0 +1,18 @@
+from utils.dedupe import RecentKeys
+
+
+def test_recent_keys_evicts_least_recently_used():
+    keys = RecentKeys(max_size=2)
+    keys.add("a")
+    keys.add("b")
+
+    assert "a" in keys
+    keys.add("c")
+
+    assert "a" in keys
+    assert "b" not in keys
+    assert "c" in keys
+    assert len(keys) == 2
+
+    keys.discard("a")
+    assert "a" not in keys
@@ -0,0 +1,45 @@
+import threading
+
+from utils.hedging import HedgeBudget, Hedger, LatencyTracker
+
+
+def make_hedger(ratio=1.0):
+    tracker = LatencyTracker(window=10, min_samples=1)
+    tracker.record(("treli", "get_payments"), 0.01)
+    return Hedger(
+        enabled=True,
+        percentile=95,
+        min_delay=0.01,
+        budget=HedgeBudget(ratio=ratio, max_credits=1),
+        tracker=tracker,
+        max_workers=4,
+    )
+
+
+def test_slow_request_is_hedged_and_first_response_wins():
+    hedger = make_hedger()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    assert hedger.call("treli", "get_payments", fetch) == "fast"
+    release.set()
+
+
+def test_hedges_are_limited_by_the_budget():
+    hedger = make_hedger(ratio=0.1)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        threading.Event().wait(0.05)
+        return "ok"
+
+    assert hedger.call("treli", "get_payments", fetch) == "ok"
+    assert len(calls) == 1
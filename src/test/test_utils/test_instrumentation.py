@@ -0,0 +1,50 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from utils import metrics
+from utils.instrumentation import instrument, record_retry
+from utils.retry import RetryPolicy, call_with_retries
+
+
+def _response(status_code, body=b"{}"):
+    return mock.Mock(status_code=status_code, headers={}, content=body)
+
+
+def test_attempts_are_exported_as_histograms_and_status_counts():
+    with instrument("fake", "get_payments") as call:
+        call.response = _response(200, b"x" * 2000)
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        with instrument("fake", "get_payments"):
+            raise requests.exceptions.ConnectTimeout()
+
+    output = metrics.render_prometheus()
+    labels = 'operation="get_payments",upstream="fake"'
+    status = 'operation="get_payments",status="{}",upstream="fake"'
+    assert "# TYPE upstream_request_duration_seconds histogram" in output
+    assert f"upstream_request_duration_seconds_count{{{labels}}} 2" in output
+    assert f'upstream_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in output
+    assert "upstream_responses_total{%s} 1" % status.format(200) in output
+    assert (
+        "upstream_responses_total{%s} 1" % status.format("ConnectTimeout")
+    ) in output
+    assert f'upstream_response_size_bytes_bucket{{{labels},le="1024"}} 0' in output
+    assert f'upstream_response_size_bytes_bucket{{{labels},le="4096"}} 1' in output
+
+
+def test_retries_are_counted_by_reason():
+    responses = iter([_response(503), _response(200)])
+    policy = RetryPolicy(retries=2, base_delay=0, max_delay=0)
+
+    response = call_with_retries(
+        lambda: next(responses),
+        policy,
+        on_retry=lambda reason: record_retry("fake", "list_subscriptions", reason),
+    )
+
+    assert response.status_code == 200
+    assert (
+        'upstream_retries_total{operation="list_subscriptions",reason="503",'
+        'upstream="fake"} 1'
+    ) in metrics.render_prometheus()
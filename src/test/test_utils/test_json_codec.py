@@ -0,0 +1,24 @@
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+import requests
+
+from utils import json_codec
+
+
+def test_response_json_decodes_bytes_and_raises_like_requests():
+    response = mock.Mock(content='{"payments": [{"id": 1, "name": "Año"}]}'.encode())
+    assert json_codec.response_json(response) == {
+        "payments": [{"id": 1, "name": "Año"}]
+    }
+
+    response.content = b"<html>"
+    with pytest.raises(requests.exceptions.InvalidJSONError):
+        json_codec.response_json(response)
+
+
+def test_fast_json_response_renders_decimals_and_int_keys():
+    response = json_codec.FastJSONResponse({1: Decimal("2.5"), "ok": True})
+    assert json_codec.loads(response.body) == {"1": 2.5, "ok": True}
+    assert response.media_type == "application/json"
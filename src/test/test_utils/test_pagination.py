@@ -0,0 +1,51 @@
+import asyncio
+
+from utils.pagination import aiter_pages, iter_pages
+
+PAGES = {1: [1, 2], 2: [3, 4], 3: [5]}
+
+
+def fetch_page(page):
+    return {"payments": PAGES.get(page, [])}
+
+
+def test_iter_pages_walks_every_page_in_order():
+    assert list(iter_pages(fetch_page, "payments", prefetch=2)) == [1, 2, 3, 4, 5]
+
+
+def test_aiter_pages_stops_at_total_pages():
+    async def fetch(page):
+        return {"subscriptions": [page], "total_pages": 2}
+
+    async def collect():
+        return [item async for item in aiter_pages(fetch, "subscriptions", prefetch=3)]
+
+    assert asyncio.run(collect()) == [1, 2]
+
+
+def test_iter_pages_stops_when_page_parameter_is_ignored():
+    calls = []
+
+    def fetch_first_page_forever(page):
+        calls.append(page)
+        return {"payments": [{"payment_id": 1}, {"payment_id": 2}]}
+
+    items = list(iter_pages(fetch_first_page_forever, "payments", prefetch=1))
+
+    assert items == [{"payment_id": 1}, {"payment_id": 2}]
+    assert calls == [1, 2]
+
+
+def test_aiter_pages_stops_at_max_pages():
+    async def fetch(page):
+        return {"subscriptions": [page]}
+
+    async def collect():
+        return [
+            item
+            async for item in aiter_pages(
+                fetch, "subscriptions", prefetch=2, max_pages=3
+            )
+        ]
+
+    assert asyncio.run(collect()) == [1, 2, 3]
@@ -0,0 +1,37 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.pipeline import Stage, StageSkipped, run_stages
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    stages = [
+        Stage("user", lambda results: "u1"),
+        Stage("hubspot", lambda results: barrier.wait(), depends_on=("user",)),
+        Stage("status", lambda results: barrier.wait(), depends_on=("user",)),
+    ]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pipeline = run_stages(stages, executor)
+
+    assert pipeline.errors == {}
+    assert pipeline.results["user"] == "u1"
+
+
+def test_failed_stage_skips_only_its_dependents():
+    def fail(results):
+        raise ValueError("boom")
+
+    stages = [
+        Stage("user", fail),
+        Stage("status", lambda results: "ok", depends_on=("user",)),
+        Stage("report", lambda results: "ok"),
+    ]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pipeline = run_stages(stages, executor)
+
+    assert list(pipeline.errors) == ["user", "status"]
+    assert isinstance(pipeline.errors["status"], StageSkipped)
+    assert pipeline.results == {"report": "ok"}
@@ -0,0 +1,25 @@
+from unittest import mock
+
+import pytest
+
+from utils.rate_limiter import RateLimiter, RateLimitExceeded, TokenBucket
+
+
+def test_bucket_smooths_bursts_beyond_capacity():
+    bucket = TokenBucket(rate=10, burst=2)
+
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.1, abs=0.01)
+    assert waits[3] == pytest.approx(0.2, abs=0.01)
+
+
+def test_retry_after_pauses_the_upstream():
+    limiter = RateLimiter("test", rate=0, burst=1, max_wait=1)
+    response = mock.Mock(status_code=429, headers={"Retry-After": "5"})
+
+    limiter.observe("get_plans", response)
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("get_plans")
@@ -0,0 +1,113 @@
+import asyncio
+from unittest import mock
+
+import httpx
+import pytest
+import requests
+
+from clients.upstream import Upstream
+from utils.retry import RetryPolicy, acall_with_retries, call_with_retries
+
+# Sin esperas entre intentos.
+policy = RetryPolicy(retries=2, base_delay=0, max_delay=0)
+
+
+def response(status_code: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b""
+    return response
+
+
+def test_retry_after_is_capped_at_max_delay():
+    policy = RetryPolicy(retries=3, base_delay=0.5, max_delay=10)
+
+    assert policy.delay(0, mock.Mock(headers={"Retry-After": "3"})) == 3
+    assert policy.delay(0, mock.Mock(headers={"Retry-After": "86400"})) == 10
+
+
+def test_transient_status_and_connection_errors_are_retried():
+    send = mock.Mock(
+        side_effect=[
+            requests.exceptions.ConnectionError("reset"),
+            response(503),
+            response(200),
+        ]
+    )
+    on_retry = mock.Mock()
+
+    assert call_with_retries(send, policy, on_retry=on_retry).status_code == 200
+    assert send.call_count == 3
+    assert [c.args[0] for c in on_retry.call_args_list] == ["ConnectionError", "503"]
+
+
+def test_retries_are_limited_to_the_policy():
+    send = mock.Mock(return_value=response(502))
+
+    assert call_with_retries(send, policy).status_code == 502
+    assert send.call_count == policy.retries + 1
+
+    send = mock.Mock(side_effect=requests.exceptions.Timeout("slow"))
+    with pytest.raises(requests.exceptions.Timeout):
+        call_with_retries(send, policy)
+    assert send.call_count == policy.retries + 1
+
+
+def test_client_errors_are_not_retried():
+    send = mock.Mock(return_value=response(404))
+
+    assert call_with_retries(send, policy).status_code == 404
+    send.assert_called_once_with()
+
+
+def test_async_calls_are_retried():
+    send = mock.AsyncMock(
+        side_effect=[httpx.ConnectError("reset"), response(500), response(200)]
+    )
+
+    result = asyncio.run(acall_with_retries(send, policy))
+
+    assert result.status_code == 200
+    assert send.await_count == 3
+
+
+@pytest.fixture
+def upstream():
+    upstream = Upstream("test-retry", pool_size=1)
+    upstream.retry_policy = policy
+    with mock.patch.object(upstream.session, "request") as request:
+        request.return_value = response(503)
+        yield upstream
+
+
+@pytest.mark.parametrize(
+    "method, idempotent, attempts",
+    [("GET", None, 3), ("PUT", None, 3), ("POST", None, 1), ("POST", True, 3)],
+)
+def test_upstream_only_retries_idempotent_requests(
+    upstream, method, idempotent, attempts
+):
+    upstream.request(method, "https://upstream.test", idempotent=idempotent)
+
+    assert upstream.session.request.call_count == attempts
+
+
+def test_circuit_breaker_records_one_failure_per_attempt(upstream):
+    upstream.session.request.side_effect = [
+        requests.exceptions.ConnectionError("reset"),
+        response(503),
+        response(200),
+    ]
+    with mock.patch.object(
+        upstream.circuit_breaker,
+        "record_failure",
+        wraps=upstream.circuit_breaker.record_failure,
+    ) as record_failure, mock.patch.object(
+        upstream.circuit_breaker,
+        "record_success",
+        wraps=upstream.circuit_breaker.record_success,
+    ) as record_success:
+        upstream.get("https://upstream.test")
+
+    assert record_failure.call_count == 2
+    assert record_success.call_count == 1
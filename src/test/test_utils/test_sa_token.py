@@ -0,0 +1,62 @@
+import base64
+import json
+import threading
+import time
+from unittest import mock
+
+from utils import sa_token
+
+
+def build_token(exp):
+    def encode(data):
+        raw = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+        return raw.rstrip("=")
+
+    return f"{encode({'alg': 'RS256'})}.{encode({'exp': exp})}.{encode('sig')}"
+
+
+def setup_function():
+    sa_token._tokens.clear()
+    sa_token._refresh_locks.clear()
+    sa_token._background_refreshes.clear()
+
+
+def test_generate_sa_token_fetches_once_for_concurrent_calls():
+    token = build_token(int(time.time()) + 3600)
+
+    def slow_fetch(audience):
+        time.sleep(0.05)
+        return token
+
+    with mock.patch.object(sa_token, "_fetch_token", side_effect=slow_fetch) as fetch:
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(sa_token.generate_sa_token("aud"))
+            )
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert results == [token] * 10
+    assert fetch.call_count == 1
+
+
+def test_generate_sa_token_refreshes_in_background_before_expiry():
+    old_token = build_token(int(time.time()) + 120)
+    new_token = build_token(int(time.time()) + 3600)
+    sa_token._tokens["aud"] = (old_token, int(time.time()) + 120)
+
+    with mock.patch.object(sa_token, "_fetch_token", return_value=new_token) as fetch:
+        assert sa_token.generate_sa_token("aud") == old_token
+
+        for _ in range(50):
+            if sa_token._tokens["aud"][0] == new_token:
+                break
+            time.sleep(0.01)
+
+    assert fetch.call_count == 1
+    assert sa_token.generate_sa_token("aud") == new_token
@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.single_flight import coalesce
+
+
+def test_coalesce_runs_once_and_copies_the_result_for_followers():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    loaded = []
+
+    @coalesce
+    def load(user_id):
+        calls.append(user_id)
+        started.set()
+        release.wait(timeout=5)
+        loaded.append({"id": user_id, "items": [1]})
+        return loaded[-1]
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        leader = executor.submit(load, 7)
+        assert started.wait(timeout=5)
+        followers = [executor.submit(load, 7) for _ in range(2)]
+        # Los seguidores deben quedar esperando la llamada en curso.
+        threading.Event().wait(0.2)
+        release.set()
+        results = [leader.result(timeout=5)] + [f.result(timeout=5) for f in followers]
+
+    assert calls == [7]
+    assert all(result == {"id": 7, "items": [1]} for result in results)
+
+    # Solo los seguidores pagan la copia; el líder recibe el objeto del cargador.
+    assert results[0] is loaded[0]
+    assert results[1] is not results[2]
+
+    results[0]["items"].append(2)
+    results[0]["id"] = 8
+    assert results[1] == {"id": 7, "items": [1]}
+    assert results[2] == {"id": 7, "items": [1]}
+
+
+def test_coalesce_propagates_errors_and_releases_key():
+    calls = []
+
+    @coalesce
+    def load():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError("boom")
+        return "ok"
+
+    with pytest.raises(ValueError):
+        load()
+
+    assert load() == "ok"
+    assert calls == [1, 1]
+
+
+def test_coalesce_without_concurrency_returns_the_loader_result():
+    result = {"items": [1]}
+
+    @coalesce
+    def load():
+        return result
+
+    assert load() is result
@@ -0,0 +1,131 @@
+import threading
+from contextlib import contextmanager
+
+import requests
+
+from utils import deadline, metrics
+
+
+class BulkheadFull(requests.exceptions.RequestException):
+    """
+    El compartimento de la dependencia está lleno y la llamada se rechaza sin ejecutarse.
+    """
+
+
+class Bulkhead:
+    """
+    Compartimento que limita cuántos hilos pueden estar bloqueados a la vez en una dependencia.
+
+    Los endpoints síncronos de FastAPI comparten un único pool de hilos. Sin un límite por
+    dependencia, un proveedor lento puede ocupar todos los hilos y detener endpoints que no lo
+    usan. Con el compartimento, como máximo `max_concurrent` hilos esperan a la dependencia;
+    el resto espera un turno hasta `max_wait` segundos (recortado al deadline actual) y luego
+    falla de inmediato con `BulkheadFull`.
+
+    El turno es reentrante dentro de un mismo hilo, de modo que una llamada anidada a la
+    misma dependencia no ocupa un segundo turno. Un `max_concurrent` menor o igual a cero
+    desactiva el compartimento.
+
+    Atributos:
+        name (str): Nombre de la dependencia, usado en métricas.
+        max_concurrent (int): Llamadas simultáneas permitidas.
+        max_wait (float): Segundos máximos de espera por un turno.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_wait: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = threading.BoundedSemaphore(max(max_concurrent, 1))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def slot(self):
+        """
+        Ocupa un turno del compartimento mientras dura el bloque `with`.
+
+        Raises:
+            BulkheadFull: Si no hay un turno libre antes de `max_wait` o del deadline actual.
+        """
+        depth = getattr(self._local, "depth", 0)
+        if self.max_concurrent <= 0 or depth:
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+
+        self._acquire()
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._lock:
+                self.active -= 1
+            self._semaphore.release()
+
+    def _acquire(self):
+        if not self._semaphore.acquire(blocking=False):
+            timeout = self.max_wait
+            left = deadline.remaining()
+            if left is not None:
+                timeout = min(timeout, left)
+            with self._lock:
+                self.waiting += 1
+            try:
+                acquired = self._semaphore.acquire(timeout=max(timeout, 0))
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not acquired:
+                metrics.inc_counter(
+                    "bulkhead_rejected_total",
+                    help_text="Llamadas rechazadas porque el compartimento estaba lleno.",
+                    dependency=self.name,
+                )
+                raise BulkheadFull(
+                    f"{self.name} bulkhead full ({self.max_concurrent} in flight)"
+                )
+        with self._lock:
+            self.active += 1
+
+    def utilization(self) -> float:
+        """
+        Fracción de turnos ocupados (0 a 1).
+        """
+        if self.max_concurrent <= 0:
+            return 0.0
+        return self.active / self.max_concurrent
+
+
+_bulkheads = []
+
+
+def register(bulkhead: Bulkhead) -> Bulkhead:
+    """
+    Registra un compartimento para exportar su saturación en las métricas.
+    """
+    _bulkheads.append(bulkhead)
+    return bulkhead
+
+
+metrics.register_gauge_callback(
+    "bulkhead_active",
+    lambda: [({"dependency": b.name}, b.active) for b in _bulkheads],
+    help_text="Llamadas en curso dentro del compartimento de la dependencia.",
+)
+metrics.register_gauge_callback(
+    "bulkhead_waiting",
+    lambda: [({"dependency": b.name}, b.waiting) for b in _bulkheads],
+    help_text="Hilos esperando un turno del compartimento de la dependencia.",
+)
+metrics.register_gauge_callback(
+    "bulkhead_utilization",
+    lambda: [({"dependency": b.name}, b.utilization()) for b in _bulkheads],
+    help_text="Fracción de turnos ocupados del compartimento de la dependencia.",
+)
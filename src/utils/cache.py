@@ -0,0 +1,151 @@
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+class StaleWhileRevalidateCache:
+    """
+    Caché en memoria con expiración (TTL) y revalidación en segundo plano.
+
+    - Mientras una entrada tiene menos de `ttl` segundos se retorna directamente.
+    - Cuando supera el `ttl` pero no el `max_stale`, se retorna la entrada vencida y se
+      recarga en segundo plano (una sola recarga por llave a la vez).
+    - Si no hay entrada o es más vieja que `max_stale`, la carga se hace en línea. Si la
+      carga falla y existe una entrada previa (aunque sea vieja), se retorna esa entrada
+      en lugar del error.
+
+    Un `ttl` menor o igual a cero desactiva la caché.
+
+    Las llaves pueden venir de parámetros de los clientes (por ejemplo `plan_id`), por lo que
+    la caché guarda como máximo `max_entries` entradas: al guardar una entrada se eliminan
+    las que ya no pueden servirse (más viejas que `ttl + max_stale`) y, si aún se supera el
+    límite, las usadas hace más tiempo.
+
+    Atributos:
+        name (str): Nombre de la caché, usado en logs.
+        ttl (int): Segundos que una entrada se considera fresca.
+        max_stale (int): Segundos que una entrada vencida puede servirse mientras se revalida.
+        max_entries (int): Número máximo de entradas.
+    """
+
+    def __init__(
+        self, name: str, ttl: int, max_stale: int = 0, max_entries: int = 1000
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._revalidating = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Retorna el valor de `key`, cargándolo con `loader()` cuando es necesario.
+
+        Args:
+            key: Llave hashable de la entrada.
+            loader (callable): Función sin argumentos que obtiene el valor desde el origen.
+
+        Returns:
+            El valor en caché o el recién cargado.
+        """
+        if self.ttl <= 0:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+
+        if entry:
+            value, loaded_at = entry
+            age = time.monotonic() - loaded_at
+            if age < self.ttl:
+                return value
+            if age < self.ttl + self.max_stale:
+                self._revalidate_in_background(key, loader)
+                return value
+
+        try:
+            return self._load(key, loader)
+        except Exception as error:
+            if entry:
+                logging.warning(f"{self.name} cache serving stale {key}: {error}")
+                return entry[0]
+            raise
+
+    def invalidate(self):
+        """
+        Elimina todas las entradas. Las recargas en curso iniciadas antes de invalidar se descartan.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def cached(self, func):
+        """
+        Decorador que guarda en la caché el resultado de `func` según sus argumentos.
+
+        Los argumentos se normalizan con la firma de `func`: `get_plans(5)` y
+        `get_plans(plan_id=5)` comparten la entrada, igual que `get_plans()` y
+        `get_plans(None)`.
+        """
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                bound = signature.bind(*args, **kwargs)
+            except TypeError:
+                return func(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.items())
+            return self.get(key, lambda: func(*args, **kwargs))
+
+        wrapper.cache = self
+        return wrapper
+
+    def _load(self, key, loader):
+        with self._lock:
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        now = time.monotonic()
+        max_age = self.ttl + self.max_stale
+        for old_key, (_, loaded_at) in list(self._entries.items()):
+            if now - loaded_at >= max_age:
+                del self._entries[old_key]
+
+        self._entries[key] = (value, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _revalidate_in_background(self, key, loader):
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def revalidate():
+            try:
+                self._load(key, loader)
+            except Exception as error:
+                logging.warning(f"{self.name} cache revalidation failed {key}: {error}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=revalidate, daemon=True).start()
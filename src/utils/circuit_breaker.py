@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+
+import requests
+
+from utils import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Valor numérico de cada estado en las métricas.
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    El circuito del proveedor está abierto y la solicitud se rechaza sin enviarse.
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de un proveedor externo.
+
+    - Cerrado: las solicitudes pasan normalmente. Tras `failure_threshold` fallas
+      consecutivas (errores de red o respuestas 5xx) el circuito se abre.
+    - Abierto: las solicitudes fallan de inmediato con `CircuitOpenError` durante
+      `recovery_timeout` segundos, sin ocupar un hilo esperando al proveedor.
+    - Semiabierto: pasado ese tiempo se deja pasar una solicitud de prueba; si tiene éxito el
+      circuito se cierra y si falla se vuelve a abrir.
+
+    Un `failure_threshold` menor o igual a cero desactiva el circuit breaker.
+
+    Atributos:
+        name (str): Nombre del proveedor.
+        failure_threshold (int): Fallas consecutivas que abren el circuito.
+        recovery_timeout (float): Segundos que el circuito permanece abierto.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if (
+                self._state == OPEN
+                and time.monotonic() - self._opened_at >= self.recovery_timeout
+            ):
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """
+        Verifica que la solicitud pueda enviarse.
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto o ya hay una solicitud de prueba en curso.
+        """
+        if self.failure_threshold <= 0:
+            return
+
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            if (
+                self._state == OPEN
+                and time.monotonic() - self._opened_at >= self.recovery_timeout
+            ):
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+
+        raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logging.info(f"{self.name} circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """
+        Libera el turno de prueba sin cambiar el estado, cuando la solicitud no llegó a
+        indicar si el proveedor está sano (por ejemplo, un error de validación local).
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+
+        with self._lock:
+            self._failures += 1
+            trial_failed = self._state == HALF_OPEN
+            self._trial_in_flight = False
+            if trial_failed or self._failures >= self.failure_threshold:
+                if self._state != OPEN or trial_failed:
+                    logging.warning(
+                        f"{self.name} circuit opened after {self._failures} failures"
+                    )
+                    metrics.inc_counter(
+                        "upstream_circuit_opened_total",
+                        help_text="Veces que se abrió el circuito del proveedor.",
+                        upstream=self.name,
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+
+_breakers = []
+
+
+def register(breaker: CircuitBreaker) -> CircuitBreaker:
+    """
+    Registra un circuit breaker para exportar su estado en las métricas.
+    """
+    _breakers.append(breaker)
+    return breaker
+
+
+metrics.register_gauge_callback(
+    "upstream_circuit_state",
+    lambda: [
+        ({"upstream": breaker.name}, STATE_VALUES[breaker.state])
+        for breaker in _breakers
+    ],
+    help_text="Estado del circuito del proveedor: 0 cerrado, 1 semiabierto, 2 abierto.",
+)
@@ -0,0 +1,94 @@
+import contextlib
+import contextvars
+import time
+
+import requests
+
+# Instante (time.monotonic) en el que vence el procesamiento actual, o None si no hay límite.
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(requests.exceptions.RequestException):
+    """
+    Se agotó el tiempo disponible para el procesamiento antes de enviar la solicitud.
+    """
+
+
+@contextlib.contextmanager
+def deadline(seconds: float):
+    """
+    Limita a `seconds` segundos el tiempo total de las llamadas a proveedores del bloque.
+
+    Se puede usar como `with deadline(30):` o como decorador `@deadline(30)`. Si ya hay un
+    deadline activo más cercano, se conserva ese. Un valor menor o igual a cero no agrega
+    ningún límite.
+
+    El deadline vive en un `contextvars.ContextVar`, por lo que acompaña al procesamiento en
+    `run_in_threadpool` y en los executors que usen `submit`.
+    """
+    if seconds <= 0:
+        yield
+        return
+
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """
+    Segundos que quedan antes del deadline actual.
+
+    Returns:
+        float or None: Segundos restantes (nunca negativos), o None si no hay deadline.
+    """
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return max(expires_at - time.monotonic(), 0.0)
+
+
+def check(operation: str = None):
+    """
+    Verifica que el deadline actual no haya vencido.
+
+    Raises:
+        DeadlineExceeded: Si ya no queda tiempo.
+    """
+    if remaining() == 0:
+        raise DeadlineExceeded(f"deadline exceeded before {operation}")
+
+
+def cap_timeout(timeout: tuple) -> tuple:
+    """
+    Recorta un timeout (connect, read) al tiempo que queda antes del deadline.
+
+    Args:
+        timeout (tuple): Timeouts de conexión y de lectura en segundos.
+
+    Returns:
+        tuple: Timeouts (connect, read) que no superan el tiempo restante.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    connect, read = timeout
+    return min(connect, left), min(read, left)
+
+
+def submit(executor, fn, *args, **kwargs):
+    """
+    Envía `fn` al executor conservando el contexto actual (incluido el deadline).
+
+    Returns:
+        concurrent.futures.Future: El future de la tarea.
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
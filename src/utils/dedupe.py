@@ -0,0 +1,50 @@
+import threading
+from collections import OrderedDict
+
+
+class RecentKeys:
+    """
+    Conjunto acotado en memoria de las llaves vistas recientemente.
+
+    Sirve como primera capa de deduplicación: responder si una llave ya se vio no requiere
+    consultar la base de datos. Cuando se superan `max_size` llaves se descartan las menos
+    usadas, por lo que un duplicado muy antiguo puede no detectarse aquí y debe verificarse
+    en la capa persistente.
+
+    Atributos:
+        max_size (int): Número máximo de llaves guardadas.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.move_to_end(key)
+            return True
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key):
+        """
+        Agrega una llave, descartando las menos usadas si se supera `max_size`.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._keys[key] = True
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+
+    def discard(self, key):
+        """
+        Elimina una llave si existe.
+        """
+        with self._lock:
+            self._keys.pop(key, None)
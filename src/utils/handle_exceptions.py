@@ -5,6 +5,27 @@ import requests.exceptions
 from fastapi import HTTPException, status
 
 
+class PermanentEventError(HTTPException):
+    """
+    Error de un webhook que no se resuelve reintentando: el usuario no existe o el cuerpo
+    del evento no tiene los datos esperados.
+
+    El inbox de webhooks marca el evento como fallido sin más intentos. Al ser una
+    `HTTPException`, en el procesamiento directo (`test=True`) se responde con su código.
+    """
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """
+    Indica si un error del procesamiento de un webhook no se resuelve reintentando.
+
+    Solo lo son los `PermanentEventError`, que los servicios lanzan al validar el cuerpo del
+    evento o al no encontrar al usuario. Cualquier otro error (un `KeyError` en la respuesta
+    parcial de un proveedor, un JSON truncado, un error de programación) se reintenta.
+    """
+    return isinstance(error, PermanentEventError)
+
+
 def handle_request_exceptions(func):
     """
     Decorador para manejar excepciones de solicitud y registrar errores.
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from settings import Settings
+from utils import metrics
+from utils.deadline import submit
+
+
+class LatencyTracker:
+    """
+    Guarda las latencias recientes de cada operación para estimar sus percentiles.
+
+    Atributos:
+        window (int): Número de latencias recientes que se conservan por operación.
+        min_samples (int): Latencias necesarias antes de estimar un percentil.
+    """
+
+    def __init__(self, window: int, min_samples: int):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key, percentile: float):
+        """
+        Latencia del percentil indicado, o None si aún no hay suficientes muestras.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(int(len(samples) * percentile / 100), len(samples) - 1)
+        return samples[index]
+
+
+class HedgeBudget:
+    """
+    Presupuesto global de solicitudes duplicadas.
+
+    Cada solicitud suma `ratio` créditos (hasta `max_credits`) y cada solicitud duplicada
+    consume uno, de modo que las duplicadas nunca superan `ratio` veces el tráfico normal.
+    """
+
+    def __init__(self, ratio: float, max_credits: float):
+        self.ratio = ratio
+        self.max_credits = max_credits
+        self._credits = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._credits = min(self.max_credits, self._credits + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._credits < 1:
+                return False
+            self._credits -= 1
+            return True
+
+
+class Hedger:
+    """
+    Ejecuta lecturas idempotentes con solicitudes de respaldo ("hedged requests").
+
+    La solicitud principal se envía de inmediato. Si no responde antes del percentil
+    `percentile` de la latencia reciente de la operación, se envía una segunda solicitud
+    idéntica y se usa la primera respuesta que llegue; la otra termina en segundo plano y se
+    descarta. Las solicitudes de respaldo están limitadas por un presupuesto global.
+
+    Solo debe usarse con operaciones sin efectos secundarios.
+
+    Atributos:
+        enabled (bool): Si es False, `call` ejecuta la función directamente.
+        percentile (float): Percentil de latencia tras el cual se envía el respaldo.
+        min_delay (float): Espera mínima en segundos antes de enviar el respaldo.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        percentile: float,
+        min_delay: float,
+        budget: HedgeBudget,
+        tracker: LatencyTracker,
+        max_workers: int,
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.tracker = tracker
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="hedged-request"
+        )
+
+    def _timed(self, upstream: str, operation: str, fn):
+        started = time.monotonic()
+        result = fn()
+        self.tracker.record((upstream, operation), time.monotonic() - started)
+        return result
+
+    def call(self, upstream: str, operation: str, fn):
+        """
+        Ejecuta `fn()` enviando una solicitud de respaldo si la principal tarda demasiado.
+
+        Args:
+            upstream (str): Nombre del proveedor.
+            operation (str): Nombre de la operación; las latencias se miden por operación.
+            fn (callable): Función sin argumentos que ejecuta la solicitud.
+
+        Returns:
+            El resultado de la primera solicitud que termine sin error.
+        """
+        if not self.enabled:
+            return fn()
+
+        self.budget.deposit()
+        delay = self.tracker.percentile((upstream, operation), self.percentile)
+        if delay is None:
+            return self._timed(upstream, operation, fn)
+
+        primary = submit(self.executor, self._timed, upstream, operation, fn)
+        done, _ = wait([primary], timeout=max(delay, self.min_delay))
+        if done or not self.budget.withdraw():
+            return primary.result()
+
+        metrics.inc_counter(
+            "upstream_hedged_requests_total",
+            help_text="Solicitudes de respaldo enviadas por respuestas lentas.",
+            upstream=upstream,
+            operation=operation,
+        )
+        hedge = submit(self.executor, self._timed, upstream, operation, fn)
+
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        metrics.inc_counter(
+                            "upstream_hedged_wins_total",
+                            help_text="Solicitudes de respaldo que respondieron primero.",
+                            upstream=upstream,
+                            operation=operation,
+                        )
+                    return future.result()
+
+        return primary.result()
+
+
+hedger = Hedger(
+    enabled=Settings.HEDGE_REQUESTS,
+    percentile=Settings.HEDGE_PERCENTILE,
+    min_delay=Settings.HEDGE_MIN_DELAY,
+    budget=HedgeBudget(
+        ratio=Settings.HEDGE_BUDGET_RATIO, max_credits=Settings.HEDGE_BUDGET_MAX
+    ),
+    tracker=LatencyTracker(
+        window=Settings.HEDGE_LATENCY_WINDOW,
+        min_samples=Settings.HEDGE_MIN_SAMPLES,
+    ),
+    max_workers=Settings.HEDGE_WORKERS,
+)
@@ -0,0 +1,127 @@
+import time
+from contextlib import contextmanager
+
+from utils.metrics import inc_counter, observe_histogram
+
+# Buckets de latencia en segundos: desde respuestas en caché hasta el timeout de lectura.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Buckets de tamaño del cuerpo de la respuesta en bytes (1 KiB ... 4 MiB).
+SIZE_BUCKETS = tuple(1024 * 4**exponent for exponent in range(7))
+
+
+class CallRecord:
+    """
+    Resultado de un intento de llamada a un proveedor, completado dentro de `instrument`.
+
+    Atributos:
+        response (requests.Response | httpx.Response): Respuesta recibida, si la hubo.
+    """
+
+    def __init__(self):
+        self.response = None
+
+
+def _response_size(response) -> int:
+    length = response.headers.get("Content-Length")
+    if length is not None and length.isdigit():
+        return int(length)
+    return len(response.content)
+
+
+@contextmanager
+def instrument(upstream: str, operation: str):
+    """
+    Mide un intento de llamada HTTP a un proveedor y lo exporta en `/metrics`.
+
+    Registra la latencia en `upstream_request_duration_seconds`, el código de estado (o la
+    clase del error de red) en `upstream_responses_total` y el tamaño del cuerpo en
+    `upstream_response_size_bytes`, etiquetados por proveedor y operación.
+
+    Uso:
+        with instrument("treli", "get_payments") as call:
+            call.response = session.request(...)
+
+    Args:
+        upstream (str): Nombre del proveedor.
+        operation (str): Nombre de la operación (función del cliente).
+
+    Yields:
+        CallRecord: Registro en el que se asigna la respuesta recibida.
+    """
+    labels = {"upstream": upstream, "operation": operation or "unknown"}
+    call = CallRecord()
+    start = time.monotonic()
+    try:
+        yield call
+    except Exception as error:
+        _observe(labels, start, type(error).__name__)
+        raise
+    response = call.response
+    _observe(labels, start, str(response.status_code) if response is not None else "")
+    if response is not None:
+        observe_histogram(
+            "upstream_response_size_bytes",
+            _response_size(response),
+            SIZE_BUCKETS,
+            help_text="Tamaño del cuerpo de las respuestas de los proveedores.",
+            **labels,
+        )
+
+
+def _observe(labels: dict, start: float, status: str):
+    observe_histogram(
+        "upstream_request_duration_seconds",
+        time.monotonic() - start,
+        LATENCY_BUCKETS,
+        help_text="Latencia de cada intento de llamada a un proveedor.",
+        **labels,
+    )
+    inc_counter(
+        "upstream_responses_total",
+        help_text="Respuestas de los proveedores por código de estado o tipo de error.",
+        status=status,
+        **labels,
+    )
+
+
+@contextmanager
+def timed_call(upstream: str, operation: str):
+    """
+    Mide una llamada completa a un proveedor, incluidas las esperas del limitador de tasa y
+    de los reintentos, en `upstream_call_duration_seconds`.
+
+    Args:
+        upstream (str): Nombre del proveedor.
+        operation (str): Nombre de la operación.
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        observe_histogram(
+            "upstream_call_duration_seconds",
+            time.monotonic() - start,
+            LATENCY_BUCKETS,
+            help_text="Duración total de las llamadas a un proveedor, con reintentos.",
+            upstream=upstream,
+            operation=operation or "unknown",
+        )
+
+
+def record_retry(upstream: str, operation: str, reason: str):
+    """
+    Cuenta un reintento de una llamada a un proveedor en `upstream_retries_total`.
+
+    Args:
+        upstream (str): Nombre del proveedor.
+        operation (str): Nombre de la operación.
+        reason (str): Código de estado o tipo de error que causó el reintento.
+    """
+    inc_counter(
+        "upstream_retries_total",
+        help_text="Reintentos de llamadas a los proveedores.",
+        upstream=upstream,
+        operation=operation or "unknown",
+        reason=reason,
+    )
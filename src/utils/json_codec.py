@@ -0,0 +1,81 @@
+import json
+from decimal import Decimal
+
+import requests
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+
+    def loads(data):
+        """
+        Decodifica un documento JSON (bytes o str).
+        """
+        return orjson.loads(data)
+
+    def dumps(value) -> bytes:
+        """
+        Codifica `value` como JSON en UTF-8.
+        """
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+else:
+    BACKEND = "json"
+
+    def loads(data):
+        """
+        Decodifica un documento JSON (bytes o str).
+        """
+        return json.loads(data)
+
+    def dumps(value) -> bytes:
+        """
+        Codifica `value` como JSON en UTF-8.
+        """
+        return json.dumps(
+            value, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def response_json(response):
+    """
+    Decodifica el cuerpo JSON de una respuesta de un proveedor con el codec rápido.
+
+    Reemplaza a `response.json()`: decodifica directamente los bytes del cuerpo sin pasar por
+    la detección de encoding de `requests`.
+
+    Args:
+        response (requests.Response | httpx.Response): Respuesta del proveedor.
+
+    Returns:
+        El cuerpo decodificado.
+
+    Raises:
+        requests.exceptions.InvalidJSONError: Si el cuerpo no es JSON válido, igual que
+                                              `response.json()` en `requests`.
+    """
+    try:
+        return loads(response.content)
+    except ValueError as error:
+        raise requests.exceptions.InvalidJSONError(f"invalid JSON body: {error}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON de FastAPI serializada con el codec rápido (orjson si está instalado).
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -37,3 +37,5 @@ lista_name_courses = [
     {"id": 1878036, "titulo": "Networking"},
     {"id": 1351669, "titulo": "CV y cover letters"},
 ]
+
+ids_name_courses = frozenset(item["id"] for item in lista_name_courses)
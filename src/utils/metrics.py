@@ -0,0 +1,150 @@
+import threading
+
+_lock = threading.Lock()
+# nombre -> {"type": str, "help": str, "values": {labels: valor}}
+_metrics = {}
+# nombre -> (help, callable que retorna [(labels, valor)]) evaluado al exportar.
+_gauge_callbacks = {}
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _metric(name: str, metric_type: str, help_text: str):
+    return _metrics.setdefault(
+        name, {"type": metric_type, "help": help_text, "values": {}}
+    )
+
+
+def inc_counter(name: str, amount: float = 1, help_text: str = "", **labels):
+    """
+    Incrementa un contador.
+
+    Args:
+        name (str): Nombre de la métrica.
+        amount (float): Cantidad a sumar.
+        help_text (str): Descripción de la métrica.
+        **labels: Etiquetas de la serie (por ejemplo upstream="treli").
+    """
+    key = _labels_key(labels)
+    with _lock:
+        values = _metric(name, "counter", help_text)["values"]
+        values[key] = values.get(key, 0) + amount
+
+
+def set_gauge(name: str, value: float, help_text: str = "", **labels):
+    """
+    Asigna el valor actual de un gauge.
+    """
+    with _lock:
+        _metric(name, "gauge", help_text)["values"][_labels_key(labels)] = value
+
+
+def observe_histogram(
+    name: str, value: float, buckets: tuple, help_text: str = "", **labels
+):
+    """
+    Registra una observación en un histograma.
+
+    Args:
+        name (str): Nombre de la métrica.
+        value (float): Valor observado (por ejemplo la latencia en segundos).
+        buckets (tuple): Límites superiores de los buckets, en orden ascendente. Deben ser
+                         los mismos en todas las observaciones de la métrica.
+        help_text (str): Descripción de la métrica.
+        **labels: Etiquetas de la serie.
+    """
+    key = _labels_key(labels)
+    with _lock:
+        values = _metric(name, "histogram", help_text)["values"]
+        histogram = values.get(key)
+        if histogram is None:
+            histogram = values[key] = {
+                "buckets": tuple(buckets),
+                "counts": [0] * len(buckets),
+                "sum": 0.0,
+                "count": 0,
+            }
+        for index, bound in enumerate(histogram["buckets"]):
+            if value <= bound:
+                histogram["counts"][index] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+def register_gauge_callback(name: str, callback, help_text: str = ""):
+    """
+    Registra un gauge cuyo valor se calcula al momento de exportar las métricas.
+
+    Args:
+        name (str): Nombre de la métrica.
+        callback (callable): Función sin argumentos que retorna una lista de tuplas
+                             (labels (dict), valor).
+        help_text (str): Descripción de la métrica.
+    """
+    with _lock:
+        _gauge_callbacks[name] = (help_text, callback)
+
+
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    labels = ",".join(f'{name}="{value}"' for name, value in key)
+    return "{" + labels + "}"
+
+
+def _copy_value(value):
+    if isinstance(value, dict):
+        return {**value, "counts": list(value["counts"])}
+    return value
+
+
+def _histogram_lines(name: str, key: tuple, histogram: dict) -> list:
+    lines = []
+    for bound, count in zip(histogram["buckets"], histogram["counts"]):
+        labels = _format_labels(key + (("le", str(bound)),))
+        lines.append(f"{name}_bucket{labels} {count}")
+    labels = _format_labels(key + (("le", "+Inf"),))
+    lines.append(f"{name}_bucket{labels} {histogram['count']}")
+    lines.append(f"{name}_sum{_format_labels(key)} {histogram['sum']}")
+    lines.append(f"{name}_count{_format_labels(key)} {histogram['count']}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """
+    Exporta todas las métricas en el formato de texto de Prometheus.
+
+    Returns:
+        str: Métricas en formato de exposición de Prometheus.
+    """
+    lines = []
+    with _lock:
+        metrics = {
+            name: {
+                **metric,
+                "values": {
+                    key: _copy_value(value) for key, value in metric["values"].items()
+                },
+            }
+            for name, metric in _metrics.items()
+        }
+        callbacks = dict(_gauge_callbacks)
+
+    for name, (help_text, callback) in callbacks.items():
+        values = {_labels_key(labels): value for labels, value in callback()}
+        metrics[name] = {"type": "gauge", "help": help_text, "values": values}
+
+    for name in sorted(metrics):
+        metric = metrics[name]
+        if metric["help"]:
+            lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for key, value in sorted(metric["values"].items()):
+            if metric["type"] == "histogram":
+                lines.extend(_histogram_lines(name, key, value))
+            else:
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from settings import Settings
+from utils.deadline import submit
+
+# Pool compartido para descargar páginas por adelantado.
+page_executor = ThreadPoolExecutor(
+    max_workers=Settings.PAGINATION_WORKERS, thread_name_prefix="page-prefetch"
+)
+
+
+def _is_last_page(body: dict, items: list, page: int) -> bool:
+    total_pages = body.get("total_pages") if isinstance(body, dict) else None
+    return not items or bool(total_pages and page >= int(total_pages))
+
+
+def _page_ids(items: list) -> tuple:
+    return tuple(
+        (
+            item.get("id", item.get("payment_id", item.get("subscription_id")))
+            if isinstance(item, dict)
+            else item
+        )
+        for item in items
+    )
+
+
+class _PageGuard:
+    """
+    Detiene un recorrido que no termina: si el proveedor ignora el parámetro `page` y repite
+    la misma página, o si se supera `max_pages`.
+    """
+
+    def __init__(self, items_key: str, max_pages: int):
+        self.items_key = items_key
+        self.max_pages = max_pages
+        self.pages = 0
+        self.previous_ids = None
+
+    def repeated(self, items: list, page: int) -> bool:
+        ids = _page_ids(items)
+        if items and ids == self.previous_ids:
+            logging.warning(
+                f"{self.items_key} page {page} repeats the previous page, stopping"
+            )
+            return True
+        self.previous_ids = ids
+        return False
+
+    def exhausted(self, page: int) -> bool:
+        self.pages += 1
+        if self.pages >= self.max_pages:
+            logging.warning(
+                f"{self.items_key} reached max_pages ({self.max_pages}) at page {page}"
+            )
+            return True
+        return False
+
+
+def iter_pages(
+    fetch_page,
+    items_key: str,
+    prefetch: int = None,
+    start_page: int = 1,
+    max_pages: int = None,
+):
+    """
+    Recorre todas las páginas de un endpoint paginado y entrega sus elementos uno a uno.
+
+    Mientras se consumen los elementos de una página, las `prefetch` páginas siguientes se
+    descargan en paralelo en `page_executor`. El recorrido termina con la primera página vacía
+    o al llegar a `total_pages` si la respuesta lo incluye. Como protección ante un proveedor
+    que ignore el parámetro `page`, también termina si una página repite los IDs de la
+    anterior o después de `max_pages` páginas. Solo se mantienen en memoria las páginas
+    descargadas por adelantado.
+
+    Args:
+        fetch_page (callable): Función que recibe el número de página y retorna la respuesta
+                               en formato JSON.
+        items_key (str): Llave de la respuesta que contiene la lista de elementos.
+        prefetch (int, opcional): Páginas descargadas por adelantado. Por defecto
+                                  `TRELI_PAGE_PREFETCH`.
+        start_page (int): Primera página a recorrer.
+        max_pages (int, opcional): Número máximo de páginas. Por defecto `TRELI_MAX_PAGES`.
+
+    Yields:
+        dict: Cada elemento de cada página, en orden.
+    """
+    prefetch = max(prefetch or Settings.TRELI_PAGE_PREFETCH, 1)
+    guard = _PageGuard(items_key, max_pages or Settings.TRELI_MAX_PAGES)
+    pending = deque()
+    next_page = start_page
+
+    def schedule():
+        nonlocal next_page
+        pending.append((next_page, submit(page_executor, fetch_page, next_page)))
+        next_page += 1
+
+    try:
+        for _ in range(prefetch):
+            schedule()
+
+        while pending:
+            page, future = pending.popleft()
+            body = future.result()
+            items = (body or {}).get(items_key) or []
+            if guard.repeated(items, page):
+                return
+            yield from items
+            if _is_last_page(body, items, page) or guard.exhausted(page):
+                return
+            schedule()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+async def aiter_pages(
+    fetch_page,
+    items_key: str,
+    prefetch: int = None,
+    start_page: int = 1,
+    max_pages: int = None,
+):
+    """
+    Versión asíncrona de `iter_pages`.
+
+    Args:
+        fetch_page (callable): Función `async` que recibe el número de página y retorna la
+                               respuesta en formato JSON.
+        items_key (str): Llave de la respuesta que contiene la lista de elementos.
+        prefetch (int, opcional): Páginas descargadas por adelantado. Por defecto
+                                  `TRELI_PAGE_PREFETCH`.
+        start_page (int): Primera página a recorrer.
+        max_pages (int, opcional): Número máximo de páginas. Por defecto `TRELI_MAX_PAGES`.
+
+    Yields:
+        dict: Cada elemento de cada página, en orden.
+    """
+    prefetch = max(prefetch or Settings.TRELI_PAGE_PREFETCH, 1)
+    guard = _PageGuard(items_key, max_pages or Settings.TRELI_MAX_PAGES)
+    pending = deque()
+    next_page = start_page
+
+    def schedule():
+        nonlocal next_page
+        pending.append((next_page, asyncio.ensure_future(fetch_page(next_page))))
+        next_page += 1
+
+    try:
+        for _ in range(prefetch):
+            schedule()
+
+        while pending:
+            page, task = pending.popleft()
+            body = await task
+            items = (body or {}).get(items_key) or []
+            if guard.repeated(items, page):
+                return
+            for item in items:
+                yield item
+            if _is_last_page(body, items, page) or guard.exhausted(page):
+                return
+            schedule()
+    finally:
+        for _, task in pending:
+            task.cancel()
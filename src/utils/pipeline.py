@@ -0,0 +1,96 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from utils.deadline import submit
+
+
+class Stage:
+    """
+    Etapa de un pipeline.
+
+    Atributos:
+        name (str): Nombre único de la etapa.
+        fn (callable): Función que recibe el diccionario con los resultados de las etapas
+                       anteriores y retorna el resultado de la etapa.
+        depends_on (tuple): Nombres de las etapas que deben terminar sin error antes de esta.
+    """
+
+    def __init__(self, name: str, fn, depends_on: tuple = ()):
+        self.name = name
+        self.fn = fn
+        self.depends_on = tuple(depends_on)
+
+
+class StageSkipped(Exception):
+    """
+    La etapa no se ejecutó porque una de sus dependencias falló.
+    """
+
+
+class PipelineResult:
+    """
+    Resultado de `run_stages`.
+
+    Atributos:
+        results (dict): Resultado de cada etapa terminada sin error.
+        errors (dict): Excepción de cada etapa fallida u omitida, en el orden de las etapas.
+    """
+
+    def __init__(self, results: dict, errors: dict):
+        self.results = results
+        self.errors = errors
+
+
+def run_stages(stages: list, executor) -> PipelineResult:
+    """
+    Ejecuta un grafo de etapas, corriendo en paralelo las que no dependen entre sí.
+
+    Cada etapa se envía a `executor` en cuanto todas sus dependencias terminan sin error, de
+    modo que el tiempo total es el de la cadena de dependencias más lenta. Si una etapa falla,
+    el error se registra y las etapas que dependen de ella se omiten con `StageSkipped`; las
+    etapas independientes continúan.
+
+    Args:
+        stages (list): Lista de `Stage`.
+        executor (concurrent.futures.Executor): Pool acotado en el que se ejecutan las etapas.
+
+    Returns:
+        PipelineResult: Resultados y errores por etapa.
+    """
+    results = {}
+    errors = {}
+    waiting = list(stages)
+    running = {}
+
+    def settle():
+        changed = True
+        while changed:
+            changed = False
+            for stage in list(waiting):
+                failed = [name for name in stage.depends_on if name in errors]
+                if failed:
+                    errors[stage.name] = StageSkipped(f"{stage.name} skipped: {failed}")
+                elif all(name in results for name in stage.depends_on):
+                    future = submit(executor, stage.fn, dict(results))
+                    running[future] = stage
+                else:
+                    continue
+                waiting.remove(stage)
+                changed = True
+
+    settle()
+    while running:
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            stage = running.pop(future)
+            try:
+                results[stage.name] = future.result()
+            except Exception as error:
+                logging.error(f"stage {stage.name} failed: {error}")
+                errors[stage.name] = error
+        settle()
+
+    ordered_errors = {
+        stage.name: errors[stage.name] for stage in stages if stage.name in errors
+    }
+    return PipelineResult(results, ordered_errors)
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import requests
+
+from utils import metrics
+from utils.retry import retry_after_seconds
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """
+    La solicitud tendría que esperar más de lo permitido para obtener un turno del limitador.
+    """
+
+
+class TokenBucket:
+    """
+    Token bucket que reparte turnos a una tasa fija con una ráfaga máxima.
+
+    Cada solicitud toma un token; los tokens se reponen a `rate` por segundo hasta un máximo
+    de `burst`. Cuando no hay tokens, el turno se reserva y el llamador espera el tiempo
+    necesario, de modo que las ráfagas se suavizan en lugar de rechazarse. `pause` bloquea
+    el bucket hasta un instante dado (por ejemplo, el indicado por `Retry-After`).
+
+    Un `rate` menor o igual a cero desactiva la limitación de tasa (las pausas se respetan).
+
+    Atributos:
+        rate (float): Tokens repuestos por segundo.
+        burst (int): Máximo de tokens acumulables.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            elapsed = now - self._updated_at
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def reserve(self, max_wait: float = None) -> float:
+        """
+        Reserva un turno y retorna los segundos que el llamador debe esperar para usarlo.
+
+        Args:
+            max_wait (float, opcional): Espera máxima aceptada. Si el turno requiere más, no se
+                                        reserva y se lanza `RateLimitExceeded`.
+
+        Returns:
+            float: Segundos a esperar antes de enviar la solicitud.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(self._paused_until - now, 0.0)
+            if self.rate > 0:
+                if self._tokens < 1:
+                    wait = max(wait, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                raise RateLimitExceeded(
+                    f"rate limit wait {wait:.2f}s exceeds {max_wait}s"
+                )
+            if self.rate > 0:
+                self._tokens -= 1
+            return wait
+
+    def pause(self, seconds: float):
+        """
+        Bloquea el bucket durante `seconds` segundos a partir de ahora.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def utilization(self) -> float:
+        """
+        Fracción de la capacidad en uso: 0 con el bucket lleno, 1 sin tokens o en pausa.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._paused_until > now:
+                return 1.0
+            if self.rate <= 0:
+                return 0.0
+            return min(max(1 - self._tokens / self.burst, 0.0), 1.0)
+
+
+class RateLimiter:
+    """
+    Limitador de tasa de un proveedor, con límites opcionales por endpoint.
+
+    Toda solicitud toma un turno del bucket del proveedor y, si su operación tiene un límite
+    propio configurado, también del bucket de esa operación. Las respuestas 429 y 503 con
+    `Retry-After` pausan el bucket correspondiente durante el tiempo indicado, de forma que
+    las siguientes solicitudes esperan en lugar de insistir.
+
+    Atributos:
+        upstream (str): Nombre del proveedor.
+        max_wait (float): Espera máxima por turno antes de fallar con `RateLimitExceeded`.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        rate: float,
+        burst: int,
+        endpoints: dict = None,
+        max_wait: float = None,
+        default_retry_after: float = 1.0,
+    ):
+        self.upstream = upstream
+        self.max_wait = max_wait
+        self.default_retry_after = default_retry_after
+        self.bucket = TokenBucket(rate, burst)
+        self.endpoint_buckets = {
+            operation: TokenBucket(limit["rate"], limit.get("burst", 1))
+            for operation, limit in (endpoints or {}).items()
+        }
+
+    def _buckets(self, operation: str) -> list:
+        buckets = [self.bucket]
+        if operation in self.endpoint_buckets:
+            buckets.append(self.endpoint_buckets[operation])
+        return buckets
+
+    def _reserve(self, operation: str, max_wait: float = None) -> float:
+        if max_wait is None or (self.max_wait is not None and self.max_wait < max_wait):
+            max_wait = self.max_wait
+        wait = max(bucket.reserve(max_wait) for bucket in self._buckets(operation))
+        if wait > 0:
+            metrics.inc_counter(
+                "upstream_rate_limit_wait_seconds_total",
+                wait,
+                help_text="Tiempo esperado por turnos del limitador de tasa.",
+                upstream=self.upstream,
+                operation=operation,
+            )
+        return wait
+
+    def acquire(self, operation: str = None, max_wait: float = None):
+        """
+        Espera (bloqueando el hilo) hasta obtener un turno para `operation`.
+
+        Args:
+            operation (str, opcional): Operación que hace la solicitud.
+            max_wait (float, opcional): Espera máxima de esta solicitud (por ejemplo, el tiempo
+                                        que queda antes de su deadline). Nunca supera `max_wait`
+                                        del limitador.
+        """
+        wait = self._reserve(operation, max_wait)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, operation: str = None, max_wait: float = None):
+        """
+        Espera sin bloquear el event loop hasta obtener un turno para `operation`.
+        """
+        wait = self._reserve(operation, max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def observe(self, operation: str, response):
+        """
+        Registra la respuesta del proveedor y pausa el limitador si pidió esperar.
+
+        Args:
+            operation (str): Operación que generó la solicitud.
+            response (requests.Response | httpx.Response): Respuesta del proveedor.
+        """
+        status_code = response.status_code
+        if status_code not in (429, 503):
+            return
+
+        retry_after = retry_after_seconds(response)
+        if retry_after is None:
+            if status_code != 429:
+                return
+            retry_after = self.default_retry_after
+
+        metrics.inc_counter(
+            "upstream_rate_limited_total",
+            help_text="Respuestas del proveedor que pidieron reducir la tasa.",
+            upstream=self.upstream,
+            operation=operation,
+        )
+        logging.warning(
+            f"{self.upstream} {operation} rate limited ({status_code}), "
+            f"pausing {retry_after}s"
+        )
+        # El límite del proveedor suele ser global, así que la pausa aplica a todo el proveedor.
+        for bucket in self._buckets(operation):
+            bucket.pause(retry_after)
+
+    def utilization(self) -> list:
+        """
+        Utilización actual de cada bucket del limitador.
+
+        Returns:
+            list: Tuplas (labels (dict), utilización (float)).
+        """
+        values = [
+            ({"upstream": self.upstream, "operation": "*"}, self.bucket.utilization())
+        ]
+        values.extend(
+            ({"upstream": self.upstream, "operation": operation}, bucket.utilization())
+            for operation, bucket in self.endpoint_buckets.items()
+        )
+        return values
+
+
+def endpoint_limits(config: str, upstream: str) -> dict:
+    """
+    Obtiene los límites por endpoint de un proveedor a partir de la configuración JSON.
+
+    Args:
+        config (str): JSON con la forma {"<proveedor>.<operación>": {"rate": 2, "burst": 5}}.
+        upstream (str): Nombre del proveedor.
+
+    Returns:
+        dict: Límites por operación del proveedor indicado.
+    """
+    prefix = f"{upstream}."
+    return {
+        key[len(prefix) :]: limit
+        for key, limit in json.loads(config or "{}").items()
+        if key.startswith(prefix)
+    }
+
+
+_limiters = []
+
+
+def register(limiter: RateLimiter) -> RateLimiter:
+    """
+    Registra un limitador para exportar su utilización en las métricas.
+    """
+    _limiters.append(limiter)
+    return limiter
+
+
+metrics.register_gauge_callback(
+    "upstream_rate_limit_utilization",
+    lambda: [value for limiter in _limiters for value in limiter.utilization()],
+    help_text="Fracción de la capacidad del limitador de tasa en uso.",
+)
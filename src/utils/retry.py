@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+import requests
+
+from utils import deadline
+
+# Códigos de estado que indican un error transitorio del proveedor.
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Métodos HTTP que se pueden repetir sin efectos adicionales.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Errores de red que justifican un reintento.
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+ASYNC_RETRY_EXCEPTIONS = (httpx.TransportError,)
+
+
+class RetryPolicy:
+    """
+    Política de reintentos con espera exponencial y jitter.
+
+    Atributos:
+        retries (int): Número máximo de reintentos después del primer intento.
+        base_delay (float): Espera en segundos antes del primer reintento.
+        max_delay (float): Espera máxima en segundos entre reintentos.
+        jitter (bool): Si es True, cada espera se elige al azar entre 0 y la espera
+                       exponencial ("full jitter"), para que los clientes no reintenten a la vez.
+    """
+
+    def __init__(
+        self, retries: int, base_delay: float, max_delay: float, jitter: bool = True
+    ):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt: int, response=None) -> float:
+        """
+        Espera antes del reintento número `attempt` (0, 1, 2...).
+
+        Si la respuesta incluye `Retry-After`, se respeta ese tiempo de espera, limitado a
+        `max_delay` para que un header del proveedor no bloquee el hilo (y su turno del
+        compartimento) indefinidamente en llamadas sin deadline.
+        """
+        if response is not None:
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                return min(retry_after, self.max_delay)
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+NO_RETRIES = RetryPolicy(retries=0, base_delay=0, max_delay=0)
+
+
+def retry_after_seconds(response):
+    """
+    Obtiene los segundos indicados en el header `Retry-After` de la respuesta, si existe.
+
+    Args:
+        response (requests.Response | httpx.Response): Respuesta del proveedor.
+
+    Returns:
+        float or None: Segundos a esperar, o None si el header no existe o no es numérico.
+    """
+    value = response.headers.get("Retry-After")
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Calcula la espera exponencial para el intento `attempt` (0, 1, 2...).
+    """
+    return min(max_delay, base_delay * (2**attempt))
+
+
+def _fits_deadline(delay: float) -> bool:
+    left = deadline.remaining()
+    return left is None or delay < left
+
+
+def _log_retry(name, attempt, retries, delay, cause, on_retry):
+    """
+    `cause` es la excepción de red o el código de estado de la respuesta a reintentar.
+    """
+    if isinstance(cause, BaseException):
+        reason, label = cause, type(cause).__name__
+    else:
+        reason, label = f"status {cause}", str(cause)
+    logging.warning(f"{name} retry {attempt + 1}/{retries} in {delay:.2f}s: {reason}")
+    if on_retry is not None:
+        on_retry(label)
+
+
+def call_with_retries(send, policy: RetryPolicy, name: str = None, on_retry=None):
+    """
+    Ejecuta `send()` y lo reintenta ante errores transitorios según `policy`.
+
+    Se reintenta cuando `send()` lanza un error de conexión o timeout, o cuando la respuesta
+    tiene un código de `RETRY_STATUS_CODES`. No se reintenta si la espera no alcanza a
+    terminar antes del deadline actual. Solo debe usarse con solicitudes idempotentes.
+
+    Args:
+        send (callable): Función sin argumentos que ejecuta la solicitud y retorna la respuesta.
+        policy (RetryPolicy): Política de reintentos.
+        name (str, opcional): Nombre de la operación, usado en logs.
+        on_retry (callable, opcional): Función invocada antes de cada reintento con el motivo
+                                       (código de estado o tipo de error), usada en métricas.
+
+    Returns:
+        requests.Response: La última respuesta obtenida (exitosa o no).
+
+    Raises:
+        requests.exceptions.RequestException: Si el último intento falla por conexión o timeout.
+    """
+    for attempt in range(policy.retries + 1):
+        try:
+            response = send()
+        except RETRY_EXCEPTIONS as e:
+            delay = policy.delay(attempt)
+            if attempt == policy.retries or not _fits_deadline(delay):
+                raise
+            _log_retry(name, attempt, policy.retries, delay, e, on_retry)
+        else:
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            delay = policy.delay(attempt, response)
+            if attempt == policy.retries or not _fits_deadline(delay):
+                return response
+            _log_retry(
+                name, attempt, policy.retries, delay, response.status_code, on_retry
+            )
+
+        time.sleep(delay)
+
+
+async def acall_with_retries(
+    send, policy: RetryPolicy, name: str = None, on_retry=None
+):
+    """
+    Versión asíncrona de `call_with_retries` para solicitudes con `httpx`.
+
+    Args:
+        send (callable): Función sin argumentos que retorna un awaitable con la respuesta.
+        policy (RetryPolicy): Política de reintentos.
+        name (str, opcional): Nombre de la operación, usado en logs.
+
+    Returns:
+        httpx.Response: La última respuesta obtenida (exitosa o no).
+
+    Raises:
+        httpx.TransportError: Si el último intento falla por conexión o timeout.
+    """
+    for attempt in range(policy.retries + 1):
+        try:
+            response = await send()
+        except ASYNC_RETRY_EXCEPTIONS as e:
+            delay = policy.delay(attempt)
+            if attempt == policy.retries or not _fits_deadline(delay):
+                raise
+            _log_retry(name, attempt, policy.retries, delay, e, on_retry)
+        else:
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            delay = policy.delay(attempt, response)
+            if attempt == policy.retries or not _fits_deadline(delay):
+                return response
+            _log_retry(
+                name, attempt, policy.retries, delay, response.status_code, on_retry
+            )
+
+        await asyncio.sleep(delay)
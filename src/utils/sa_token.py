@@ -1,46 +1,150 @@
-import json
 import logging
+import threading
+import time
 
+import google.auth.jwt
 import google.auth.transport.requests
 import google.oauth2.id_token
-import requests
 from fastapi import HTTPException, status
 
+from clients.upstream import users_api_client
 from settings import Settings
+from utils.json_codec import dumps, loads, response_json
 
 settings = Settings()
 
+# Transporte reutilizado para las llamadas al servidor de metadatos de Google.
+auth_req = google.auth.transport.requests.Request()
+
+# audience -> (token, exp). Protegido por `_cache_lock`.
+_tokens = {}
+_cache_lock = threading.Lock()
+# audience -> Lock. Garantiza una sola generación de token en curso por audience.
+_refresh_locks = {}
+# Audiences con un refresco en segundo plano en curso.
+_background_refreshes = set()
+
+
+def _fetch_token(service_audience):
+    """
+    Solicita un nuevo token de identidad para el audience indicado.
+
+    :param service_audience: The URL of the service you want to access
+    :return: A JWT token
+    """
+    if settings.MACHINE == "DEV":
+        body = {"audience": service_audience}
+
+        response = users_api_client.post(
+            f"{settings.BASE_URL}/pilot/api/any/token",
+            data=dumps(body),
+            operation=_fetch_token.__name__,
+            idempotent=True,
+        )
+        response = loads(response_json(response))
+
+        return response["JWT"]
+
+    # GC Run URL
+    return google.oauth2.id_token.fetch_id_token(auth_req, service_audience + "/")
+
+
+def _token_expiry(token):
+    """
+    Obtiene la expiración (`exp`, epoch en segundos) del token sin verificar la firma.
+
+    Si el token no puede decodificarse se asume la vigencia por defecto `SA_TOKEN_DEFAULT_TTL`.
+    """
+    try:
+        return int(google.auth.jwt.decode(token, verify=False)["exp"])
+    except Exception as e:
+        logging.warning(f"generate_sa_token: token without exp claim: {e}")
+        return int(time.time()) + settings.SA_TOKEN_DEFAULT_TTL
+
+
+def _refresh_lock(service_audience):
+    with _cache_lock:
+        return _refresh_locks.setdefault(service_audience, threading.Lock())
+
+
+def _cached_token(service_audience, margin):
+    """
+    Retorna el token en caché si aún le quedan más de `margin` segundos de vigencia.
+    """
+    with _cache_lock:
+        entry = _tokens.get(service_audience)
+
+    if entry and entry[1] - time.time() > margin:
+        return entry[0]
+    return None
+
+
+def _refresh_token(service_audience):
+    """
+    Genera un token nuevo y lo guarda en caché.
+
+    Solo un hilo genera el token de un audience a la vez; los demás esperan a que termine
+    y reutilizan el resultado.
+    """
+    with _refresh_lock(service_audience):
+        token = _cached_token(service_audience, settings.SA_TOKEN_REFRESH_MARGIN)
+        if token:
+            return token
+
+        token = _fetch_token(service_audience)
+        with _cache_lock:
+            _tokens[service_audience] = (token, _token_expiry(token))
+
+        return token
+
+
+def _background_refresh(service_audience):
+    try:
+        _refresh_token(service_audience)
+    except Exception as e:
+        logging.error(f"generate_sa_token background refresh: {e}")
+    finally:
+        with _cache_lock:
+            _background_refreshes.discard(service_audience)
+
+
+def _schedule_refresh(service_audience):
+    """
+    Lanza un refresco en segundo plano si no hay otro en curso para el audience.
+    """
+    with _cache_lock:
+        if service_audience in _background_refreshes:
+            return
+        _background_refreshes.add(service_audience)
+
+    threading.Thread(
+        target=_background_refresh, args=(service_audience,), daemon=True
+    ).start()
+
 
 def generate_sa_token(service_audience):
     """
     It takes a service audience as an argument, and returns a JWT token
 
+    Los tokens se guardan en caché por audience hasta poco antes de su expiración (`exp`).
+    Cuando a un token le quedan menos de `SA_TOKEN_REFRESH_MARGIN` segundos se sigue
+    usando el token en caché mientras se genera uno nuevo en segundo plano; solo si el token
+    está por vencer (`SA_TOKEN_EXPIRY_MARGIN`) la llamada espera al nuevo token.
+
     :param service_audience: The URL of the service you want to access
     :return: A JWT token
     """
+    if service_audience is None and settings.MACHINE == "DEV":
+        service_audience = settings.BASE_URL
 
     try:
-        if settings.MACHINE == "DEV":
-            if service_audience is None:
-                service_audience = settings.BASE_URL
-            body = {"audience": service_audience}
-
-            response = requests.post(
-                f"{settings.BASE_URL}/pilot/api/any/token",
-                data=json.dumps(body),
-            )
-            response = json.loads(response.json())
-
-            return response["JWT"]
-
-        else:
-            # GC Run URL
-            auth_req = google.auth.transport.requests.Request()
-            id_token = google.oauth2.id_token.fetch_id_token(
-                auth_req, service_audience + "/"
-            )
-
-            return id_token
+        token = _cached_token(service_audience, settings.SA_TOKEN_EXPIRY_MARGIN)
+        if token:
+            if not _cached_token(service_audience, settings.SA_TOKEN_REFRESH_MARGIN):
+                _schedule_refresh(service_audience)
+            return token
+
+        return _refresh_token(service_audience)
 
     except Exception as e:
         logging.error(f"generate_sa_token: {e}")
@@ -0,0 +1,89 @@
+import copy
+import functools
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas idénticas concurrentes en una sola ejecución.
+
+    Mientras una llamada con una llave está en curso, las demás llamadas con la misma llave
+    esperan su resultado (o su excepción) en lugar de ejecutar la función otra vez. Al
+    terminar, la llave se libera y la siguiente llamada vuelve a ejecutarse normalmente;
+    no es una caché. La llamada que ejecuta la función recibe su resultado y cada llamada
+    que esperó recibe una copia, así que ninguna comparte un objeto mutable con otra.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Ejecuta `fn()` una sola vez para todas las llamadas concurrentes con la misma `key`.
+
+        Args:
+            key: Llave hashable que identifica la llamada.
+            fn (callable): Función sin argumentos a ejecutar.
+
+        Returns:
+            El resultado de `fn()`, o una copia si la llamada esperó a otra en curso.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            try:
+                if call.error is None and call.waiters:
+                    # Copia propia de quienes esperan: el líder puede modificar la suya.
+                    call.result = copy.deepcopy(result)
+            except BaseException as error:
+                call.error = error
+            finally:
+                call.done.set()
+        return result
+
+
+_default_group = SingleFlight()
+
+
+def coalesce(func):
+    """
+    Decorador que agrupa las llamadas concurrentes a `func` con los mismos argumentos.
+
+    Solo debe usarse en funciones de lectura sin efectos secundarios. Ver
+    `SingleFlight.do` sobre qué llamadas reciben una copia del resultado.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+        return _default_group.do(key, lambda: func(*args, **kwargs))
+
+    return wrapper